@@ -0,0 +1,42 @@
+# Benchmark of the lookup table of obstacle layers against computing the layer of a moved obstacle, on the default scene of the simulation
+# Builds the table of the movable obstacle in a temporary folder, loads it again like a later session would, and then moves the obstacle
+# in 10 pixel steps like the 4/5/6/8 keys, timing the new grid from a table lookup and from a computed layer
+# Run from the repository folder: python benchmarks/bench_obstacle_table.py [cs_resolution] [reach in pixels] [number of workers]
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scene import create_scene, create_scene_obstacle_table, create_scene_obstacle_layer, create_scene_joint_limit_layer
+from cspace import combine_layers
+
+cs_resolution = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+reach = int(sys.argv[2]) if len(sys.argv) > 2 else 350
+workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+offset_range = (-reach, reach, 10)
+
+scene = create_scene(cs_resolution=cs_resolution)
+obs_width, obs_height = scene["obstacles"][0][2:]
+with tempfile.TemporaryDirectory() as table_dir:
+    start_time = time.perf_counter()
+    table = create_scene_obstacle_table(scene, obs_width, obs_height, table_dir, offset_range, offset_range, workers)
+    print(len(table), "positions at", cs_resolution, "rad, built in", format(time.perf_counter() - start_time, ".2f"), "s,", format(table.nbytes/1e6, ".1f"), "MB")
+    start_time = time.perf_counter()
+    table = create_scene_obstacle_table(scene, obs_width, obs_height, table_dir, offset_range, offset_range, workers)
+    print("loaded in", format(1000*(time.perf_counter() - start_time), ".2f"), "ms")
+
+    # A walk of the obstacle on the lattice, the other obstacle stays where it is
+    joint_limit_layer = create_scene_joint_limit_layer(scene)
+    other_layer = create_scene_obstacle_layer(scene, scene["obstacles"][1:])
+    rng = np.random.default_rng(0)
+    offsets = np.clip(np.array(scene["obstacles"][0][:2]) + 10*np.cumsum(rng.integers(-1, 2, (200, 2)), axis=0), -reach, reach).tolist()
+    for name, create_layer in (("table lookup", lambda offset_x, offset_y: table.layer(offset_x, offset_y)),
+                               ("computed layer", lambda offset_x, offset_y: create_scene_obstacle_layer(scene, [[offset_x, offset_y, obs_width, obs_height]]))):
+        times_ms = []
+        for offset_x, offset_y in offsets:
+            start_time = time.perf_counter()
+            combine_layers(joint_limit_layer, [create_layer(offset_x, offset_y), other_layer])
+            times_ms.append(1000*(time.perf_counter() - start_time))
+        print("  " + format(name, "14s"), "grid after a move: p50", format(np.percentile(times_ms, 50), "7.3f"), "ms, p95", format(np.percentile(times_ms, 95), "7.3f"), "ms")
@@ -0,0 +1,80 @@
+# Benchmark of the grid motion planner on the default scene of the simulation
+# Plans from the start to the goal configuration of the simulation and between random free configurations,
+# and compares the planning times with the time of one frame of the simulation, also for the wavefront planner with the goal of the simulation
+# A* and Dijkstra search the whole grid again for every plan, at 0.01 rad they do not replan within one frame, so the verdict line under each of them says so
+# The G key of the simulation plans with the wavefront planner by default, the last line is the time of a G press as the simulation makes it
+# Run from the repository folder: python benchmarks/bench_planner.py [cs_resolution] [number of random queries]
+import os
+import sys
+import math
+import time
+import random
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scene import create_scene, create_configuration_space, theta_to_index_value, index_to_theta_value, plan_motion
+from planner import find_grid_path, WavefrontPlanner
+
+cs_resolution = float(sys.argv[1]) if len(sys.argv) > 1 else 0.01
+number_of_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+cspace_grid = create_configuration_space(create_scene(cs_resolution=cs_resolution))
+cs_space_size = len(cspace_grid)
+# The simulation runs at 60 frames per second
+frame_time_ms = 1000/60
+print("Grid", cs_space_size, "x", cs_space_size, "at", cs_resolution, "rad, frame time", format(frame_time_ms, ".1f"), "ms")
+
+# The start and goal configurations of the simulation, then random pairs of free configurations
+theta_xi, theta_yi = theta_to_index_value(math.pi/6, math.pi/4, 2*math.pi, cs_space_size)
+goal_theta_xi, goal_theta_yi = theta_to_index_value(5*math.pi/6, 7*math.pi/4, 2*math.pi, cs_space_size)
+queries = [((theta_yi, theta_xi), (goal_theta_yi, goal_theta_xi))]
+free_points = [tuple(point) for point in np.argwhere(cspace_grid == 0)]
+random.seed(0)
+queries += [(random.choice(free_points), random.choice(free_points)) for _ in range(number_of_queries)]
+
+for use_heuristic, name in ((True, "A*"), (False, "Dijkstra")):
+    times_ms = []
+    for start, goal in queries:
+        start_time = time.perf_counter()
+        find_grid_path(cspace_grid, start, goal, use_heuristic)
+        times_ms.append(1000*(time.perf_counter() - start_time))
+    within_frame = sum(1 for time_ms in times_ms if time_ms <= frame_time_ms)
+    print(format(name, "9s"), "simulation query", format(times_ms[0], "7.1f"), "ms |",
+          "random queries p50", format(np.percentile(times_ms[1:], 50), "7.1f"), "ms, p95", format(np.percentile(times_ms[1:], 95), "7.1f"), "ms, max", format(max(times_ms[1:]), "7.1f"), "ms |",
+          within_frame, "of", len(times_ms), "within one frame")
+    if within_frame == len(times_ms):
+        print(format("", "9s"), name, "replans within one frame at", cs_resolution, "rad")
+    else:
+        print(format("", "9s"), name, "does NOT replan within one frame at", cs_resolution, "rad, the one-frame replanning requirement is not met")
+
+# The wavefront planner computes the distance field once per goal, then extracts the path of every start from it
+# The random starts share the goal of the simulation, like the arm being driven around while the goal stays fixed
+# The first distance field also imports scipy, so it is left out of the timing
+goal = queries[0][1]
+WavefrontPlanner().find_path(cspace_grid, queries[0][0], goal)
+wavefront_planner = WavefrontPlanner()
+start_time = time.perf_counter()
+wavefront_planner.find_path(cspace_grid, queries[0][0], goal)
+field_time_ms = 1000*(time.perf_counter() - start_time)
+times_ms = []
+for start, _ in queries[1:]:
+    start_time = time.perf_counter()
+    wavefront_planner.find_path(cspace_grid, start, goal)
+    times_ms.append(1000*(time.perf_counter() - start_time))
+within_frame = sum(1 for time_ms in times_ms if time_ms <= frame_time_ms)
+print(format("Wavefront", "9s"), "distance field  ", format(field_time_ms, "7.1f"), "ms |",
+      "path extraction p50", format(np.percentile(times_ms, 50), "7.1f"), "ms, p95", format(np.percentile(times_ms, 95), "7.1f"), "ms, max", format(max(times_ms), "7.1f"), "ms |",
+      within_frame, "of", len(times_ms), "within one frame")
+
+# A G press of the simulation with the default motion_planner = "wavefront": the simulation shows the live path of the wavefront planner every frame,
+# so the distance field of the current grid and goal is already computed, once after every change of the grid, and a G press only extracts the path
+# and turns it into the theta trajectory. The starts are the thetas of the random free grid points
+times_ms = []
+for (start_row, start_column), _ in queries:
+    theta_1, theta_2 = index_to_theta_value(start_column, start_row, 2*math.pi, cs_space_size)
+    start_time = time.perf_counter()
+    plan_motion(cspace_grid, theta_1, theta_2, 5*math.pi/6, 7*math.pi/4, wavefront_planner)
+    times_ms.append(1000*(time.perf_counter() - start_time))
+within_frame = sum(1 for time_ms in times_ms if time_ms <= frame_time_ms)
+print(format("G key", "9s"), "wavefront plan  ", "p50", format(np.percentile(times_ms, 50), "7.1f"), "ms, p95", format(np.percentile(times_ms, 95), "7.1f"), "ms, max", format(max(times_ms), "7.1f"), "ms |",
+      within_frame, "of", len(times_ms), "within one frame,", "plus the distance field once per grid or goal change")
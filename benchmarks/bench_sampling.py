@@ -0,0 +1,37 @@
+# Benchmark of the sampling based planners on N-link arms, which have no configuration space grid
+# Plans between random free configurations of a 6-link arm among random obstacles with RRT-Connect, with a new LazyPRM per query,
+# and with one LazyPRM reused for all queries of a scene, and counts the queries that took longer than one second
+# Run from the repository folder: python benchmarks/bench_sampling.py [number of joints] [number of random queries]
+import os
+import sys
+import math
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scene import create_scene, create_random_obstacles, create_scene_collision_checker, plan_sampling_motion
+from sampling_planner import LazyPRM
+
+number_of_joints = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+number_of_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+for number_of_obstacles in (10, 20, 30):
+    scene = create_scene(link_lengths=[360/number_of_joints]*number_of_joints, link_width=14, joint_limits=None, obstacles=create_random_obstacles(number_of_obstacles, number_of_obstacles))
+    checker = create_scene_collision_checker(scene)
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(0, 2*math.pi, (20*number_of_queries, number_of_joints))
+    free_samples = samples[checker.configurations_free(samples)]
+    queries = list(zip(free_samples[0:2*number_of_queries:2], free_samples[1:2*number_of_queries:2]))
+    print(number_of_joints, "joints,", number_of_obstacles, "obstacles,", format(len(free_samples)/len(samples), ".0%"), "of the configurations free")
+
+    roadmap = LazyPRM(checker, seed=0)
+    planners = (("RRT-Connect", "rrt"), ("LazyPRM", "prm"), ("reused PRM", roadmap))
+    for name, planner in planners:
+        times_ms, failures = [], 0
+        for k, (start, goal) in enumerate(queries):
+            start_time = time.perf_counter()
+            trajectory = plan_sampling_motion(scene, start, goal, planner, seed=k)
+            times_ms.append(1000*(time.perf_counter() - start_time))
+            failures += trajectory is None
+        print("  " + format(name, "11s"), "p50", format(np.percentile(times_ms, 50), "7.1f"), "ms, p95", format(np.percentile(times_ms, 95), "7.1f"), "ms, max", format(max(times_ms), "7.1f"), "ms |",
+              sum(1 for time_ms in times_ms if time_ms > 1000), "over 1 s,", failures, "without a path")
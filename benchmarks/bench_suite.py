@@ -0,0 +1,235 @@
+# Benchmark suite of the hot paths of the simulation: configuration space construction, single configuration collision checks and rendering
+# Runs headless scenes at several resolutions and obstacle counts and saves the results as JSON, so that two commits can be compared
+# Run from the repository folder:
+#   python benchmarks/bench_suite.py --output before.json                        measure and save the results
+#   python benchmarks/bench_suite.py --output after.json --baseline before.json  measure, save and flag regressions against before.json
+#   python benchmarks/bench_suite.py --compare before.json after.json            only compare two saved results
+# Exits with status 1 if a regression was flagged, so it can also run in a build
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Render without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_DIR)
+import pygame
+import main
+from shapely.geometry import Polygon
+from scene import create_scene, create_random_obstacles, create_configuration_space, create_manipulator_polygons, create_obstacle_corners, create_obstacle_index
+from cspace import create_joint_limit_layer
+from collision import manipulator_corners
+
+# A function to run a function several times and return the time of every run in seconds
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return times
+
+# A function to get the peak memory allocated while running a function once, in megabytes, numpy arrays included
+def measure_peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]/1e6
+    finally:
+        tracemalloc.stop()
+
+# A function to summarise the run times of a benchmark, seconds is the median that is compared between runs
+def summarise(times, **extra):
+    result = {"seconds": float(np.median(times)), "min_seconds": float(np.min(times)), "runs": len(times)}
+    result.update(extra)
+    return result
+
+# Time building the configuration space grid of a scene, the cached joint constraint layer is cleared before every run so it is part of the time
+def bench_grid(scene, backend, repeat):
+    def build():
+        create_joint_limit_layer.cache_clear()
+        return create_configuration_space(scene, backend)
+    cells = len(build())**2
+    times = measure(build, repeat)
+    return summarise(times, cells=cells, cells_per_second=cells/float(np.median(times)), peak_mb=measure_peak_memory(build))
+
+# Time checking single configurations for collisions, the way the simulation checks the current configuration every frame
+# "shapely" creates the link polygons and intersects them with the obstacle polygons, "vectorized" uses the obstacle index and the separating axis test on one configuration
+def bench_collision(scene, engine, configurations):
+    ground_x, ground_y = scene["ground"]
+    link_length_1, link_length_2 = scene["link_lengths"]
+    half_width = scene["link_width"]//2
+    if engine == "shapely":
+        obs_polygons = [Polygon(create_obstacle_corners(scene, obstacle)) for obstacle in scene["obstacles"]]
+        def check(theta_1, theta_2):
+            link1_polygon, link2_polygon = create_manipulator_polygons(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2)
+            return any(link1_polygon.intersects(obs_polygon) or link2_polygon.intersects(obs_polygon) for obs_polygon in obs_polygons)
+    else:
+        obstacle_index = create_obstacle_index(scene, scene["obstacles"])
+        def check(theta_1, theta_2):
+            corners_1, corners_2 = manipulator_corners(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2)
+            return bool(obstacle_index.polygons_hit(np.stack([corners_1, corners_2])).any())
+
+    times = []
+    for theta_1, theta_2 in configurations:
+        start_time = time.perf_counter()
+        check(theta_1, theta_2)
+        times.append(time.perf_counter() - start_time)
+    return summarise(times, p95_seconds=float(np.percentile(times, 95)))
+
+# Time checking all configurations at once with the separating axis test, per configuration, for comparison with the single configuration checks
+# numpy has a fixed cost per call, so the vectorized engine is only fast for batches of configurations
+def bench_collision_batch(scene, configurations, repeat):
+    ground_x, ground_y = scene["ground"]
+    link_length_1, link_length_2 = scene["link_lengths"]
+    obstacle_index = create_obstacle_index(scene, scene["obstacles"])
+    theta_1, theta_2 = np.array(configurations).T
+    def check():
+        corners_1, corners_2 = manipulator_corners(ground_x, ground_y, link_length_1, link_length_2, scene["link_width"]//2, theta_1, theta_2)
+        return obstacle_index.polygons_hit(corners_1) | obstacle_index.polygons_hit(corners_2)
+    times = [seconds/len(configurations) for seconds in measure(check, repeat)]
+    return summarise(times)
+
+# Time rendering on an offscreen surface with the drawing functions of main.py
+# "cspace_surface" is creating the c-space plot of a new grid, "frame" is a whole frame of the simulation loop with the c-space plot already cached
+def bench_render(scene, cspace_grid, configurations):
+    ground_x, ground_y = scene["ground"]
+    link_length_1, link_length_2 = scene["link_lengths"]
+    half_width = scene["link_width"]//2
+    surface = pygame.Surface((main.SCREEN_WIDTH, main.SCREEN_HEIGHT))
+
+    def draw_new_grid():
+        main.cspace_surface_cache["grid"] = None
+        main.draw_configuration_space(surface, cspace_grid)
+    surface_times = measure(draw_new_grid, 5)
+
+    frame_times = []
+    for theta_1, theta_2 in configurations:
+        start_time = time.perf_counter()
+        surface.fill(color=main.COLOUR_SCREEN)
+        pygame.draw.line(surface=surface, color=main.COLOUR_TEXT, start_pos=(700, 0), end_pos=(700, 700), width=5)
+        for offset_x, offset_y, width, height in scene["obstacles"]:
+            main.draw_obstacle(surface, ground_x + offset_x, ground_y + offset_y, width, height, main.COLOUR_OBSTACLE)
+        main.draw_manipulator(surface, ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2, main.COLOUR_LINK1, main.COLOUR_LINK2)
+        main.draw_configuration_space(surface, cspace_grid)
+        main.draw_goal_point_in_cs(surface, 5*math.pi/6, 7*math.pi/4, main.COLOUR_GOAL, cspace_grid)
+        main.draw_current_point_in_cs(surface, theta_1, theta_2, main.COLOUR_LINK1, cspace_grid)
+        frame_times.append(time.perf_counter() - start_time)
+    return summarise(surface_times), summarise(frame_times, p95_seconds=float(np.percentile(frame_times, 95)))
+
+# A function to describe the machine and the commit the results were measured on
+def create_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPOSITORY_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()}
+
+# A function to run the whole suite, returns the results keyed by benchmark name
+def run_suite(resolutions, obstacle_counts, repeat, shapely_min_resolution, collision_checks):
+    rng = random.Random(1)
+    configurations = [(rng.uniform(0, 2*math.pi), rng.uniform(0, 2*math.pi)) for _ in range(collision_checks)]
+    results = {}
+    for number_of_obstacles in obstacle_counts:
+        obstacles = create_random_obstacles(number_of_obstacles, min_distance=130, max_distance=300, min_size=40, max_size=130)
+        for cs_resolution in resolutions:
+            scene = create_scene(cs_resolution=cs_resolution, obstacles=obstacles)
+            for backend in ("vectorized", "quadtree", "shapely"):
+                if backend == "shapely" and cs_resolution < shapely_min_resolution:
+                    continue
+                name = "grid/" + backend + "/res=" + str(cs_resolution) + "/obstacles=" + str(number_of_obstacles)
+                results[name] = bench_grid(scene, backend, 1 if backend == "shapely" else repeat)
+                print(format(name, "45s"), format(results[name]["seconds"]*1000, "10.2f"), "ms", format(results[name]["cells_per_second"], "14,.0f"), "cells/s",
+                      format(results[name]["peak_mb"], "8.1f"), "MB peak")
+
+            surface_result, frame_result = bench_render(scene, create_configuration_space(scene), configurations[:200])
+            for name, result in (("render/cspace_surface/res=" + str(cs_resolution) + "/obstacles=" + str(number_of_obstacles), surface_result),
+                                 ("render/frame/res=" + str(cs_resolution) + "/obstacles=" + str(number_of_obstacles), frame_result)):
+                results[name] = result
+                print(format(name, "45s"), format(result["seconds"]*1000, "10.3f"), "ms")
+
+        scene = create_scene(obstacles=obstacles)
+        for engine in ("shapely", "vectorized"):
+            name = "collision/" + engine + "/obstacles=" + str(number_of_obstacles)
+            results[name] = bench_collision(scene, engine, configurations)
+            print(format(name, "45s"), format(results[name]["seconds"]*1e6, "10.1f"), "us per configuration")
+        name = "collision/vectorized_batch/obstacles=" + str(number_of_obstacles)
+        results[name] = bench_collision_batch(scene, configurations, repeat)
+        print(format(name, "45s"), format(results[name]["seconds"]*1e6, "10.1f"), "us per configuration")
+    return results
+
+# A function to compare two saved results, benchmarks that take more than threshold longer, or use more than threshold more peak memory, are regressions
+# Returns the list of regressions
+def compare_results(baseline, current, threshold):
+    regressions = []
+    print(format("benchmark", "45s"), format("baseline", ">12s"), format("current", ">12s"), format("change", ">8s"))
+    for name in current["results"]:
+        if name not in baseline["results"]:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            old, new = baseline["results"][name].get(metric), current["results"][name].get(metric)
+            if old is None or new is None or old <= 0:
+                continue
+            change = new/old - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, metric, change))
+            elif change < -threshold:
+                flag = "  improved"
+            label = name if metric == "seconds" else name + " (peak MB)"
+            print(format(label, "45s"), format(old, "12.6g"), format(new, "12.6g"), format(100*change, "+7.1f") + "%" + flag)
+    print(len(regressions), "regression(s) over", format(100*threshold, ".0f") + "%", "between", baseline["metadata"].get("commit"), "and", current["metadata"].get("commit"))
+    return regressions
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite of configuration space construction, collision checks and rendering")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file for the results (default: bench_results.json)")
+    parser.add_argument("--baseline", help="saved results to compare the new results to")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="only compare two saved results")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown flagged as a regression (default: 0.15)")
+    parser.add_argument("--resolutions", type=float, nargs="+", default=[0.1, 0.05, 0.01], help="cs_resolution values in radians (default: 0.1 0.05 0.01)")
+    parser.add_argument("--obstacles", type=int, nargs="+", default=[1, 2, 4, 8], help="obstacle counts (default: 1 2 4 8)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every grid benchmark, the median is reported (default: 5)")
+    parser.add_argument("--shapely-min-resolution", type=float, default=0.05, help="finest resolution for the slow shapely engine (default: 0.05)")
+    parser.add_argument("--collision-checks", type=int, default=2000, help="configurations for the collision benchmark (default: 2000)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as file:
+            baseline = json.load(file)
+        with open(args.compare[1]) as file:
+            current = json.load(file)
+        return 1 if compare_results(baseline, current, args.threshold) else 0
+
+    current = {"metadata": create_metadata()}
+    current["results"] = run_suite(args.resolutions, args.obstacles, args.repeat, args.shapely_min_resolution, args.collision_checks)
+    try:
+        import resource
+        # Linux reports kilobytes and macOS bytes
+        current["metadata"]["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/(1e6 if sys.platform == "darwin" else 1e3)
+    except ImportError:
+        pass
+    with open(args.output, "w") as file:
+        json.dump(current, file, indent=2)
+    print("Results written to", args.output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        return 1 if compare_results(baseline, current, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,153 @@
+# Command line entry point to compute configuration spaces and plans for a batch of scenes without a display
+# Reads scene descriptions from a JSON or NPZ file, and writes the grid of every scene, and the path if the scene has a start and a goal, as .npy files
+# Run from the repository folder: python cli.py scenes.json --output results
+#
+# A JSON file holds a list of scenes, or {"scenes": [...]}. Every scene is a dict of the settings of scene.DEFAULT_SCENE it changes, for example
+#   [{"name": "low", "obstacles": [[0, -300, 120, 80]], "start": [0.52, 0.79], "goal": [2.62, 5.50]}, {"cs_resolution": 0.05}]
+# An NPZ file holds one array per setting with one entry per scene along the first axis, e.g. obstacles of shape (scenes, obstacles, 4)
+# and start of shape (scenes, 2), arrays without a scene axis, such as a single cs_resolution, apply to every scene.
+# Scenes with fewer obstacles fill the rest of their rows of obstacles with NaN
+#
+# Scenes with more than 2 links have no configuration space grid, they are only planned with the sampling based planners, --planner rrt or prm
+import argparse
+import collections
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scene import create_scene, create_scene_key, create_configuration_space, plan_motion, plan_sampling_motion, find_trajectory_collision, create_timed_trajectory
+from cspace import format_broad_phase_stats
+from quadtree_cspace import format_quadtree_stats
+from cspace_cache import CSpaceCache
+from planner import WavefrontPlanner
+
+# Number of dimensions of every scene setting in an NPZ file, without the scene axis
+SETTING_DIMENSIONS = {"ground": 1, "link_lengths": 1, "joint_limits": 1, "obstacles": 2, "start": 1, "goal": 1}
+
+# A function to read the scene descriptions of a JSON or NPZ file and fill them in with the default scene
+# Scenes without a name are named after their position in the file
+def load_scenes(path):
+    if path.endswith(".npz"):
+        with np.load(path) as arrays:
+            settings = {name: arrays[name] for name in arrays.files}
+        # An array has a scene axis if it has one more dimension than its setting
+        scene_axis_lengths = {len(array) for name, array in settings.items() if array.ndim > SETTING_DIMENSIONS.get(name, 0)}
+        if len(scene_axis_lengths) > 1:
+            raise ValueError("The arrays of " + path + " have different numbers of scenes: " + str(sorted(scene_axis_lengths)))
+        number_of_scenes = scene_axis_lengths.pop() if scene_axis_lengths else 1
+        scenes = []
+        for k in range(number_of_scenes):
+            scene = {name: (array[k] if array.ndim > SETTING_DIMENSIONS.get(name, 0) else array).tolist() for name, array in settings.items()}
+            # Scenes with fewer obstacles than others fill the rest of their obstacles array with NaN
+            if "obstacles" in scene:
+                scene["obstacles"] = [obstacle for obstacle in scene["obstacles"] if not any(math.isnan(value) for value in obstacle)]
+            scenes.append(scene)
+    else:
+        with open(path) as file:
+            scenes = json.load(file)
+        if isinstance(scenes, dict):
+            scenes = scenes["scenes"]
+
+    width = len(str(len(scenes) - 1))
+    return [create_scene(scene, name=scene.get("name", "scene_" + str(k).zfill(width))) for k, scene in enumerate(scenes)]
+
+# A function to compute the grid and the plan of one scene and write them to the output folder, runs in the worker processes with --workers
+# Scenes with more than 2 links have no grid and are planned with the rrt or prm planner
+# If timing is a (max_velocity, max_acceleration) pair, the path is also shortened and timed under these joint limits
+# Returns a summary of the scene for results.json
+def run_scene(scene, output_dir, backend, planner, clearance_weight, cache_dir, seed=None, timing=None):
+    summary = {"name": scene["name"], "grid": None}
+    sampling_planner = planner in ("rrt", "prm")
+    if len(scene["link_lengths"]) != 2 and not sampling_planner:
+        raise ValueError("Scene " + scene["name"] + " has " + str(len(scene["link_lengths"])) + " links, plan it with --planner rrt or prm")
+
+    if len(scene["link_lengths"]) == 2:
+        start_time = time.perf_counter()
+        cspace_cache = CSpaceCache(cache_dir) if cache_dir is not None else None
+        cspace_grid = cspace_cache.get(create_scene_key(scene)) if cspace_cache is not None else None
+        summary["cached"] = cspace_grid is not None
+        if cspace_grid is None:
+            stats = collections.Counter()
+            cspace_grid = create_configuration_space(scene, backend, stats)
+            if stats:
+                summary["broad_phase"] = format_quadtree_stats(stats) if backend == "quadtree" else format_broad_phase_stats(stats)
+            if cspace_cache is not None:
+                cspace_cache.put(create_scene_key(scene), cspace_grid)
+        summary["grid_seconds"] = time.perf_counter() - start_time
+
+        # The grid is saved as uint8, it only holds 1s for obstacles and 0s for free grid points
+        grid_path = os.path.join(output_dir, scene["name"] + ".grid.npy")
+        np.save(grid_path, cspace_grid.astype(np.uint8))
+        summary["grid"] = grid_path
+        summary["free_fraction"] = float(np.mean(cspace_grid == 0))
+
+    if scene["start"] is not None and scene["goal"] is not None:
+        start_time = time.perf_counter()
+        if sampling_planner:
+            theta_trajectory = plan_sampling_motion(scene, scene["start"], scene["goal"], planner, seed)
+        else:
+            theta_1, theta_2 = (theta % (2*math.pi) for theta in scene["start"])
+            goal_theta_1, goal_theta_2 = (theta % (2*math.pi) for theta in scene["goal"])
+            theta_trajectory = plan_motion(cspace_grid, theta_1, theta_2, goal_theta_1, goal_theta_2, WavefrontPlanner(clearance_weight) if planner == "wavefront" else planner)
+        summary["plan_seconds"] = time.perf_counter() - start_time
+        summary["path"] = None
+        if theta_trajectory is not None:
+            summary["path"] = os.path.join(output_dir, scene["name"] + ".path.npy")
+            summary["path_points"] = len(theta_trajectory)
+            np.save(summary["path"], theta_trajectory)
+            # Grid paths can cut through obstacles between their rows at coarse resolutions, the first colliding segment is None if the whole path is free
+            summary["first_collision"] = find_trajectory_collision(scene, theta_trajectory)
+            # The timed path has a row of [time, theta_1, theta_2, ...] every 10 ms
+            if timing is not None:
+                times, timed_trajectory = create_timed_trajectory(scene, theta_trajectory, *timing)
+                summary["timed_path"] = os.path.join(output_dir, scene["name"] + ".timed.npy")
+                summary["duration"] = float(times[-1])
+                np.save(summary["timed_path"], np.column_stack([times, timed_trajectory]))
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute configuration space grids and motion plans for a batch of scenes without a display")
+    parser.add_argument("scenes", help="JSON or NPZ file of scene descriptions")
+    parser.add_argument("-o", "--output", default="results", help="folder for the .npy grids and paths and results.json (default: results)")
+    parser.add_argument("--backend", default="vectorized", choices=["vectorized", "quadtree", "tiled", "shapely"], help="configuration space engine, tiled computes every grid with a pool of one process per core (default: vectorized)")
+    parser.add_argument("--planner", default="astar", choices=["astar", "dijkstra", "wavefront", "rrt", "prm"], help="motion planner for scenes with a start and a goal, rrt and prm also plan scenes with more than 2 links (default: astar)")
+    parser.add_argument("--clearance-weight", type=float, default=0.0, help="how strongly the wavefront planner keeps away from obstacles (default: 0)")
+    parser.add_argument("--cache-dir", default=None, help="folder of the configuration space cache, no cache by default")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes, each computes whole scenes (default: 1)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the rrt and prm planners, for repeatable paths")
+    parser.add_argument("--timed", action="store_true", help="also shorten every path with collision free shortcuts and write it timed under the joint limits as <name>.timed.npy")
+    parser.add_argument("--max-velocity", type=float, default=1.5, help="joint velocity limit of --timed in rad/s (default: 1.5)")
+    parser.add_argument("--max-acceleration", type=float, default=3.0, help="joint acceleration limit of --timed in rad/s^2 (default: 3.0)")
+    args = parser.parse_args(argv)
+
+    scenes = load_scenes(args.scenes)
+    os.makedirs(args.output, exist_ok=True)
+    scene_args = (args.output, args.backend, args.planner, args.clearance_weight, args.cache_dir, args.seed, (args.max_velocity, args.max_acceleration) if args.timed else None)
+
+    start_time = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            summaries = list(executor.map(run_scene, scenes, *[[arg]*len(scenes) for arg in scene_args]))
+    else:
+        summaries = [run_scene(scene, *scene_args) for scene in scenes]
+
+    for summary in summaries:
+        line = summary["name"] + ": " + ("grid " + format(summary["grid_seconds"], ".3f") + " s" + (" (cached)" if summary["cached"] else "") if summary["grid"] else "no grid")
+        if "plan_seconds" in summary:
+            line += ", " + ("path of " + str(summary["path_points"]) + " points" if summary["path"] else "no path") + " in " + format(summary["plan_seconds"], ".3f") + " s"
+            if summary.get("first_collision") is not None:
+                line += ", collides in segment " + str(summary["first_collision"])
+            if "duration" in summary:
+                line += ", " + format(summary["duration"], ".2f") + " s of motion"
+        print(line)
+    print(len(scenes), "scenes in", format(time.perf_counter() - start_time, ".2f"), "s, results in", args.output)
+
+    with open(os.path.join(args.output, "results.json"), "w") as file:
+        json.dump(summaries, file, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
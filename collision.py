@@ -0,0 +1,192 @@
+import numpy as np
+import math
+
+# A function to compute the four corners of a rectangular link for a whole batch of joint angles at once
+# start_x, start_y and theta can be numpy arrays of any broadcastable shape, the corners are returned with shape (..., 4, 2)
+# Uses the same corner order and arithmetic as create_manipulator_polygons, so the rectangles are identical to the shapely ones
+def link_corners(start_x, start_y, link_length, half_width, theta):
+    sin_theta, cos_theta = np.sin(theta), np.cos(theta)
+    delta_x, delta_y = link_length*cos_theta, -link_length*sin_theta  # negative sign for flipped y axis in pygame
+
+    corners_x = np.stack([
+        start_x - half_width * sin_theta,
+        start_x + half_width * sin_theta,
+        start_x + delta_x + half_width * sin_theta,
+        start_x + delta_x - half_width * sin_theta
+    ], axis=-1)
+    corners_y = np.stack([
+        start_y - half_width * cos_theta,
+        start_y + half_width * cos_theta,
+        start_y + delta_y + half_width * cos_theta,
+        start_y + delta_y - half_width * cos_theta
+    ], axis=-1)
+    # The end point of the centreline, which is the start point of the next link in the chain
+    return np.stack([corners_x, corners_y], axis=-1), start_x + delta_x, start_y + delta_y
+
+# A function to compute the corners of both links of a 2link RR manipulator for a whole batch of joint angles at once
+# theta_1 and theta_2 can be numpy arrays of any broadcastable shape, e.g. theta_1[None, :] and theta_2[:, None] for a full grid
+def manipulator_corners(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2):
+    corners_1, end_x, end_y = link_corners(ground_x, ground_y, link_length_1, half_width, theta_1)
+    corners_2, _, _ = link_corners(end_x, end_y, link_length_2, half_width, theta_1 + theta_2)
+    return corners_1, corners_2
+
+# A function to compute the corners of every link of an N-link planar chain for a whole batch of joint angles at once
+# thetas is an array of shape (..., N) of the joint angles, each relative to the previous link like theta_2, the corners are returned with shape (..., N, 4, 2)
+# Forward kinematics of the whole batch is one cumulative sum of the joint angles, the links are then independent rectangles
+def chain_corners(ground_x, ground_y, link_lengths, half_width, thetas):
+    thetas = np.asarray(thetas, dtype=float)
+    link_angles = np.cumsum(thetas, axis=-1)
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    # The start point of every link is the end point of the centreline of the previous link, the first link starts at the ground
+    delta_x, delta_y = link_lengths*np.cos(link_angles), -link_lengths*np.sin(link_angles)  # negative sign for flipped y axis in pygame
+    start_x = ground_x + np.concatenate([np.zeros_like(delta_x[..., :1]), np.cumsum(delta_x[..., :-1], axis=-1)], axis=-1)
+    start_y = ground_y + np.concatenate([np.zeros_like(delta_y[..., :1]), np.cumsum(delta_y[..., :-1], axis=-1)], axis=-1)
+    corners, _, _ = link_corners(start_x, start_y, link_lengths, half_width, link_angles)
+    return corners
+
+# A function to shrink a batch of link rectangles by a distance on every side, for rectangles given by their corners in the order of link_corners
+# distance is an array with one distance per rectangle, negative distances grow the rectangles instead
+# Returns the shrunk rectangles, and False for the rectangles that would vanish
+def shrink_link_rectangles(corners, distance):
+    start = (corners[..., 0, :] + corners[..., 1, :])/2
+    end = (corners[..., 2, :] + corners[..., 3, :])/2
+    length = np.linalg.norm(end - start, axis=-1)
+    half_width = np.linalg.norm(corners[..., 1, :] - corners[..., 0, :], axis=-1)/2
+    along = (end - start)/np.maximum(length, 1e-12)[..., None]
+    across = (corners[..., 1, :] - corners[..., 0, :])/np.maximum(2*half_width, 1e-12)[..., None]
+
+    shrunk_half_width = (half_width - distance)[..., None]
+    shrunk_start, shrunk_end = start + distance[..., None]*along, end - distance[..., None]*along
+    shrunk = np.stack([shrunk_start - shrunk_half_width*across, shrunk_start + shrunk_half_width*across,
+                       shrunk_end + shrunk_half_width*across, shrunk_end - shrunk_half_width*across], axis=-2)
+    return shrunk, (shrunk_half_width[..., 0] > 0) & (length > 2*distance)
+
+# Separating axis test between batches of convex polygons, each given as a (..., K, 2) array of corner points
+# The batch dimensions of both polygons are broadcast against each other, so one obstacle can be tested against a whole grid of links
+# Returns a boolean array that is True where the polygons intersect, touching polygons count as intersecting like shapely's intersects
+def convex_polygons_intersect(polygon_a, polygon_b):
+    polygon_a, polygon_b = np.asarray(polygon_a, dtype=float), np.asarray(polygon_b, dtype=float)
+    batch_shape = np.broadcast_shapes(polygon_a.shape[:-2], polygon_b.shape[:-2])
+
+    # The polygons are separated if the projections on any edge normal of either polygon do not overlap, all normals are projected on at once
+    normals = np.concatenate([np.broadcast_to(normals, batch_shape + normals.shape[-2:]) for normals in (edge_normals(polygon_a), edge_normals(polygon_b))], axis=-2)
+    lowest_a, highest_a = projection_interval(polygon_a, normals)
+    lowest_b, highest_b = projection_interval(polygon_b, normals)
+    return ~((highest_a < lowest_b) | (highest_b < lowest_a)).any(axis=-1)
+
+# A function to get the normals of the edges of a batch of polygons given as a (..., K, 2) array of corner points, the normal of the edge from corner k is number k
+def edge_normals(polygon):
+    edges = np.roll(polygon, -1, axis=-2) - polygon
+    return np.stack([-edges[..., 1], edges[..., 0]], axis=-1)
+
+# A function to get the lowest and highest projection of the corners of a batch of polygons onto a batch of (..., axes, 2) normals, as (..., axes) arrays
+# The projections are reduced corner by corner with elementwise minimum and maximum, which numpy does much faster than a reduction along the short corner axis
+def projection_interval(polygon, normals):
+    lowest = highest = None
+    for k in range(polygon.shape[-2]):
+        projection = polygon[..., k, 0, None]*normals[..., 0] + polygon[..., k, 1, None]*normals[..., 1]
+        lowest = projection if lowest is None else np.minimum(lowest, projection)
+        highest = projection if highest is None else np.maximum(highest, projection)
+    return lowest, highest
+
+# A function to get the centre and radius of a circle around a convex obstacle, used by the broad phase
+def bounding_circle(obstacle_corners):
+    obstacle_corners = np.asarray(obstacle_corners, dtype=float)
+    centre_x, centre_y = obstacle_corners.mean(axis=0)
+    radius = np.max(np.hypot(obstacle_corners[:, 0] - centre_x, obstacle_corners[:, 1] - centre_y))
+    return centre_x, centre_y, radius
+
+# A function to get the radius of a circle inside a convex obstacle around a centre point within it, e.g. the centre of bounding_circle
+# The radius is the distance from the centre to the nearest edge line, edges of length 0 from repeated corners are left out
+def inscribed_radius(obstacle_corners, centre_x, centre_y):
+    obstacle_corners = np.asarray(obstacle_corners, dtype=float)
+    edges = np.roll(obstacle_corners, -1, axis=0) - obstacle_corners
+    edge_lengths = np.hypot(edges[:, 0], edges[:, 1])
+    edges, starts = edges[edge_lengths > 0], obstacle_corners[edge_lengths > 0]
+    distances = np.abs(edges[:, 0]*(centre_y - starts[:, 1]) - edges[:, 1]*(centre_x - starts[:, 0]))/edge_lengths[edge_lengths > 0]
+    return float(distances.min()) if len(distances) else 0.0
+
+# A function to get the distance from points to rectangular links, zero for points inside the links
+# The links are given like in link_corners by their start point, length, half width and angle, all arguments can be broadcastable numpy arrays
+def link_point_distance(start_x, start_y, link_length, half_width, theta, point_x, point_y):
+    sin_theta, cos_theta = np.sin(theta), np.cos(theta)
+    # Coordinates of the points along and across the centreline of the link, negative sign for flipped y axis in pygame
+    along = (point_x - start_x)*cos_theta - (point_y - start_y)*sin_theta
+    across = (point_x - start_x)*sin_theta + (point_y - start_y)*cos_theta
+    return np.hypot(np.maximum(np.maximum(-along, along - link_length), 0), np.maximum(np.abs(across) - half_width, 0))
+
+# A function to get the interval of link angles for which a rectangular link rotating about (start_x, start_y) can touch a circle
+# The link is within half_width of its centreline, so it can only touch the circle if the centreline comes within radius + half_width of its centre
+# Returns the centre angle and the half width of the interval, the half width is pi if every angle can touch and negative if none can
+# start_x and start_y can be numpy arrays, e.g. the positions of joint 2 for every theta_1
+def link_reach_interval(start_x, start_y, link_length, half_width, circle_x, circle_y, radius):
+    distance = np.hypot(circle_x - start_x, circle_y - start_y)
+    centre_angle = np.arctan2(-(circle_y - start_y), circle_x - start_x)  # negative sign for flipped y axis in pygame
+    # one pixel of slack so that rounding can never drop an angle at which the link touches the obstacle
+    reach = radius + half_width + 1
+
+    # If the tangent point of the circle is within the link length, the link touches the circle up to the tangent angle,
+    # otherwise only the end of the link can touch it, up to the angle where the end point is on the circle
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tangent_angle = np.arcsin(np.clip(reach/distance, -1, 1))
+        end_point_angle = np.arccos(np.clip((distance**2 + link_length**2 - reach**2)/(2*distance*link_length), -1, 1))
+    half_angle = np.where(distance**2 - reach**2 <= link_length**2, tangent_angle, end_point_angle)
+    half_angle = np.where(distance > link_length + reach, -1.0, half_angle)
+    half_angle = np.where(distance <= reach, math.pi, half_angle)
+    return centre_angle, half_angle
+
+# A function to check which angles are within intervals given by their centre angle and half width, taking the 0 = 2pi wrap into account
+def angle_within_interval(theta, centre_angle, half_angle):
+    return np.abs((theta - centre_angle + math.pi) % (2*math.pi) - math.pi) <= half_angle
+
+# A function to get the signed area of a polygon given as a (K, 2) array of corner points, positive if the corners go anticlockwise in x-y axes
+def polygon_signed_area(points):
+    points = np.asarray(points, dtype=float)
+    x, y = points[:, 0], points[:, 1]
+    return (np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))/2
+
+# A function to check if a polygon is convex, i.e. it turns the same way at every corner, corners in a straight line are allowed
+def is_convex_polygon(points):
+    points = np.asarray(points, dtype=float)
+    edges = np.roll(points, -1, axis=0) - points
+    turns = edges[:, 0]*np.roll(edges[:, 1], -1) - edges[:, 1]*np.roll(edges[:, 0], -1)
+    return bool(np.all(turns >= 0) or np.all(turns <= 0))
+
+# A function to split a simple polygon (no holes, edges do not cross) into triangles by ear clipping
+# Returns a list of (3, 2) arrays that together cover exactly the polygon
+def triangulate_polygon(points):
+    points = np.asarray(points, dtype=float)
+    if polygon_signed_area(points) < 0:
+        points = points[::-1]
+    remaining = list(range(len(points)))
+    triangles = []
+
+    def cross(a, b, c):
+        return (b[0] - a[0])*(c[1] - b[1]) - (b[1] - a[1])*(c[0] - b[0])
+
+    while len(remaining) > 3:
+        for k in range(len(remaining)):
+            corner_indices = [remaining[(k + step) % len(remaining)] for step in (-1, 0, 1)]
+            a, b, c = points[corner_indices]
+            if cross(a, b, c) <= 0:
+                continue
+            # An ear is a convex corner whose triangle holds none of the other corners
+            others = points[[index for index in remaining if index not in corner_indices]]
+            if any(cross(a, b, point) >= 0 and cross(b, c, point) >= 0 and cross(c, a, point) >= 0 for point in others):
+                continue
+            triangles.append(np.array([a, b, c]))
+            del remaining[k]
+            break
+        else:
+            # Only corners in a straight line are left, they add no area
+            break
+    if len(remaining) == 3:
+        triangles.append(points[remaining])
+    return triangles
+
+# A function to split an obstacle into convex pieces for the separating axis test, convex obstacles stay whole and concave ones are triangulated
+def convex_pieces(points):
+    points = np.asarray(points, dtype=float)
+    if is_convex_polygon(points):
+        return [points]
+    return triangulate_polygon(points)
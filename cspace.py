@@ -0,0 +1,137 @@
+import numpy as np
+import math
+import functools
+from collision import link_corners, convex_polygons_intersect, link_reach_interval, link_point_distance
+
+# Number of link 2 separating axis tests evaluated together by the vectorized engine, bounds the memory of the link 2 corner arrays
+CHUNK_TESTS = 65536
+
+# Distance in pixels by which a link must be inside the inner circle of an obstacle piece, or outside its bounding circle, for the circles to settle a test,
+# far above the rounding errors of the coordinates, so that only the tests the circles settle with certainty skip the separating axis test
+CIRCLE_TEST_MARGIN = 1e-6
+
+# A function to check which thetas are within the joint constraints, for a whole array of thetas at once
+# Same condition that the per-cell loop of create_configuration_space uses to bypass theta values
+def joint_limit_mask(theta, lower_lim, upper_lim):
+    return ((theta < upper_lim) & (theta >= 0)) | ((theta > lower_lim) & (theta <= 2*math.pi))
+
+# A function to create the joint constraint layer of the configuration space, True for the thetas that violate the joint constraints
+# The layer only depends on the resolution and the joint limits, so it is cached and shared, it must not be modified
+@functools.lru_cache(maxsize=8)
+def create_joint_limit_layer(cs_resolution, joint_limits):
+    joint_1_lower_lim, joint_1_upper_lim, joint_2_lower_lim, joint_2_upper_lim = joint_limits
+    theta_space = np.arange(0, 2*math.pi, cs_resolution)
+
+    # each column is for a unique theta1, rows along each column for a all the theta2 values
+    within_limits = joint_limit_mask(theta_space, joint_2_lower_lim, joint_2_upper_lim)[:, None] & joint_limit_mask(theta_space, joint_1_lower_lim, joint_1_upper_lim)[None, :]
+    joint_limit_layer = ~within_limits
+    joint_limit_layer.flags.writeable = False
+    return joint_limit_layer
+
+# A function to get the rows of the configuration space grid whose theta_2 puts link 2 within intervals of link 2 angles, for a batch of intervals
+# Every interval is given by its theta_1, centre angle and half width. Returns the interval number and the row of every grid point, with a row of slack
+# on either end, so the rows are a superset of the grid points within the intervals
+def interval_rows(size_of_grid, cs_resolution, theta_1, centre_angle, half_angle):
+    lowest_theta_2 = (centre_angle - half_angle - theta_1) % (2*math.pi)
+    highest_theta_2 = lowest_theta_2 + 2*half_angle
+    # An interval that wraps past 2pi is split into its rows up to the end of the grid and its rows from the start of the grid
+    wraps = highest_theta_2 >= 2*math.pi
+    starts = np.clip(np.floor(lowest_theta_2/cs_resolution).astype(int) - 1, 0, size_of_grid)
+    stops = np.where(wraps, size_of_grid, np.clip(np.floor(highest_theta_2/cs_resolution).astype(int) + 2, 0, size_of_grid))
+    wrapped_stops = np.where(wraps, np.clip(np.floor((highest_theta_2 - 2*math.pi)/cs_resolution).astype(int) + 2, 0, starts), 0)
+    # Intervals of half width pi hold every angle
+    full = half_angle >= math.pi
+    starts[full], stops[full], wrapped_stops[full] = 0, size_of_grid, 0
+
+    starts = np.concatenate([starts, np.zeros_like(starts)])
+    counts = np.concatenate([stops, wrapped_stops]) - starts
+    interval_numbers = np.tile(np.arange(len(theta_1)), 2)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(interval_numbers, counts), np.repeat(starts, counts) + offsets
+
+# A function to create the configuration space layer of a set of obstacles, True for the thetas where either link of the manipulator hits any of them
+# obstacle_index is an ObstacleIndex of the obstacles. Link 1 only depends on theta_1, so the index finds the obstacles near link 1 once per column.
+# For link 2, the index finds the obstacles within reach of joint 2 for every column, and the bounding circle of each of them gives the theta_2 interval
+# where link 2 can touch it. Only these candidate grid points go to the exact separating axis test, and a grid point that already hits one obstacle
+# is not tested against the others, so many obstacles that cover the same grid points cost little more than one
+# columns selects a range of theta_1 columns, so that the grid can also be computed in tiles, by default the whole layer is computed
+# If stats is a collections.Counter, the broad phase counters are added to it: the theta_1 columns where the bounding box of link 1 overlaps the bounding box
+# of an obstacle, which are the only columns where link 1 is tested exactly, and the grid points where link 2 is tested or pruned
+def create_obstacle_layer(cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_index, columns=slice(None), stats=None):
+    theta_space = np.arange(0, 2*math.pi, cs_resolution)
+    theta_1_space = theta_space[columns]
+    obstacle_layer = np.zeros((len(theta_space), len(theta_1_space)), dtype=bool)
+
+    # Link 1 is checked once per column, against the obstacles whose bounding boxes overlap its own
+    corners_1, joint_2_x, joint_2_y = link_corners(ground_x, ground_y, link_length_1, half_width, theta_1_space)
+    link1_hits = obstacle_index.polygons_hit(corners_1)
+    obstacle_layer[:, link1_hits] = True
+
+    # Link 2 can only reach obstacles that overlap the square around joint 2 that holds every angle of link 2
+    reach = link_length_2 + half_width + 1
+    band = np.flatnonzero(~link1_hits)
+    pair_columns, pair_pieces = obstacle_index.query_boxes(joint_2_x[band] - reach, joint_2_y[band] - reach, joint_2_x[band] + reach, joint_2_y[band] + reach)
+    pair_columns = band[pair_columns]
+    centre_angle, half_angle = link_reach_interval(joint_2_x[pair_columns], joint_2_y[pair_columns], link_length_2, half_width,
+                                                   obstacle_index.circle_x[pair_pieces], obstacle_index.circle_y[pair_pieces], obstacle_index.circle_radius[pair_pieces])
+    reachable = half_angle >= 0
+    pair_columns, pair_pieces, centre_angle, half_angle = pair_columns[reachable], pair_pieces[reachable], centre_angle[reachable], half_angle[reachable]
+
+    # The candidate (grid point, piece) tests, sorted so that every grid point tries the largest pieces first
+    pair_numbers, rows = interval_rows(len(theta_space), cs_resolution, theta_1_space[pair_columns], centre_angle, half_angle)
+    test_columns, test_pieces = pair_columns[pair_numbers], pair_pieces[pair_numbers]
+    cells = rows*len(theta_1_space) + test_columns
+    order = np.lexsort((-obstacle_index.circle_radius[test_pieces], cells))
+    rows, test_columns, test_pieces, cells = rows[order], test_columns[order], test_pieces[order], cells[order]
+    # The rank of every test among the tests of its grid point, the tests are run in rounds of one rank, skipping grid points that already hit
+    first_test = np.r_[True, cells[1:] != cells[:-1]]
+    rank = np.arange(len(cells)) - np.maximum.accumulate(np.where(first_test, np.arange(len(cells)), 0))
+    order = np.argsort(rank, kind="stable")
+    round_sizes = np.bincount(rank) if len(rank) else np.zeros(0, dtype=int)
+
+    # Every candidate grid point has one test in the first round
+    link2_tested = int(round_sizes[0]) if len(round_sizes) else 0
+    round_start = 0
+    for round_size in round_sizes:
+        tests = order[round_start:round_start + round_size]
+        round_start += round_size
+        tests = tests[~obstacle_layer[rows[tests], test_columns[tests]]]
+        for start in range(0, len(tests), CHUNK_TESTS):
+            chunk = tests[start:start + CHUNK_TESTS]
+            chunk_rows, chunk_columns, chunk_pieces = rows[chunk], test_columns[chunk], test_pieces[chunk]
+            link_angles = theta_1_space[chunk_columns] + theta_space[chunk_rows]
+            # Link 2 hits the piece if it comes within the inner circle of the piece, and misses it if it stays outside the bounding circle,
+            # only the links in between go to the separating axis test
+            distances = link_point_distance(joint_2_x[chunk_columns], joint_2_y[chunk_columns], link_length_2, half_width, link_angles,
+                                            obstacle_index.circle_x[chunk_pieces], obstacle_index.circle_y[chunk_pieces])
+            hits = distances < obstacle_index.inner_radius[chunk_pieces] - CIRCLE_TEST_MARGIN
+            undecided = np.flatnonzero(~hits & (distances <= obstacle_index.circle_radius[chunk_pieces] + CIRCLE_TEST_MARGIN))
+            corners_2, _, _ = link_corners(joint_2_x[chunk_columns[undecided]], joint_2_y[chunk_columns[undecided]], link_length_2, half_width, link_angles[undecided])
+            hits[undecided] = convex_polygons_intersect(corners_2, obstacle_index.pieces[chunk_pieces[undecided]])
+            obstacle_layer[chunk_rows, chunk_columns] |= hits
+
+    if stats is not None:
+        link2_cells = len(theta_space)*int(np.count_nonzero(~link1_hits))
+        link1_candidates = len(np.unique(obstacle_index.query_boxes(corners_1[..., 0].min(axis=-1), corners_1[..., 1].min(axis=-1), corners_1[..., 0].max(axis=-1), corners_1[..., 1].max(axis=-1))[0]))
+        stats["link_1_box_candidates"] += link1_candidates
+        stats["link_1_box_pruned"] += len(theta_1_space) - link1_candidates
+        stats["link_2_cells_tested"] += link2_tested
+        stats["link_2_cells_pruned"] += link2_cells - link2_tested
+
+    return obstacle_layer
+
+# A function to describe the broad phase counters collected by create_obstacle_layer in one line
+def format_broad_phase_stats(stats):
+    link1_columns = stats["link_1_box_candidates"] + stats["link_1_box_pruned"]
+    link2_cells = stats["link_2_cells_tested"] + stats["link_2_cells_pruned"]
+    return ("Broad phase: link 1 overlaps obstacle bounding boxes in " + str(stats["link_1_box_candidates"]) + " of " + str(link1_columns) + " columns, "
+            + "link 2 tested " + str(stats["link_2_cells_tested"]) + " of " + str(link2_cells) + " cells ("
+            + format(100*stats["link_2_cells_pruned"]/max(link2_cells, 1), ".1f") + "% pruned)")
+
+# A function to combine the joint constraint layer and the obstacle layers into a configuration space grid map
+# A grid point is an obstacle (1) if it is occupied in any of the layers, and free (0) otherwise
+def combine_layers(joint_limit_layer, obstacle_layers):
+    occupied = joint_limit_layer.copy()
+    for obstacle_layer in obstacle_layers:
+        occupied |= obstacle_layer
+    return occupied.astype(int)
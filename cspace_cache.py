@@ -0,0 +1,109 @@
+import numpy as np
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+# Increase when the layout of the cache files or the meaning of the grid changes, so that old files are never loaded
+CACHE_FORMAT_VERSION = 1
+
+# A function to get the cache key of a scene: a hash of every input that changes the configuration space grid
+# scene_params is a dict of numbers, strings and lists of them, e.g. link lengths, obstacle centres and sizes, joint limits and resolution
+def scene_key(scene_params):
+    text = json.dumps({"version": CACHE_FORMAT_VERSION, "scene": scene_params}, sort_keys=True, default=lambda value: np.asarray(value).tolist())
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# A function to pack a square grid of 0s and 1s into bits, each row of the grid becomes a row of bytes
+def pack_grid(cspace_grid):
+    return np.packbits(np.asarray(cspace_grid, dtype=bool), axis=1)
+
+# A function to unpack a grid packed by pack_grid, into the same integer grid the configuration space builders return
+def unpack_grid(packed_grid):
+    return np.unpackbits(packed_grid, axis=1, count=packed_grid.shape[0]).astype(int)
+
+# A cache of configuration space grids, keyed by scene_key
+# Grids are stored bit-packed as .npy files that are memory mapped when loaded, and unpacked straight from the mapped file,
+# with a small in-memory LRU of packed grids in front that holds the mapped files of loaded grids and the packed grids of stored ones.
+# When the files take more than max_bytes, the least recently used files are deleted
+class CSpaceCache:
+    def __init__(self, cache_dir, max_bytes=256*1024*1024, memory_entries=16):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = collections.OrderedDict()
+
+    # Path of the file of a cache key
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    # Get the grid of a cache key, or None if the scene has not been computed before
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return unpack_grid(self.memory[key])
+
+        path = self.path(key)
+        try:
+            # Only the header is read here, the bits are read from the mapped file while they are unpacked
+            mapped_grid = np.load(path, mmap_mode="r")
+            if mapped_grid.ndim != 2 or mapped_grid.shape[1] != (mapped_grid.shape[0] + 7)//8:
+                raise ValueError("not a packed square grid")
+            # The modification time of a file is its last use, for the least recently used eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # A damaged file, e.g. from a crash while writing it, is treated like a missing one
+            self.remove(path)
+            return None
+
+        self.remember(key, mapped_grid)
+        return unpack_grid(mapped_grid)
+
+    # Store the grid of a cache key in memory and on disk
+    def put(self, key, cspace_grid):
+        packed_grid = pack_grid(cspace_grid)
+        self.remember(key, packed_grid)
+
+        # Write to a temporary file first and then rename it, so that other processes never see a half written file
+        os.makedirs(self.cache_dir, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.save(file, packed_grid)
+            os.replace(temp_path, self.path(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    # Keep a packed grid in the in-memory LRU, dropping the least recently used grid when it is full
+    def remember(self, key, packed_grid):
+        self.memory[key] = packed_grid
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    # Delete the least recently used files until the cache takes at most max_bytes on disk
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self.remove(path)
+            total_bytes -= size
+
+    # Delete a cache file, ignoring files that were already deleted
+    # Its grid is dropped from the in-memory LRU too, which also closes the mapped file if the grid was loaded from it
+    def remove(self, path):
+        self.memory.pop(os.path.basename(path)[:-len(".npy")], None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
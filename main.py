@@ -1,13 +1,25 @@
 import pygame
 import numpy as np
 import math
+import collections
+import os
+import time
 from shapely.geometry import Polygon
-
-# Initialize the pygame 
-pygame.init()
-
-# Setup a clock
-clock = pygame.time.Clock()
+from cspace import combine_layers, format_broad_phase_stats
+from quadtree_cspace import format_quadtree_stats
+from tiled_cspace import TiledCSpaceBuild, create_tile_executor, release_retired_builds
+from cspace_cache import CSpaceCache
+from planner import WavefrontPlanner
+from sampling_planner import LazyPRM
+from profiling import Profiler
+from scene import convert_to_two_pi_range, create_manipulator_polygons, create_obstacle_polygon
+from scene import create_scene, create_scene_key, create_obstacle_corners, create_obstacle_index, create_scene_obstacle_layer, create_scene_joint_limit_layer
+from scene import create_configuration_space as create_scene_configuration_space, plan_motion as plan_scene_motion
+from scene import plan_sampling_motion, create_scene_collision_checker, create_scene_obstacle_table
+from trajectory_validation import first_colliding_segment
+from trajectory_smoothing import shortcut_path, time_parameterise, sample_timed_trajectory
+
+# Set the frame rate of the simulation
 fps = 60
 
 # Set the dimensions in pixels of the pygame screen
@@ -19,6 +31,47 @@ PIXELS_PER_GRIDPOINT = 8
 
 # Set the resolution / Step size of the configuration space
 cs_resolution = 0.1
+# Set the engine used to compute the configuration space
+# "vectorized" checks the whole grid at once with numpy, "shapely" checks every grid point with shapely polygons and is kept as a reference
+# "tiled" computes the grid in the background with a process pool, the plot fills in tile by tile while the simulation keeps running
+# "quadtree" only refines the grid near the boundaries of the obstacles and fills in the rest from large free and occupied cells
+cs_backend = "vectorized"
+# Set the number of worker processes of the "tiled" engine, None for one per core
+cs_workers = None
+# Set the folder where computed configuration spaces are cached between runs, None to disable the cache
+# and the maximum size of the cache in megabytes, the least recently used grids are deleted when it grows larger
+cs_cache_dir = ".cspace_cache"
+cs_cache_max_mb = 256
+# Set whether the configuration space layers of the movable obstacles are precomputed, with the "vectorized" engine, for every centre offset on a lattice of
+# obstacle_table_step pixels up to obstacle_table_reach pixels from the ground on both axes, so that moving them with 4/5/6/8 only looks up a layer
+# The table is built once with cs_workers processes and kept memory mapped in the obstacle_tables folder of cs_cache_dir, later runs load it
+obstacle_table = False
+obstacle_table_step = 10
+obstacle_table_reach = 350
+
+# Set the motion planner used when G is pressed
+# "wavefront" keeps the distance of every grid point to the goal, so the path from the current configuration is shown live in the c-space plot
+# and is found instantly, the distances are only computed again when the configuration space grid or the goal changes
+# "astar" searches the configuration space grid for the shortest path from the current configuration to the goal, "dijkstra" does the same search without a heuristic,
+# they search the grid again for every plan, which at cs_resolution = 0.01 takes longer than a frame, while "wavefront" plans within a frame (benchmarks/bench_planner.py)
+# "rrt" and "prm" plan without the grid with the sampling based planners of sampling_planner.py, which also plan for arms with more joints,
+# "prm" keeps its roadmap for the next plans while the obstacles stay in place
+# "demo" replays the pre-computed trajectory in demo_trajectory.npy
+motion_planner = "wavefront"
+# Set how strongly the "wavefront" planner keeps away from obstacles, 0 for the shortest paths
+planner_clearance_weight = 0.0
+# Set whether trajectories are checked for collisions between their rows, the shown plan every frame while the obstacles move and every plan before it is played back,
+# which stops before the first colliding segment. The motions are checked like the motions of the sampling based planners, only where the links hit an obstacle
+validate_trajectories = True
+# Set the joint velocity and acceleration limits of the playback in rad/s and rad/s^2, one value for both joints or a list with one value per joint
+# Plans are shortened with collision free shortcuts before they are played back, and played back in real time under these limits
+max_joint_velocity = 1.5
+max_joint_acceleration = 3.0
+
+# Set whether the frame rate and the p50/p95 latencies of the grid build, collision check, rendering and planning are shown, P toggles it while running
+# and the .csv or .json file the timing samples are written to when the simulation is closed, None to not write them
+profile_overlay = False
+profile_output = None
 
 # provide the colour channels of various objects in the simulation
 COLOUR_LINK1 = (21, 94, 149)
@@ -30,6 +83,8 @@ COLOUR_SCREEN = (251, 251, 251)
 COLOUR_OBSTACLE =  (249, 110, 42)
 COLOUR_TEXT =  (40, 40, 40)
 COLOUR_GOAL = (0, 128, 0)
+COLOUR_PATH = (120, 190, 120)
+COLOUR_PATH_COLLISION = (210, 0, 0)
 
 # provide the lengths and the width of the rectangular links in pixels
 link_length_1, link_length_2 = 200, 100
@@ -56,35 +111,13 @@ obs_centre_offset_y1 = -300
 obs_centre_offset_x2 = 0
 obs_centre_offset_y2 = 200
 
-# Setup a pygame screen at the given screen sizes
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-
-# A function to convert any value of theta to its positive equivalent in 0-2pi range. For example -pi get converted to pi, 4pi to 2pi
-def convert_to_two_pi_range (theta):
-    # If the thetas exceed 0 - 2*pi range, set them back to an equivalent 0 - 2*pi values, 
-    # otherwise the contraints cannot be checked due to periodic natures of angles
-    if theta < 0 :
-        corrected_theta = theta + 2*math.pi
-    elif theta > 2*math.pi :
-        corrected_theta = theta - 2*math.pi
-    else :
-        corrected_theta = theta 
-    return corrected_theta
-
-# Get the x,y index corresponding to the given theta values, and ranges of theta and grid indices
-def theta_to_index_value (theta_1, theta_2, max_theta, size_of_grid) :
-    theta_xi = int((theta_1/(max_theta))*size_of_grid)
-    theta_yi = int((theta_2/(max_theta))*size_of_grid)
-    return theta_xi, theta_yi
-
-# Get the theta_1, theta_2 corresponding to the given index value, and ranges of theta and grid indices
-def index_to_theta_value (theta_xi, theta_yi, max_theta, size_of_grid):
-    theta_1 = (theta_xi/(size_of_grid))*max_theta
-    theta_2 = (theta_yi/(size_of_grid))*max_theta
-    return theta_1, theta_2
+# Add any number of fixed obstacles as polygons, convex or concave, given their corner points relative to the ground in pixels, e.g. [[150, 100], [250, 100], [200, 180]]
+# They are kept in a spatial index, so many of them add little to the time to compute the configuration space or to check for collisions
+extra_obstacles = []
 
 # A function to draw a 2link RR manipulators, 2 links as rectangular polygons, 2 joints as circles
-def draw_manipulator(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2, COLOUR_L1, COLOUR_L2 ):
+# Like the other drawing functions, it draws on the given pygame surface, the screen of the simulation or an offscreen surface
+def draw_manipulator(surface, ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2, COLOUR_L1, COLOUR_L2 ):
 
     # For link 1: Calculate the start coordinates and the difference to the end coordinates of the centreline
     start_x, start_y = ground_x, ground_y
@@ -98,10 +131,10 @@ def draw_manipulator(ground_x, ground_y, link_length_1, link_length_2, half_widt
         (start_x + delta_x - half_width * math.sin(theta_1), start_y + delta_y - half_width * math.cos(theta_1))
     ]
     # Draw a polygon given the 4 corners to represent the rectangular link 1
-    pygame.draw.polygon(surface=screen, color=COLOUR_L1, points=corner_tuples_1)
+    pygame.draw.polygon(surface=surface, color=COLOUR_L1, points=corner_tuples_1)
 
     # Draw a circle where link 1 connects with the ground, to represent joint 1
-    pygame.draw.circle(surface=screen, color=COLOUR_JOINT, center=(start_x,start_y), radius= half_width)
+    pygame.draw.circle(surface=surface, color=COLOUR_JOINT, center=(start_x,start_y), radius= half_width)
 
     # For link 1: Calculate the start coordinates and the difference to the end coordinates of the centreline
     start_x, start_y = ground_x+delta_x, ground_y+delta_y # The start point of link 2 is the end point of the link 1
@@ -115,45 +148,16 @@ def draw_manipulator(ground_x, ground_y, link_length_1, link_length_2, half_widt
         (start_x + delta_x - half_width * math.sin(theta_1+theta_2), start_y + delta_y - half_width * math.cos(theta_1+theta_2))
     ]
     # Draw a polygon given the 4 corners to represent the rectangular link 2
-    pygame.draw.polygon(surface=screen, color=COLOUR_L2, points=corner_tuples_2)
+    pygame.draw.polygon(surface=surface, color=COLOUR_L2, points=corner_tuples_2)
 
     # Draw a circle where link 2 connects with the link 1, to represent joint 2
-    pygame.draw.circle(surface=screen, color= COLOUR_JOINT, center=(start_x,start_y), radius= half_width)
-
-    # Create and return a shapely polygon given the corner points, useful for checking collisions 
-    return Polygon(corner_tuples_1), Polygon (corner_tuples_2)
-
-# A function to draw a 2link RR manipulators, 2 links as rectangular polygons, 2 joints as circles
-# Identical to the other function, except this one only calculates a polygon and doesnot attempt to draw on pygame
-def create_manipulator_polygons(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2):
-
-    # For link 1: Calculate the start coordinates and the difference to the end coordinates of the centreline
-    start_x, start_y = ground_x, ground_y
-    delta_x, delta_y = link_length_1*math.cos(theta_1), -link_length_1*math.sin(theta_1)  # negative sign for flipped y axis in pygame
-
-    # Rectangle's four corners given the start point and the difference to the end point of the centreline of link 1
-    corner_tuples_1 = [
-        (start_x - half_width * math.sin(theta_1), start_y - half_width * math.cos(theta_1)),
-        (start_x + half_width * math.sin(theta_1), start_y + half_width * math.cos(theta_1)),
-        (start_x + delta_x + half_width * math.sin(theta_1), start_y + delta_y + half_width * math.cos(theta_1)),
-        (start_x + delta_x - half_width * math.sin(theta_1), start_y + delta_y - half_width * math.cos(theta_1))
-    ]
-    # For link 1: Calculate the start coordinates and the difference to the end coordinates of the centreline
-    start_x, start_y = ground_x+delta_x, ground_y+delta_y # The start point of link 2 is the end point of the link 1
-    delta_x, delta_y = link_length_2*math.cos(theta_1+theta_2), -link_length_2*math.sin(theta_1+theta_2)  # negative sign for flipped y axis in pygame
+    pygame.draw.circle(surface=surface, color= COLOUR_JOINT, center=(start_x,start_y), radius= half_width)
 
-    # Rectangle's four corners given the start point and the difference to the end point of the centreline of link 1
-    corner_tuples_2 = [
-        (start_x - half_width * math.sin(theta_1+theta_2), start_y - half_width * math.cos(theta_1+theta_2)),
-        (start_x + half_width * math.sin(theta_1+theta_2), start_y + half_width * math.cos(theta_1+theta_2)),
-        (start_x + delta_x + half_width * math.sin(theta_1+theta_2), start_y + delta_y + half_width * math.cos(theta_1+theta_2)),
-        (start_x + delta_x - half_width * math.sin(theta_1+theta_2), start_y + delta_y - half_width * math.cos(theta_1+theta_2))
-    ]
     # Create and return a shapely polygon given the corner points, useful for checking collisions 
     return Polygon(corner_tuples_1), Polygon (corner_tuples_2)
 
 # A function to draw an obstacle as a polygon given its centre coordinates, length and width
-def draw_obstacle (obs_centre_x, obs_centre_y, obs_width, obs_height, OBSTACLE_COLOUR):
+def draw_obstacle (surface, obs_centre_x, obs_centre_y, obs_width, obs_height, OBSTACLE_COLOUR):
     # Half length and width
     obs_halfwidth, obs_halfheight = obs_width//2, obs_height//2
 
@@ -165,38 +169,38 @@ def draw_obstacle (obs_centre_x, obs_centre_y, obs_width, obs_height, OBSTACLE_C
     (obs_centre_x + obs_halfwidth, obs_centre_y - obs_halfheight)
     ]
     # Draw a polygon given the 4 corners to represent the rectangular obstacle 
-    pygame.draw.polygon(surface=screen, color=OBSTACLE_COLOUR, points=corner_tuples)
+    pygame.draw.polygon(surface=surface, color=OBSTACLE_COLOUR, points=corner_tuples)
 
     # Create a shapely polygon given the corner points, useful for checking collisions 
     return Polygon (corner_tuples)
 
-# A function to create an obstacle as a polygon given its centre coordinates, length and width
-# Identical to the other function, except this one only calculates a polygon and doesnot attempt to draw on pygame
-def create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height):
-    # Half length and width
-    obs_halfwidth, obs_halfheight = obs_width//2, obs_height//2
+# A function to draw the fixed obstacles of extra_obstacles as polygons given their corner points relative to the ground
+def draw_extra_obstacles (surface, OBSTACLE_COLOUR):
+    for points in extra_obstacles:
+        pygame.draw.polygon(surface=surface, color=OBSTACLE_COLOUR, points=[(ground_x + offset_x, ground_y + offset_y) for offset_x, offset_y in points])
 
-    # Rectangle's four corners given the start point and the difference to the end point of the centreline of link 1
-    corner_tuples = [
-    (obs_centre_x - obs_halfwidth, obs_centre_y - obs_halfheight),
-    (obs_centre_x - obs_halfwidth, obs_centre_y + obs_halfheight),
-    (obs_centre_x + obs_halfwidth, obs_centre_y + obs_halfheight),
-    (obs_centre_x + obs_halfwidth, obs_centre_y - obs_halfheight)
-    ]
-    # Create a shapely polygon given the corner points, useful for checking collisions 
-    return Polygon (corner_tuples)
+# The surface of the last drawn configuration space grid and a copy of that grid, the surface is only created again when the grid changes
+cspace_surface_cache = {"grid": None, "surface": None}
+
+# A function to create a surface with the c-space plot of a configuration space grid, a square of PIXELS_PER_GRIDPOINT pixels for every grid point
+# The grid is mapped to colours with numpy instead of drawing a rectangle per grid point. Grid points that would be drawn outside the screen are left out
+def create_configuration_space_surface (cspace_grid):
+    cs_space_size = len(cspace_grid)
+    # Rows of the grid go up the plot, surfarray indexes pixels as [x, y], so the grid is flipped upside down and transposed
+    colour_grid = np.array ([COLOUR_SCREEN, COLOUR_OBSTACLE], dtype=np.uint8)[(np.asarray (cspace_grid) == 1)[::-1].T.astype(int)]
+    visible_columns = max (0, min (cs_space_size, -(-(SCREEN_WIDTH - PLOT_X0)//PIXELS_PER_GRIDPOINT)))
+    visible_rows = max (0, min (cs_space_size, -(-(SCREEN_HEIGHT - PLOT_Y0 - PIXELS_PER_GRIDPOINT)//PIXELS_PER_GRIDPOINT)))
+    colour_grid = colour_grid[:visible_columns, :visible_rows]
+    return pygame.surfarray.make_surface (colour_grid.repeat (PIXELS_PER_GRIDPOINT, axis=0).repeat (PIXELS_PER_GRIDPOINT, axis=1))
 
 # Draw a configuration space on pygame using the provided c-space grid map, which should be a square grid with 1s in indexes corresponding to obstacles 0 otherwise
-def draw_configuration_space (cspace_grid):
+def draw_configuration_space (surface, cspace_grid):
     cs_space_size = len(cspace_grid)
-    for i in range (cs_space_size):
-        for j in range (cs_space_size):
-            if cspace_grid[i,j] == 1: 
-                COLOUR = COLOUR_OBSTACLE
-            else:
-                COLOUR = COLOUR_SCREEN
-            pygame.draw.rect(surface=screen, color=COLOUR, rect= (PLOT_X0+(j*(PIXELS_PER_GRIDPOINT)), PLOT_Y0+((cs_space_size-i)*PIXELS_PER_GRIDPOINT), PIXELS_PER_GRIDPOINT, PIXELS_PER_GRIDPOINT))
-            # pygame.draw.rect(surface=screen, color=COLOUR, rect= (PLOT_X0+j*(PLOT_WIDTH//PLOT_RESOLUTION), PLOT_Y0+(len(cspace_grid)-i)*(PLOT_HEIGHT//PLOT_RESOLUTION), (PLOT_WIDTH//PLOT_RESOLUTION), (PLOT_HEIGHT//PLOT_RESOLUTION)))
+    if cspace_surface_cache["grid"] is None or not np.array_equal (cspace_surface_cache["grid"], cspace_grid):
+        cspace_surface_cache["grid"] = np.array (cspace_grid)
+        cspace_surface_cache["surface"] = create_configuration_space_surface (cspace_grid)
+    # The top row of the grid is drawn one grid point below PLOT_Y0
+    surface.blit (source= cspace_surface_cache["surface"], dest= (PLOT_X0, PLOT_Y0+PIXELS_PER_GRIDPOINT))
 
     # Compute the corners of the c-space plot
     top_left = (PLOT_X0, PLOT_Y0)
@@ -205,72 +209,158 @@ def draw_configuration_space (cspace_grid):
     bottom_right = (PLOT_X0+PIXELS_PER_GRIDPOINT*cs_space_size, PLOT_Y0+PIXELS_PER_GRIDPOINT*cs_space_size+PIXELS_PER_GRIDPOINT)
 
     # Create a border around the plot given the corners
-    pygame.draw.line(surface=screen, color= COLOUR_TEXT, start_pos=top_left, end_pos= top_right, width=PIXELS_PER_GRIDPOINT)
-    pygame.draw.line(surface=screen, color= COLOUR_TEXT, start_pos=bottom_left, end_pos= bottom_right, width=PIXELS_PER_GRIDPOINT)
-    pygame.draw.line(surface=screen, color= COLOUR_TEXT, start_pos=top_left, end_pos= bottom_left, width=PIXELS_PER_GRIDPOINT)
-    pygame.draw.line(surface=screen, color= COLOUR_TEXT, start_pos=top_right, end_pos= bottom_right, width=PIXELS_PER_GRIDPOINT)
-
-# Create Configuration Space grid map 
-def create_configuration_space (cs_resolution):
-
-    # number of steps from 0 - 2pi should so that step size is 0.001 rad. 2pi / step size  = number of steps 
-    theta_space = np.arange (0, 2*math.pi, cs_resolution)
-
-    # create a configuration space grid with a resolution of 0.001 rad, axis ranges equal to the entire uncontrained space of thetas, 
-    # All values set to 1 for obstacles. All grid points are obstacles unless found to be free
-    cspace_grid = np.full ((len(theta_space), len(theta_space)), 1)
-
-    # Draw an obstacle as a polygon, given its centre coordinates, width and height 
-    obs_centre_x, obs_centre_y = ground_x + obs_centre_offset_x1, ground_y + obs_centre_offset_y1 
-    obs_1_polygon = create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height)
-
-    # Draw an obstacle as a polygon, given its centre coordinates, width and height 
-    obs_centre_x, obs_centre_y = ground_x + obs_centre_offset_x2, ground_y + obs_centre_offset_y2
-    obs_2_polygon = create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height)
-
-    # iterate through the whole grid and search for free spaces or obstacles and update grid accordingly
-    # bypass theta values that are out of joint constraints
-    for i, theta_1 in enumerate (theta_space):
-        if (((theta_1 < joint_1_upper_lim) and (theta_1 >= 0)) or ((theta_1 > joint_1_lower_lim) and (theta_1 <= 2*math.pi))):
-
-            for j, theta_2 in enumerate (theta_space):
-                # bypass theta values that are out of joint constraints
-                if (((theta_2 < joint_2_upper_lim) and (theta_2 >= 0)) or ((theta_2 > joint_2_lower_lim) and (theta_2 <= 2*math.pi))):
-                    
-                    # Draw a 2link RR manipulator, 2 links as rectangular polygons, 2 joints as circles, Given the current thetas
-                    link1_polygon, link2_polygon = create_manipulator_polygons(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2)
-
-                    # Check for collisions between Link polygons and the obstacles, if it doesnot  occur then mark grid point as 0 for free
-                    if not (link1_polygon.intersects(obs_1_polygon) or link1_polygon.intersects(obs_2_polygon) or link2_polygon.intersects(obs_1_polygon) or link2_polygon.intersects(obs_2_polygon)):
-                        cspace_grid [j, i] = 0 # each column is for a unique theta1, rows along each column for a all the theta2 values
-                else:
-                    continue
-        else:
-            continue
-        
+    pygame.draw.line(surface=surface, color= COLOUR_TEXT, start_pos=top_left, end_pos= top_right, width=PIXELS_PER_GRIDPOINT)
+    pygame.draw.line(surface=surface, color= COLOUR_TEXT, start_pos=bottom_left, end_pos= bottom_right, width=PIXELS_PER_GRIDPOINT)
+    pygame.draw.line(surface=surface, color= COLOUR_TEXT, start_pos=top_left, end_pos= bottom_left, width=PIXELS_PER_GRIDPOINT)
+    pygame.draw.line(surface=surface, color= COLOUR_TEXT, start_pos=top_right, end_pos= bottom_right, width=PIXELS_PER_GRIDPOINT)
+
+# A function to get the scene description of the current settings and obstacle positions, for the display-free core in scene.py
+def create_current_scene (cs_resolution):
+    return create_scene (
+        cs_resolution = cs_resolution,
+        ground = [ground_x, ground_y],
+        link_lengths = [link_length_1, link_length_2],
+        link_width = link_width,
+        joint_limits = [joint_1_lower_lim, joint_1_upper_lim, joint_2_lower_lim, joint_2_upper_lim],
+        obstacles = [[obs_centre_offset_x1, obs_centre_offset_y1, obs_width, obs_height], [obs_centre_offset_x2, obs_centre_offset_y2, obs_width, obs_height]]
+                    + [{"points": points} for points in extra_obstacles]
+    )
+
+# A function to start computing the configuration space in the background with the "tiled" engine, for the current obstacle positions
+def start_tiled_configuration_space (cs_executor, cs_resolution):
+    scene = create_current_scene (cs_resolution)
+    obstacle_corners = [create_obstacle_corners (scene, obstacle) for obstacle in scene["obstacles"]]
+    return TiledCSpaceBuild (cs_executor, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_corners, scene["joint_limits"])
+
+# A function to get the cached joint constraint layer of the configuration space, True for the thetas that violate the joint constraints
+def create_joint_limit_cspace_layer (cs_resolution):
+    return create_scene_joint_limit_layer (create_current_scene (cs_resolution))
+
+# A function to get the cache key of the current scene, from every setting that changes the configuration space grid
+def create_cspace_cache_key (cs_resolution):
+    return create_scene_key (create_current_scene (cs_resolution))
+
+# A function to get the configuration space grid for the current obstacle positions, loaded from the cache if this scene was computed before
+# obstacle_layers holds the layers of the two movable obstacles and one layer of all fixed obstacles for the "vectorized" engine, the layers that are None are computed when the grid is not cached
+# If stats is a collections.Counter, the broad phase counters of the computed layers are added to it
+# With the obstacle table, the layers of the movable obstacles are looked up, which is faster than loading the grid from the cache, so the cache is not used
+def update_configuration_space (cs_resolution, obstacle_layers, stats=None):
+    use_table = cs_backend == "vectorized" and obstacle_layer_table is not None
+    cspace_key = create_cspace_cache_key (cs_resolution)
+    if cspace_cache is not None and not use_table:
+        cspace_grid = cspace_cache.get (cspace_key)
+        if cspace_grid is not None:
+            return cspace_grid
+
+    if cs_backend == "vectorized":
+        scene = create_current_scene (cs_resolution)
+        layer_obstacles = [[obstacle] for obstacle in scene["obstacles"][:2]] + [scene["obstacles"][2:]]
+        for k, obstacles in enumerate (layer_obstacles):
+            # Positions off the lattice of the table are computed
+            if obstacle_layers[k] is None and use_table and k < 2:
+                offset_x, offset_y = obstacles[0][:2]
+                obstacle_layers[k] = obstacle_layer_table.layer (offset_x, offset_y)
+            if obstacle_layers[k] is None:
+                obstacle_layers[k] = create_scene_obstacle_layer (scene, obstacles, stats)
+        cspace_grid = combine_layers (create_scene_joint_limit_layer (scene), obstacle_layers)
+    else:
+        cspace_grid = create_configuration_space (cs_resolution, stats=stats)
+
+    if cspace_cache is not None and not use_table:
+        cspace_cache.put (cspace_key, cspace_grid)
     return cspace_grid
 
+# Create Configuration Space grid map of the current scene, with the cs_backend engine by default
+def create_configuration_space (cs_resolution, backend=None, stats=None):
+    if backend is None:
+        backend = cs_backend
+    return create_scene_configuration_space (create_current_scene (cs_resolution), backend, stats)
+
 # A function to draw a rectangle in the cs plot to denote the goal position
-def draw_goal_point_in_cs (goal_theta_1, goal_theta_2, COLOUR, cspace_grid ):
+def draw_goal_point_in_cs (surface, goal_theta_1, goal_theta_2, COLOUR, cspace_grid ):
     cs_space_size = len (cspace_grid)
     goal_theta_i = int((goal_theta_1/(2*math.pi))*cs_space_size)
     goal_theta_j = int((goal_theta_2/(2*math.pi))*cs_space_size)
-    pygame.draw.rect(surface=screen, color=COLOUR, rect= (PLOT_X0+(goal_theta_i*(PIXELS_PER_GRIDPOINT)), PLOT_Y0+((cs_space_size-goal_theta_j)*PIXELS_PER_GRIDPOINT), 3*PIXELS_PER_GRIDPOINT, 3*PIXELS_PER_GRIDPOINT))
+    pygame.draw.rect(surface=surface, color=COLOUR, rect= (PLOT_X0+(goal_theta_i*(PIXELS_PER_GRIDPOINT)), PLOT_Y0+((cs_space_size-goal_theta_j)*PIXELS_PER_GRIDPOINT), 3*PIXELS_PER_GRIDPOINT, 3*PIXELS_PER_GRIDPOINT))
 
 # A function to draw a rectangle in the cs plot to denote the current position
-def draw_current_point_in_cs (theta_1, theta_2, COLOUR, cspace_grid ):
+def draw_current_point_in_cs (surface, theta_1, theta_2, COLOUR, cspace_grid ):
     cs_space_size = len (cspace_grid)
     theta_i = int((theta_1/(2*math.pi))*cs_space_size)
     theta_j = int((theta_2/(2*math.pi))*cs_space_size)
-    pygame.draw.rect(surface=screen, color=COLOUR, rect= (PLOT_X0+(theta_i*(PIXELS_PER_GRIDPOINT)), PLOT_Y0+((cs_space_size-theta_j)*PIXELS_PER_GRIDPOINT), 3*PIXELS_PER_GRIDPOINT, 3*PIXELS_PER_GRIDPOINT))
-
-# A function to just simulate the manipulator following the generated theta trajectories
-def draw_motion_plan (cspace_grid, theta_trajectory):
+    pygame.draw.rect(surface=surface, color=COLOUR, rect= (PLOT_X0+(theta_i*(PIXELS_PER_GRIDPOINT)), PLOT_Y0+((cs_space_size-theta_j)*PIXELS_PER_GRIDPOINT), 3*PIXELS_PER_GRIDPOINT, 3*PIXELS_PER_GRIDPOINT))
+
+# The collision checker of the sampling based planners and the trajectory validation, and the roadmap of the "prm" planner, with the cache keys of the scenes they were built for
+collision_checker_cache = {"key": None, "checker": None}
+sampling_roadmap_cache = {"key": None, "roadmap": None}
+
+# A function to get the collision checker of the current obstacle positions, it is built again when an obstacle moved
+def get_collision_checker ():
+    cspace_key = create_cspace_cache_key (cs_resolution)
+    if collision_checker_cache["key"] != cspace_key:
+        collision_checker_cache["key"], collision_checker_cache["checker"] = cspace_key, create_scene_collision_checker (create_current_scene (cs_resolution))
+    return collision_checker_cache["checker"]
+
+# A function to get the roadmap of the "prm" planner for the current obstacle positions, the roadmap is built again when an obstacle moved
+def get_sampling_roadmap ():
+    cspace_key = create_cspace_cache_key (cs_resolution)
+    if sampling_roadmap_cache["key"] != cspace_key:
+        sampling_roadmap_cache["key"], sampling_roadmap_cache["roadmap"] = cspace_key, LazyPRM (get_collision_checker ())
+    return sampling_roadmap_cache["roadmap"]
+
+# A function to find the first segment of a trajectory that collides with the obstacles at their current positions, between its rows and not only at them
+# Returns the number of the segment from row k to row k + 1, or None if the trajectory is free or validate_trajectories is off
+def find_trajectory_collision (theta_trajectory):
+    if not validate_trajectories:
+        return None
+    return first_colliding_segment (get_collision_checker (), theta_trajectory)
+
+# A function to plan a trajectory from the current thetas to the goal thetas through the free grid points of the configuration space, with the motion_planner
+# Returns the trajectory as an array of [theta_1, theta_2] rows in the same format as demo_trajectory.npy, or None if there is no path
+def plan_motion (cspace_grid, theta_1, theta_2, goal_theta_1, goal_theta_2):
+    if motion_planner in ("rrt", "prm"):
+        return plan_sampling_motion (create_current_scene (cs_resolution), [theta_1, theta_2], [goal_theta_1, goal_theta_2], get_sampling_roadmap () if motion_planner == "prm" else "rrt")
+    return plan_scene_motion (cspace_grid, theta_1, theta_2, goal_theta_1, goal_theta_2, wavefront_planner if motion_planner == "wavefront" else motion_planner)
+
+# A function to draw a planned theta trajectory in the cs plot, one grid point at a time
+def draw_path_in_cs (surface, theta_trajectory, COLOUR, cspace_grid):
+    cs_space_size = len (cspace_grid)
+    for theta_x, theta_y in theta_trajectory:
+        theta_i = int(((theta_x % (2*math.pi))/(2*math.pi))*cs_space_size)
+        theta_j = int(((theta_y % (2*math.pi))/(2*math.pi))*cs_space_size)
+        pygame.draw.rect(surface=surface, color=COLOUR, rect= (PLOT_X0+(theta_i*(PIXELS_PER_GRIDPOINT)), PLOT_Y0+((cs_space_size-theta_j)*PIXELS_PER_GRIDPOINT), PIXELS_PER_GRIDPOINT, PIXELS_PER_GRIDPOINT))
+
+# The lines of the profiling overlay and the frame they were rendered in, they are rendered again a few times per second so they stay readable
+profile_overlay_cache = {"frame": None, "texts": []}
+
+# A function to draw the frame rate and the latencies of the timed stages in the top left corner of the c-space side
+def draw_profile_overlay (surface, profiler):
+    if profile_overlay_cache["frame"] is None or profiler.frame_number - profile_overlay_cache["frame"] >= fps//4:
+        profile_overlay_cache["frame"] = profiler.frame_number
+        profile_overlay_cache["texts"] = [overlay_font.render (line, True, COLOUR_TEXT) for line in profiler.overlay_lines()]
+    for k, text in enumerate (profile_overlay_cache["texts"]):
+        surface.blit(source= text, dest= (710, 5 + 16*k))
+
+# A function to turn a planned theta trajectory into a timed trajectory for the playback
+# The trajectory is checked for collisions first and cut at the start of its first colliding segment, which the C-space plot shows in red,
+# then shortened with collision free shortcuts and timed under the joint velocity and acceleration limits
+# Returns the times in seconds and the rows of joint angles at these times
+def create_timed_trajectory (theta_trajectory):
+    collision_segment = find_trajectory_collision (theta_trajectory)
+    if collision_segment is not None:
+        theta_trajectory = theta_trajectory[:collision_segment + 1]
+    shortcut_trajectory = shortcut_path (get_collision_checker (), theta_trajectory)
+    return time_parameterise (shortcut_trajectory, max_joint_velocity, max_joint_acceleration)
+
+# A function to just simulate the manipulator following a timed trajectory, in real time
+# Every frame shows the configuration of the trajectory at the time passed since the start, so the playback takes as long as the motion, at any frame rate
+def draw_motion_plan (cspace_grid, times, timed_trajectory):
 
     pygame.time.delay(500)
 
-    last_theta_x , last_theta_y = 0, 0 # used later for maintaining configuration
-    for theta_list in theta_trajectory:
+    start_time = time.perf_counter()
+    while True:
+        elapsed_time = time.perf_counter() - start_time
         # Set the colour of the screen to all white
         # clear the screen of any past output
         screen.fill(color=COLOUR_SCREEN)
@@ -279,180 +369,324 @@ def draw_motion_plan (cspace_grid, theta_trajectory):
         pygame.draw.line(surface=screen, color= COLOUR_TEXT, start_pos=(700,0), end_pos= (700,700), width=5)
 
         # Draw text to: label Workspace and Cspace in the game window
-        font = pygame.font.SysFont(name= None, size= 30 )
-        title1_text = font.render ("Workspace", True, COLOUR_TEXT)
-        title2_text = font.render ("C-Space",  True, COLOUR_TEXT)
         screen.blit(source= title1_text, dest= (300, 670))
         screen.blit(source= title2_text, dest= (1000, 670))
 
         # simulate motion
-        # Theta coordinates along the trajectory
-        theta_x, theta_y = theta_list[0], theta_list[1]
-        theta_x, theta_y = convert_to_two_pi_range(theta_x), convert_to_two_pi_range(theta_y)
+        # Theta coordinates along the trajectory at the current time, the timed trajectory holds unwrapped joint angles
+        theta_x, theta_y = sample_timed_trajectory (times, timed_trajectory, elapsed_time) % (2*math.pi)
 
         # Draw an obstacle as a polygon, given its centre coordinates, width and height 
         obs_centre_x, obs_centre_y = ground_x + obs_centre_offset_x1, ground_y + obs_centre_offset_y1
-        obs_1_polygon = draw_obstacle (obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
+        obs_1_polygon = draw_obstacle (screen, obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
 
         # Draw an obstacle as a polygon, given its centre coordinates, width and height 
         obs_centre_x, obs_centre_y = ground_x + obs_centre_offset_x2, ground_y + obs_centre_offset_y2
-        obs_2_polygon = draw_obstacle (obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
+        obs_2_polygon = draw_obstacle (screen, obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
+        draw_extra_obstacles (screen, COLOUR_OBSTACLE)
 
         # Draw a manipulator again but after checking for collision with obstacles and changing the colours to simulate collision
         # Draw a 2link RR manipulator, 2 links as rectangular polygons, 2 joints as circles, Given the current thetas
-        link1_polygon, link2_polygon = draw_manipulator(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_x, theta_y, COLOUR_LINK1, COLOUR_LINK2)
+        link1_polygon, link2_polygon = draw_manipulator(screen, ground_x, ground_y, link_length_1, link_length_2, half_width, theta_x, theta_y, COLOUR_LINK1, COLOUR_LINK2)
     
         # Draw a configuration space on pygame using the provided c-space grid map, which should be a square grid with 1s in indexes corresponding to obstacles 0 otherwise
-        draw_configuration_space (cspace_grid)
+        draw_configuration_space (screen, cspace_grid)
 
         # Draw a rectangle in the cs plot to show the goal config
-        draw_goal_point_in_cs (goal_theta_1, goal_theta_2, COLOUR_GOAL, cspace_grid )
+        draw_goal_point_in_cs (screen, goal_theta_1, goal_theta_2, COLOUR_GOAL, cspace_grid )
 
         # Draw a rectangle in the cs plot to show the Current config
-        draw_current_point_in_cs (theta_x, theta_y, COLOUR_LINK1, cspace_grid )
-
-        pygame.time.delay(40)
+        draw_current_point_in_cs (screen, theta_x, theta_y, COLOUR_LINK1, cspace_grid )
 
         # Update the display with the new changes, update clock
         pygame.display.update()
         clock.tick(fps)
-        last_theta_x, last_theta_y = theta_x, theta_y
-    return last_theta_x, last_theta_y
-
-# A flag to run the while loop for pygame until the window is closed
-run = True 
-
-# Give the Initial joint angles/ thetas of the robot in radians
-theta_1, theta_2 =  convert_to_two_pi_range (math.pi/6), convert_to_two_pi_range (math.pi/4)
-
-# Give the Target joint angles/ thetas of the robot in radians
-goal_theta_1, goal_theta_2 =  convert_to_two_pi_range (5*math.pi/6), convert_to_two_pi_range (-math.pi/4)
 
-# obtain a configuration space for the starting configuration
-cspace_grid = create_configuration_space (cs_resolution)
+        # Stop after the frame that showed the end of the trajectory
+        if elapsed_time >= times[-1]:
+            break
+    return theta_x, theta_y
 
-# Load the already calculate trajectory
-theta_trajectory = np.load ("demo_trajectory.npy")
+# The planner of the "wavefront" motion planner, it keeps the distances to the goal between frames
+wavefront_planner = WavefrontPlanner (planner_clearance_weight)
 
-while run:
+# The cache of computed configuration spaces, shared by all engines
+cspace_cache = CSpaceCache (cs_cache_dir, cs_cache_max_mb*1024*1024) if cs_cache_dir is not None else None
 
-    # initialize the temporary theta variables to track current changes
-    temp_theta_1, temp_theta_2 = theta_1, theta_2
+# The lookup table of the layers of the movable obstacles, None unless obstacle_table is set, it is built or loaded when the simulation starts
+obstacle_layer_table = None
 
-    # initialize the temporary obstacles centre relative position to track current changes
-    obs_centre_dis_x1, obs_centre_dis_y1, obs_centre_dis_x2, obs_centre_dis_y2 = obs_centre_offset_x1, obs_centre_offset_y1, obs_centre_offset_x2, obs_centre_offset_y2 
+# Run the simulation only when main.py is executed, so that the worker processes of the "tiled" engine can import it
+if __name__ == "__main__":
+    # Initialize the pygame 
+    pygame.init()
 
-    # Set the colour of the screen to all white
-    # clear the screen of any past output
-    screen.fill(color=COLOUR_SCREEN)
+    # Setup a clock
+    clock = pygame.time.Clock()
 
-    # Draw a line to separate ws and cs in the pygame window
-    pygame.draw.line(surface=screen, color= COLOUR_TEXT, start_pos=(700,0), end_pos= (700,700), width=5)
+    # Setup a pygame screen at the given screen sizes
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 
-    # Draw text to: label Workspace and Cspace in the game window
+    # Create the font and the title texts once, they are the same in every frame
     font = pygame.font.SysFont(name= None, size= 30 )
     title1_text = font.render ("Workspace", True, COLOUR_TEXT)
     title2_text = font.render ("C-Space",  True, COLOUR_TEXT)
-    screen.blit(source= title1_text, dest= (300, 670))
-    screen.blit(source= title2_text, dest= (1000, 670))
-    
+    overlay_font = pygame.font.SysFont(name= None, size= 20 )
+
+    # Time the stages of every frame
+    profiler = Profiler ()
+
+    # A flag to run the while loop for pygame until the window is closed
+    run = True 
+
+    # Give the Initial joint angles/ thetas of the robot in radians
+    theta_1, theta_2 =  convert_to_two_pi_range (math.pi/6), convert_to_two_pi_range (math.pi/4)
+
+    # Give the Target joint angles/ thetas of the robot in radians
+    goal_theta_1, goal_theta_2 =  convert_to_two_pi_range (5*math.pi/6), convert_to_two_pi_range (-math.pi/4)
+
+    # obtain a configuration space for the starting configuration
+    # Keep one layer per movable obstacle and one for the fixed obstacles, so that moving an obstacle only recomputes the layer of that obstacle, None until a layer is computed
+    obstacle_layers = [None, None, None]
+
+    # Build the lookup table of the layers of the movable obstacles, or load it if an earlier run built it for the same scene
+    if obstacle_table and cs_backend == "vectorized":
+        table_start_time = time.perf_counter()
+        obstacle_offset_range = (-obstacle_table_reach, obstacle_table_reach, obstacle_table_step)
+        obstacle_layer_table = create_scene_obstacle_table (create_current_scene (cs_resolution), obs_width, obs_height, os.path.join (cs_cache_dir or ".cspace_cache", "obstacle_tables"),
+                                                            obstacle_offset_range, obstacle_offset_range, cs_workers)
+        print ("Obstacle table of", len (obstacle_layer_table), "positions,", format (obstacle_layer_table.nbytes/1e6, ".1f"), "MB,",
+               "built" if obstacle_layer_table.built else "loaded", "in", format (time.perf_counter() - table_start_time, ".1f"), "s")
+
+    # Index the fixed obstacles once for the collision checks of the manipulator
+    extra_obstacle_index = create_obstacle_index (create_current_scene (cs_resolution), [{"points": points} for points in extra_obstacles])
+    if cs_backend == "tiled":
+        # Start with all grid points as obstacles, the tiles are copied in as the worker processes finish them
+        cs_executor = create_tile_executor (cs_workers)
+        cspace_key = create_cspace_cache_key (cs_resolution)
+        cspace_grid = cspace_cache.get (cspace_key) if cspace_cache is not None else None
+        cspace_build = None
+        if cspace_grid is None:
+            cspace_grid = np.full (create_joint_limit_cspace_layer (cs_resolution).shape, 1)
+            cspace_build = start_tiled_configuration_space (cs_executor, cs_resolution)
+    else:
+        # Print how many cells the broad phase saved from the exact collision check, if the grid was not loaded from the cache
+        cs_stats = collections.Counter()
+        with profiler.timer ("grid_build"):
+            cspace_grid = update_configuration_space (cs_resolution, obstacle_layers, cs_stats)
+        if cs_stats:
+            print (format_quadtree_stats (cs_stats) if cs_backend == "quadtree" else format_broad_phase_stats (cs_stats))
+
+    # Load the already calculate trajectory
+    demo_trajectory = np.load ("demo_trajectory.npy")
+
+    # The plan shown in the c-space plot and checked for collisions every frame: the live path of the "wavefront" planner,
+    # or the last plan made with G for the other planners, the "demo" trajectory from the start
+    active_trajectory = demo_trajectory if motion_planner == "demo" else None
+
+    while run:
+
+        # initialize the temporary theta variables to track current changes
+        temp_theta_1, temp_theta_2 = theta_1, theta_2
+
+        # initialize the temporary obstacles centre relative position to track current changes
+        obs_centre_dis_x1, obs_centre_dis_y1, obs_centre_dis_x2, obs_centre_dis_y2 = obs_centre_offset_x1, obs_centre_offset_y1, obs_centre_offset_x2, obs_centre_offset_y2 
 
-    # Check for Key Presses, perform an action according to the pressed key
-    key = pygame.key.get_pressed()
-    # pressing the following keys increases/ decreases "temporary" values of thetas
-    if key[pygame.K_a]:
-        temp_theta_1 -= 0.03
-    if key[pygame.K_d]:
-        temp_theta_1 += 0.03
-    if key[pygame.K_w]:
-        temp_theta_2 += 0.03
-    if key[pygame.K_s]:
-        temp_theta_2 -= 0.03
-
-    # Simulate the motion trajectory
-    if key[pygame.K_g]:
-       temp_theta_1, temp_theta_2= draw_motion_plan (cspace_grid, theta_trajectory)
-
-    # If the thetas exceed 0 - 2*pi range, set them back to an equivalent 0 - 2*pi values, 
-    # otherwise the contraints cannot be checked due to periodic natures of angles
-    temp_theta_1 = convert_to_two_pi_range (temp_theta_1)
-    temp_theta_2 = convert_to_two_pi_range (temp_theta_2)
-    
-    #  If the changed value of theta is within limits, set it as the actual theta, otherwise don't allow the change
-    if (((temp_theta_1 < joint_1_upper_lim) and (temp_theta_1 > 0)) or ((temp_theta_1 > joint_1_lower_lim) and (temp_theta_1 < 2*math.pi))):
-        theta_1 = temp_theta_1
-    if (((temp_theta_2 < joint_2_upper_lim) and (temp_theta_2 > 0)) or ((temp_theta_2 > joint_2_lower_lim) and (temp_theta_2 < 2*math.pi))):
-        theta_2 = temp_theta_2
-
-    # pressing the following keys increases/ decreases "temporary" values of obstacle coordinates
-    if key[pygame.K_4]:
-        obs_centre_dis_x1 -= 10
-    if key[pygame.K_6]:
-        obs_centre_dis_x1 += 10
-    if key[pygame.K_8]:
-        obs_centre_dis_y1 -= 10
-    if key[pygame.K_5]:
-        obs_centre_dis_y1 += 10
-
-    # Create an obstacle as a polygon, given its centre coordinates, width and height 
-    obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x1, ground_y + obs_centre_dis_y1
-    obs_1_polygon = create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height)
-
-    # Create an obstacle as a polygon, given its centre coordinates, width and height 
-    obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x2, ground_y + obs_centre_dis_y2
-    obs_2_polygon = create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height)
-
-    # Create a manipulator polygon for checking checking for collision with obstacles and changing the colours to simulate collision
-    # Create a 2link RR manipulator, 2 links as rectangular polygons, 2 joints as circles, Given the current thetas
-    link1_polygon, link2_polygon = create_manipulator_polygons(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2)
-
-    # Check for collisions between Link polygon and the obstacles, if it occurs then change the colour of that link to simulate collision
-    if (link1_polygon.intersects(obs_1_polygon) or link1_polygon.intersects(obs_2_polygon)):
-        L1_COLOUR = COLOUR_LINK1_COLLISION
-    else: 
-        L1_COLOUR = COLOUR_LINK1
-
-    if (link2_polygon.intersects(obs_1_polygon) or link2_polygon.intersects(obs_2_polygon)):
-        L2_COLOUR = COLOUR_LINK2_COLLISION
-    else: 
-        L2_COLOUR = COLOUR_LINK2
-
-    # Check if the obstacle centres have changed position, if so then Create the configuration space grid again
-    if ((obs_centre_dis_x1 != obs_centre_offset_x1) or (obs_centre_dis_y1 != obs_centre_offset_y1) or (obs_centre_dis_x2 != obs_centre_offset_x2) or (obs_centre_dis_y2 != obs_centre_offset_y2)):  
-        # Create a configuration space grid given the resolution, (and global joint limits, link lengths, ground position, obstacles relative position and so on)
-        # cspace_grid = asyncio.run (create_configuration_space (cs_resolution))
-        cspace_grid = create_configuration_space (cs_resolution)
-
-    # Apply the changes to the obstacles centre relative position to track current changes
-    obs_centre_offset_x1, obs_centre_offset_y1, obs_centre_offset_x2, obs_centre_offset_y2 = obs_centre_dis_x1, obs_centre_dis_y1, obs_centre_dis_x2, obs_centre_dis_y2 
-
-    # Draw an obstacle as a polygon, given its centre coordinates, width and height 
-    obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x1, ground_y + obs_centre_dis_y1
-    obs_1_polygon = draw_obstacle (obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
-
-    # Draw an obstacle as a polygon, given its centre coordinates, width and height 
-    obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x2, ground_y + obs_centre_dis_y2
-    obs_2_polygon = draw_obstacle (obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
-
-    # Draw a manipulator again but after checking for collision with obstacles and changing the colours to simulate collision
-    # Draw a 2link RR manipulator, 2 links as rectangular polygons, 2 joints as circles, Given the current thetas
-    link1_polygon, link2_polygon = draw_manipulator(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2, L1_COLOUR, L2_COLOUR)
-  
-    # Draw a configuration space on pygame using the provided c-space grid map, which should be a square grid with 1s in indexes corresponding to obstacles 0 otherwise
-    draw_configuration_space (cspace_grid) 
-
-    # Draw a rectangle in the cs plot to show the goal config
-    draw_goal_point_in_cs (goal_theta_1, goal_theta_2, COLOUR_GOAL, cspace_grid )
-
-    # Draw a rectangle in the cs plot to show the Current config
-    draw_current_point_in_cs (theta_1, theta_2, COLOUR_LINK1, cspace_grid )
-
-    # Check for Quit command and Quit if yes
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            run = False
-    # Update the display with the new changes, update clock
-    pygame.display.update()
-    clock.tick(fps)
-
-pygame.quit() 
\ No newline at end of file
+        # Set the colour of the screen to all white
+        # clear the screen of any past output
+        screen.fill(color=COLOUR_SCREEN)
+
+        # Draw a line to separate ws and cs in the pygame window
+        pygame.draw.line(surface=screen, color= COLOUR_TEXT, start_pos=(700,0), end_pos= (700,700), width=5)
+
+        # Draw text to: label Workspace and Cspace in the game window
+        screen.blit(source= title1_text, dest= (300, 670))
+        screen.blit(source= title2_text, dest= (1000, 670))
+
+        # Copy the tiles finished by the "tiled" engine into the grid and show the progress of the computation
+        if cs_backend == "tiled" and cspace_build is not None:
+            with profiler.timer ("grid_build"):
+                progress_text = font.render ("Computing " + str(int(100*cspace_build.progress())) + "%", True, COLOUR_TEXT)
+                screen.blit(source= progress_text, dest= (1120, 670))
+                if cspace_build.poll (cspace_grid):
+                    if cspace_cache is not None:
+                        cspace_cache.put (cspace_key, cspace_grid)
+                    cspace_build = None
+
+        # Check for Key Presses, perform an action according to the pressed key
+        key = pygame.key.get_pressed()
+        # pressing the following keys increases/ decreases "temporary" values of thetas
+        if key[pygame.K_a]:
+            temp_theta_1 -= 0.03
+        if key[pygame.K_d]:
+            temp_theta_1 += 0.03
+        if key[pygame.K_w]:
+            temp_theta_2 += 0.03
+        if key[pygame.K_s]:
+            temp_theta_2 -= 0.03
+
+        # Plan a trajectory from the current configuration to the goal and simulate the motion
+        if key[pygame.K_g]:
+            if motion_planner == "demo":
+                theta_trajectory = demo_trajectory
+            else:
+                with profiler.timer ("planning"):
+                    theta_trajectory = plan_motion (cspace_grid, theta_1, theta_2, goal_theta_1, goal_theta_2)
+            if theta_trajectory is not None:
+                with profiler.timer ("planning"):
+                    times, timed_trajectory = create_timed_trajectory (theta_trajectory)
+                active_trajectory = timed_trajectory
+                temp_theta_1, temp_theta_2= draw_motion_plan (cspace_grid, times, timed_trajectory)
+            else:
+                print ("No path found from the current configuration to the goal")
+
+        # If the thetas exceed 0 - 2*pi range, set them back to an equivalent 0 - 2*pi values, 
+        # otherwise the contraints cannot be checked due to periodic natures of angles
+        temp_theta_1 = convert_to_two_pi_range (temp_theta_1)
+        temp_theta_2 = convert_to_two_pi_range (temp_theta_2)
+
+        #  If the changed value of theta is within limits, set it as the actual theta, otherwise don't allow the change
+        if (((temp_theta_1 < joint_1_upper_lim) and (temp_theta_1 > 0)) or ((temp_theta_1 > joint_1_lower_lim) and (temp_theta_1 < 2*math.pi))):
+            theta_1 = temp_theta_1
+        if (((temp_theta_2 < joint_2_upper_lim) and (temp_theta_2 > 0)) or ((temp_theta_2 > joint_2_lower_lim) and (temp_theta_2 < 2*math.pi))):
+            theta_2 = temp_theta_2
+
+        # pressing the following keys increases/ decreases "temporary" values of obstacle coordinates
+        if key[pygame.K_4]:
+            obs_centre_dis_x1 -= 10
+        if key[pygame.K_6]:
+            obs_centre_dis_x1 += 10
+        if key[pygame.K_8]:
+            obs_centre_dis_y1 -= 10
+        if key[pygame.K_5]:
+            obs_centre_dis_y1 += 10
+
+        with profiler.timer ("collision"):
+            # Create an obstacle as a polygon, given its centre coordinates, width and height 
+            obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x1, ground_y + obs_centre_dis_y1
+            obs_1_polygon = create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height)
+
+            # Create an obstacle as a polygon, given its centre coordinates, width and height 
+            obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x2, ground_y + obs_centre_dis_y2
+            obs_2_polygon = create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height)
+
+            # Create a manipulator polygon for checking checking for collision with obstacles and changing the colours to simulate collision
+            # Create a 2link RR manipulator, 2 links as rectangular polygons, 2 joints as circles, Given the current thetas
+            link1_polygon, link2_polygon = create_manipulator_polygons(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2)
+
+            # Check for collisions between Link polygon and the obstacles, if it occurs then change the colour of that link to simulate collision
+            if (link1_polygon.intersects(obs_1_polygon) or link1_polygon.intersects(obs_2_polygon) or extra_obstacle_index.intersects(link1_polygon)):
+                L1_COLOUR = COLOUR_LINK1_COLLISION
+            else: 
+                L1_COLOUR = COLOUR_LINK1
+
+            if (link2_polygon.intersects(obs_1_polygon) or link2_polygon.intersects(obs_2_polygon) or extra_obstacle_index.intersects(link2_polygon)):
+                L2_COLOUR = COLOUR_LINK2_COLLISION
+            else: 
+                L2_COLOUR = COLOUR_LINK2
+
+        # Check which obstacle centres have changed position
+        obs_1_moved = (obs_centre_dis_x1 != obs_centre_offset_x1) or (obs_centre_dis_y1 != obs_centre_offset_y1)
+        obs_2_moved = (obs_centre_dis_x2 != obs_centre_offset_x2) or (obs_centre_dis_y2 != obs_centre_offset_y2)
+
+        # Apply the changes to the obstacles centre relative position to track current changes
+        obs_centre_offset_x1, obs_centre_offset_y1, obs_centre_offset_x2, obs_centre_offset_y2 = obs_centre_dis_x1, obs_centre_dis_y1, obs_centre_dis_x2, obs_centre_dis_y2 
+
+        # If an obstacle moved, recompute only the layer of that obstacle and combine it with the other layers into the configuration space grid
+        # unless the grid of the new obstacle positions is already in the cache
+        if obs_1_moved or obs_2_moved:
+            with profiler.timer ("grid_build"):
+                if obs_1_moved:
+                    obstacle_layers[0] = None
+                if obs_2_moved:
+                    obstacle_layers[1] = None
+
+                if cs_backend == "tiled":
+                    # Restart the background computation for the new obstacle positions, the old grid stays on screen until the new tiles replace it
+                    if cspace_build is not None:
+                        cspace_build.cancel()
+                        cspace_build = None
+                    cspace_key = create_cspace_cache_key (cs_resolution)
+                    cached_grid = cspace_cache.get (cspace_key) if cspace_cache is not None else None
+                    if cached_grid is not None:
+                        cspace_grid = cached_grid
+                    else:
+                        cspace_build = start_tiled_configuration_space (cs_executor, cs_resolution)
+                else:
+                    # Create a configuration space grid given the resolution, (and global joint limits, link lengths, ground position, obstacles relative position and so on)
+                    # cspace_grid = asyncio.run (create_configuration_space (cs_resolution))
+                    cspace_grid = update_configuration_space (cs_resolution, obstacle_layers)
+
+        with profiler.timer ("ws_render"):
+            # Draw an obstacle as a polygon, given its centre coordinates, width and height 
+            obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x1, ground_y + obs_centre_dis_y1
+            obs_1_polygon = draw_obstacle (screen, obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
+
+            # Draw an obstacle as a polygon, given its centre coordinates, width and height 
+            obs_centre_x, obs_centre_y = ground_x + obs_centre_dis_x2, ground_y + obs_centre_dis_y2
+            obs_2_polygon = draw_obstacle (screen, obs_centre_x, obs_centre_y, obs_width, obs_height, COLOUR_OBSTACLE)
+            draw_extra_obstacles (screen, COLOUR_OBSTACLE)
+
+            # Draw a manipulator again but after checking for collision with obstacles and changing the colours to simulate collision
+            # Draw a 2link RR manipulator, 2 links as rectangular polygons, 2 joints as circles, Given the current thetas
+            link1_polygon, link2_polygon = draw_manipulator(screen, ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2, L1_COLOUR, L2_COLOUR)
+
+        # Plan the path the "wavefront" planner would take from the current configuration, it only needs the distances computed for the goal
+        # While the "tiled" engine is still computing, the grid changes every frame, so the path is only shown once it is done
+        if motion_planner == "wavefront":
+            active_trajectory = None
+            if not (cs_backend == "tiled" and cspace_build is not None):
+                with profiler.timer ("planning"):
+                    active_trajectory = plan_motion (cspace_grid, theta_1, theta_2, goal_theta_1, goal_theta_2)
+
+        # Check the shown plan for collisions with the obstacles where they are now, e.g. after they were moved with keys 4/5/6/8
+        collision_segment = None
+        if active_trajectory is not None:
+            with profiler.timer ("validation"):
+                collision_segment = find_trajectory_collision (active_trajectory)
+
+        with profiler.timer ("cs_render"):
+            # Draw a configuration space on pygame using the provided c-space grid map, which should be a square grid with 1s in indexes corresponding to obstacles 0 otherwise
+            draw_configuration_space (screen, cspace_grid) 
+
+            # Show the planned path, with its first colliding segment in red
+            if active_trajectory is not None:
+                draw_path_in_cs (screen, active_trajectory, COLOUR_PATH, cspace_grid)
+                if collision_segment is not None:
+                    draw_path_in_cs (screen, active_trajectory[collision_segment:collision_segment + 2], COLOUR_PATH_COLLISION, cspace_grid)
+
+            # Draw a rectangle in the cs plot to show the goal config
+            draw_goal_point_in_cs (screen, goal_theta_1, goal_theta_2, COLOUR_GOAL, cspace_grid )
+
+            # Draw a rectangle in the cs plot to show the Current config
+            draw_current_point_in_cs (screen, theta_1, theta_2, COLOUR_LINK1, cspace_grid )
+
+        # Show the frame rate and the latencies of the timed stages
+        if profile_overlay:
+            draw_profile_overlay (screen, profiler)
+
+        # Check for Quit command and Quit if yes, P shows or hides the profiling overlay
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                profile_overlay = not profile_overlay
+        # Update the display with the new changes, update clock, the time spent waiting for the next frame is part of "display"
+        with profiler.timer ("display"):
+            pygame.display.update()
+            clock.tick(fps)
+        profiler.end_frame()
+
+    # Stop the background computation of the "tiled" engine before quitting
+    if cs_backend == "tiled":
+        if cspace_build is not None:
+            cspace_build.cancel()
+        release_retired_builds (block=True)
+        cs_executor.shutdown()
+
+    # Write the profiling samples of the run for comparing runs offline
+    if profile_output is not None:
+        profiler.write (profile_output)
+        print ("Profiling samples written to", profile_output)
+
+    pygame.quit()
@@ -0,0 +1,62 @@
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+from collision import convex_pieces, convex_polygons_intersect, bounding_circle, inscribed_radius
+
+# A spatial index of any number of convex or concave obstacle polygons
+# Every obstacle is split into convex pieces for the separating axis test, and the pieces are kept in an STR-tree of their bounding boxes,
+# so a query only tests the pieces near the queried area instead of every obstacle
+# obstacle_corners is a list of (K, 2) arrays of the corner points of the obstacles in pixels, in the order of the edges, without holes
+class ObstacleIndex:
+    def __init__(self, obstacle_corners):
+        pieces, piece_obstacles = [], []
+        for obstacle_number, corners in enumerate(obstacle_corners):
+            for piece in convex_pieces(corners):
+                pieces.append(piece)
+                piece_obstacles.append(obstacle_number)
+
+        # The pieces are padded to the same number of corners by repeating their last corner, which adds an edge of length 0 that never separates
+        most_corners = max((len(piece) for piece in pieces), default=3)
+        self.pieces = np.array([np.concatenate([piece, np.repeat(piece[-1:], most_corners - len(piece), axis=0)]) for piece in pieces]).reshape(-1, most_corners, 2)
+        # The obstacle every piece belongs to, and the bounding circle of every piece for the broad phase of the configuration space
+        # The circle of the same centre inside every piece settles most link tests of the configuration space without the separating axis test
+        self.piece_obstacles = np.array(piece_obstacles, dtype=int)
+        circles = np.array([bounding_circle(piece) for piece in pieces]).reshape(-1, 3)
+        self.circle_x, self.circle_y, self.circle_radius = circles[:, 0], circles[:, 1], circles[:, 2]
+        self.inner_radius = np.array([inscribed_radius(piece, centre_x, centre_y) for piece, (centre_x, centre_y, _) in zip(pieces, circles)])
+        self.tree = STRtree(shapely.polygons(list(self.pieces)) if pieces else [])
+
+    # Number of convex pieces in the index
+    def __len__(self):
+        return len(self.pieces)
+
+    # Find the pieces whose bounding boxes overlap a batch of boxes given by arrays of their corner coordinates
+    # Returns the (box, piece) index pairs as two arrays
+    def query_boxes(self, min_x, min_y, max_x, max_y):
+        if len(self.pieces) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        box_numbers, piece_numbers = self.tree.query(shapely.box(min_x, min_y, max_x, max_y))
+        return box_numbers, piece_numbers
+
+    # Check a batch of convex polygons given as a (N, K, 2) array of corner points against the obstacles, e.g. the link rectangles of a batch of configurations
+    # Returns a boolean array that is True where the polygon hits any obstacle
+    def polygons_hit(self, polygons):
+        polygons = np.asarray(polygons, dtype=float)
+        hits = np.zeros(len(polygons), dtype=bool)
+        polygon_numbers, piece_numbers = self.query_boxes(polygons[..., 0].min(axis=-1), polygons[..., 1].min(axis=-1), polygons[..., 0].max(axis=-1), polygons[..., 1].max(axis=-1))
+        hits[polygon_numbers[convex_polygons_intersect(polygons[polygon_numbers], self.pieces[piece_numbers])]] = True
+        return hits
+
+    # Check a batch of convex polygons given as a (N, K, 2) array of corner points for obstacles within a distance of them, one distance per polygon
+    # Returns a boolean array that is True where an obstacle is within the distance of the polygon or hits it
+    def polygons_near(self, polygons, distances):
+        polygons = np.asarray(polygons, dtype=float)
+        near = np.zeros(len(polygons), dtype=bool)
+        if len(self.pieces) and len(polygons):
+            polygon_numbers, _ = self.tree.query(shapely.polygons(polygons), predicate="dwithin", distance=distances)
+            near[polygon_numbers] = True
+        return near
+
+    # Check a single shapely geometry, e.g. a link polygon, against the obstacles
+    def intersects(self, geometry):
+        return len(self.pieces) > 0 and len(self.tree.query(geometry, predicate="intersects")) > 0
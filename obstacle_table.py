@@ -0,0 +1,88 @@
+import numpy as np
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from cspace import create_obstacle_layer
+from cspace_cache import scene_key
+from obstacle_index import ObstacleIndex
+
+# A function run by the worker processes to compute the layers of one column of obstacle positions, all y offsets for one x offset,
+# and write them bit-packed directly into the memory mapped table file
+def compute_table_column(path, column, offset_x, offsets_y, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, shape_corners):
+    table = np.load(path, mmap_mode="r+")
+    for row, offset_y in enumerate(offsets_y):
+        obstacle_index = ObstacleIndex([shape_corners + (ground_x + offset_x, ground_y + offset_y)])
+        obstacle_layer = create_obstacle_layer(cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_index)
+        table[column, row] = np.packbits(obstacle_layer, axis=1)
+    table.flush()
+    del table
+    return column
+
+# A lookup table of the configuration space layers of one obstacle shape at every position of a lattice of centre offsets, e.g. the 10 pixel steps
+# of the keys that move the obstacles. Moving the obstacle to a position of the lattice only needs the layer of that position from the table
+# The layers are stored bit-packed in one .npy file in table_dir, named after a hash of everything that changes them, and memory mapped,
+# so only the layers that are used are read from disk. A table that was built before, in this or an earlier session, is loaded instead of built
+# shape_corners is a (K, 2) array of the corner points of the obstacle relative to its centre offset, offset_range_x and offset_range_y are
+# (first, last, step) ranges of the centre offsets in pixels relative to the ground, both ends included
+class ObstacleLayerTable:
+    def __init__(self, table_dir, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, shape_corners, offset_range_x, offset_range_y, workers=None):
+        self.cs_resolution = cs_resolution
+        self.size = len(np.arange(0, 2*math.pi, cs_resolution))
+        self.offset_range_x, self.offset_range_y = tuple(offset_range_x), tuple(offset_range_y)
+        self.offsets_x = np.arange(offset_range_x[0], offset_range_x[1] + offset_range_x[2]/2, offset_range_x[2])
+        self.offsets_y = np.arange(offset_range_y[0], offset_range_y[1] + offset_range_y[2]/2, offset_range_y[2])
+        shape_corners = np.asarray(shape_corners, dtype=float)
+        key = scene_key({"table": [cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, shape_corners, self.offset_range_x, self.offset_range_y]})
+        self.path = os.path.join(table_dir, "obstacle_table_" + key + ".npy")
+        self.shape = (len(self.offsets_x), len(self.offsets_y), self.size, (self.size + 7)//8)
+        # Whether the table was built now instead of loaded
+        self.built = False
+
+        try:
+            self.table = np.load(self.path, mmap_mode="r")
+        except FileNotFoundError:
+            self.table = None
+        if self.table is None or self.table.shape != self.shape:
+            self.build(table_dir, (cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, shape_corners), workers)
+
+    # Compute every layer of the table with a process pool, one column of positions per task, by default one worker per core
+    # The workers write into a temporary file that is renamed once it is complete, so a table file is never half written
+    def build(self, table_dir, layer_args, workers):
+        os.makedirs(table_dir, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=table_dir, suffix=".tmp")
+        os.close(file_descriptor)
+        try:
+            table = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.uint8, shape=self.shape)
+            del table
+            tasks = [(temp_path, column, offset_x, self.offsets_y) + layer_args for column, offset_x in enumerate(self.offsets_x)]
+            workers = workers or os.cpu_count()
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(compute_table_column, *zip(*tasks)))
+            else:
+                for task in tasks:
+                    compute_table_column(*task)
+            os.replace(temp_path, self.path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.table = np.load(self.path, mmap_mode="r")
+        self.built = True
+
+    # Number of layers in the table
+    def __len__(self):
+        return len(self.offsets_x)*len(self.offsets_y)
+
+    # Size of the table file in bytes
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    # Get the layer of the obstacle at a centre offset, True for the thetas where either link hits it, or None if the offset is not on the lattice of the table
+    def layer(self, offset_x, offset_y):
+        column = (offset_x - self.offset_range_x[0])/self.offset_range_x[2]
+        row = (offset_y - self.offset_range_y[0])/self.offset_range_y[2]
+        if column != int(column) or row != int(row) or not (0 <= column < len(self.offsets_x) and 0 <= row < len(self.offsets_y)):
+            return None
+        return np.unpackbits(self.table[int(column), int(row)], axis=1, count=self.size).astype(bool)
@@ -0,0 +1,217 @@
+import numpy as np
+import heapq
+import math
+
+# A function to get the distance along one wrapped axis of the grid from every position to the goal position
+# A wall is a row (or column) of the grid that is occupied all the way around, no path can cross it, so the distance
+# is measured the way around the axis that does not cross a wall. Positions that cannot reach the goal get infinity
+def wrapped_axis_distances(is_wall, goal_position):
+    size = len(is_wall)
+    distances = [math.inf]*size
+    distances[goal_position] = 0
+    for direction in (1, -1):
+        for steps in range(1, size):
+            position = (goal_position + direction*steps) % size
+            if is_wall[position]:
+                break
+            distances[position] = min(distances[position], steps)
+    return distances
+
+# A function to find the shortest path between two grid points of a configuration space grid with A*
+# The grid wraps around on both axes, since a joint angle of 0 is the same as 2pi, so a path can leave the grid on one side and enter on the other
+# start and goal are (row, column) indices, i.e. (theta_2 index, theta_1 index), grid points with 1s are obstacles
+# Diagonal moves are only allowed when both grid points next to the diagonal are free, so paths never cut the corner of an obstacle
+# The heuristic is the octile distance with the distance along each axis measured around walls of the grid, for example the columns
+# where link 1 hits an obstacle for every theta_2, so it never overestimates the path length. With use_heuristic=False the search is Dijkstra's algorithm
+# The search is too slow to replan within one frame of the simulation on the 629 x 629 grid of 0.01 rad (benchmarks/bench_planner.py),
+# at that resolution only WavefrontPlanner below plans within a frame
+# Returns the list of (row, column) indices from start to goal, or None if the start or goal is an obstacle or there is no path
+def find_grid_path(cspace_grid, start, goal, use_heuristic=True):
+    cspace_grid = np.asarray(cspace_grid)
+    rows, columns = cspace_grid.shape
+    start_row, start_column = start[0] % rows, start[1] % columns
+    goal_row, goal_column = goal[0] % rows, goal[1] % columns
+
+    # Bytes are much faster than numpy arrays for indexing single elements in the search loop, and quick to create
+    occupied = cspace_grid != 0
+    free = (~occupied).ravel().view(np.uint8).tobytes()
+    start_index, goal_index = start_row*columns + start_column, goal_row*columns + goal_column
+    if not (free[start_index] and free[goal_index]):
+        return None
+
+    # The distance along each axis from every row and column to the goal, a wall between the start and the goal on both sides means there is no path
+    row_distances = wrapped_axis_distances(occupied.all(axis=1).tolist(), goal_row)
+    column_distances = wrapped_axis_distances(occupied.all(axis=0).tolist(), goal_column)
+    if row_distances[start_row] == math.inf or column_distances[start_column] == math.inf:
+        return None
+    if not use_heuristic:
+        row_distances, column_distances = [0]*rows, [0]*columns
+    diagonal_saving = math.sqrt(2) - 2
+
+    # The neighbours of every row and column, wrapped around the grid
+    previous_rows, next_rows = [(row - 1) % rows for row in range(rows)], [(row + 1) % rows for row in range(rows)]
+    previous_columns, next_columns = [(column - 1) % columns for column in range(columns)], [(column + 1) % columns for column in range(columns)]
+    diagonal_cost = math.sqrt(2)
+
+    cost_to_reach = {start_index: 0.0}
+    came_from = {}
+    # A grid point is open until it is expanded, obstacles are never open
+    is_open = bytearray(free)
+    heappush, heappop = heapq.heappush, heapq.heappop
+    # Ties between equal estimates go to the grid point with the higher cost so far, i.e. the one closer to the goal
+    row_distance, column_distance = row_distances[start_row], column_distances[start_column]
+    open_heap = [(row_distance + column_distance + diagonal_saving*min(row_distance, column_distance), 0.0, start_index)]
+
+    while open_heap:
+        _, cost, index = heappop(open_heap)
+        if index == goal_index:
+            break
+        if not is_open[index]:
+            continue
+        is_open[index] = 0
+        cost = -cost
+
+        row, column = divmod(index, columns)
+        row_above, row_below = previous_rows[row]*columns, next_rows[row]*columns
+        this_row = row*columns
+        column_left, column_right = previous_columns[column], next_columns[column]
+        free_above, free_below = free[row_above + column], free[row_below + column]
+        free_left, free_right = free[this_row + column_left], free[this_row + column_right]
+
+        # Orthogonal moves, then diagonal moves that do not cut the corner of an obstacle
+        neighbours = [(row_above + column, 1.0), (row_below + column, 1.0), (this_row + column_left, 1.0), (this_row + column_right, 1.0)]
+        if free_above and free_left:
+            neighbours.append((row_above + column_left, diagonal_cost))
+        if free_above and free_right:
+            neighbours.append((row_above + column_right, diagonal_cost))
+        if free_below and free_left:
+            neighbours.append((row_below + column_left, diagonal_cost))
+        if free_below and free_right:
+            neighbours.append((row_below + column_right, diagonal_cost))
+
+        for next_index, step_cost in neighbours:
+            if not is_open[next_index]:
+                continue
+            next_cost = cost + step_cost
+            if next_cost < cost_to_reach.get(next_index, math.inf):
+                cost_to_reach[next_index] = next_cost
+                came_from[next_index] = index
+                row_distance, column_distance = row_distances[next_index // columns], column_distances[next_index % columns]
+                heappush(open_heap, (next_cost + row_distance + column_distance + diagonal_saving*min(row_distance, column_distance), -next_cost, next_index))
+    else:
+        return None
+
+    # Follow the links back from the goal to the start
+    path = [divmod(goal_index, columns)]
+    index = goal_index
+    while index != start_index:
+        index = came_from[index]
+        path.append(divmod(index, columns))
+    path.reverse()
+    return path
+
+# The 4 move directions that give every edge of the 8-connected grid once, as (row step, column step, cost)
+EDGE_STEPS = [(0, 1, 1.0), (1, 0, 1.0), (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2))]
+
+# A function to get the distance of every free grid point to the nearest obstacle, in grid points, wrapped around both axes
+# The nearest obstacle is never more than half the grid away on either axis, so padding the grid by half its size on every side is enough
+# scipy is imported here and in compute_distance_field instead of at the top, it takes longer to import than the rest of the core together
+def compute_clearance(cspace_grid):
+    from scipy.ndimage import distance_transform_edt
+    free = np.asarray(cspace_grid) == 0
+    rows, columns = free.shape
+    if free.all():
+        return np.full(free.shape, np.inf)
+    padding = ((rows//2 + 1, rows//2 + 1), (columns//2 + 1, columns//2 + 1))
+    clearance = distance_transform_edt(np.pad(free, padding, mode="wrap"))
+    return clearance[padding[0][0]:padding[0][0] + rows, padding[1][0]:padding[1][0] + columns]
+
+# A function to get the cost factor of moving through every grid point, 1 far away from obstacles and up to 1 + clearance_weight next to them
+# The cost of a move is its length times the average factor of the two grid points
+def compute_clearance_penalty(cspace_grid, clearance_weight):
+    if clearance_weight > 0:
+        return 1 + clearance_weight/np.maximum(compute_clearance(cspace_grid), 1)
+    return np.ones(np.shape(cspace_grid))
+
+# A function to get the cost of the path from every grid point to the goal, with the same moves as find_grid_path
+# A wavefront spreads out from the goal with Dijkstra's algorithm, grid points that cannot reach the goal get infinity
+# penalty is the cost factor of every grid point from compute_clearance_penalty, by default moves cost their length
+def compute_distance_field(cspace_grid, goal, penalty=None):
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import dijkstra
+    free = np.asarray(cspace_grid) == 0
+    rows, columns = free.shape
+    goal_row, goal_column = goal[0] % rows, goal[1] % columns
+    distance_field = np.full(free.shape, np.inf)
+    if not free[goal_row, goal_column]:
+        return distance_field
+    if penalty is None:
+        penalty = np.ones(free.shape)
+
+    # Every move between two free grid points is an edge of the graph, diagonal moves only if they do not cut the corner of an obstacle
+    # np.roll wraps the neighbours around the grid
+    indices = np.arange(rows*columns).reshape(rows, columns)
+    sources, targets, weights = [], [], []
+    for row_step, column_step, step_cost in EDGE_STEPS:
+        def shifted(array):
+            return np.roll(array, (-row_step, -column_step), axis=(0, 1))
+        is_edge = free & shifted(free)
+        if row_step and column_step:
+            is_edge &= np.roll(free, -row_step, axis=0) & np.roll(free, -column_step, axis=1)
+        sources.append(indices[is_edge])
+        targets.append(shifted(indices)[is_edge])
+        weights.append(step_cost*(penalty[is_edge] + shifted(penalty)[is_edge])/2)
+    graph = coo_matrix((np.concatenate(weights), (np.concatenate(sources), np.concatenate(targets))), shape=(rows*columns, rows*columns)).tocsr()
+
+    distance_field = dijkstra(graph, directed=False, indices=goal_row*columns + goal_column)
+    return distance_field.reshape(rows, columns)
+
+# A function to find the path from a start grid point to the goal by descending a distance field from compute_distance_field
+# Every step moves to the neighbour with the lowest cost of the move plus the distance of the neighbour, which follows a cheapest path to the goal
+# and is as quick to find as the path is long. penalty must be the same as for compute_distance_field
+# Returns the list of (row, column) indices from start to goal, or None if the start cannot reach the goal
+def descend_distance_field(cspace_grid, distance_field, start, penalty=None):
+    free = np.asarray(cspace_grid) == 0
+    rows, columns = distance_field.shape
+    row, column = start[0] % rows, start[1] % columns
+    if not (free[row, column] and np.isfinite(distance_field[row, column])):
+        return None
+    if penalty is None:
+        penalty = np.ones(distance_field.shape)
+
+    path = [(row, column)]
+    while distance_field[row, column] > 0:
+        best_distance, best_step = math.inf, None
+        for row_step, column_step in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)):
+            next_row, next_column = (row + row_step) % rows, (column + column_step) % columns
+            if not free[next_row, next_column]:
+                continue
+            if row_step and column_step and not (free[next_row, column] and free[row, next_column]):
+                continue
+            step_cost = math.sqrt(2) if row_step and column_step else 1.0
+            distance = distance_field[next_row, next_column] + step_cost*(penalty[row, column] + penalty[next_row, next_column])/2
+            if distance < best_distance:
+                best_distance, best_step = distance, (next_row, next_column)
+        row, column = best_step
+        path.append(best_step)
+    return path
+
+# A planner that keeps the distance field of the goal, so that paths from any start are found instantly
+# The distance field is only computed again when the configuration space grid or the goal changes
+class WavefrontPlanner:
+    def __init__(self, clearance_weight=0.0):
+        self.clearance_weight = clearance_weight
+        self.occupied = None
+        self.goal = None
+        self.penalty = None
+        self.distance_field = None
+
+    # Find the path from start to goal on the grid, returns the list of (row, column) indices or None if there is no path
+    def find_path(self, cspace_grid, start, goal):
+        occupied = np.asarray(cspace_grid) != 0
+        goal = (goal[0] % occupied.shape[0], goal[1] % occupied.shape[1])
+        if goal != self.goal or self.occupied is None or not np.array_equal(occupied, self.occupied):
+            self.occupied, self.goal = occupied, goal
+            self.penalty = compute_clearance_penalty(cspace_grid, self.clearance_weight)
+            self.distance_field = compute_distance_field(cspace_grid, goal, self.penalty)
+        return descend_distance_field(cspace_grid, self.distance_field, start, self.penalty)
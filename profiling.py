@@ -0,0 +1,78 @@
+import numpy as np
+import collections
+import contextlib
+import csv
+import json
+import time
+
+# Named timers for the stages of the simulation, with rolling latency percentiles for an on-screen overlay
+# and every sample kept for writing to CSV or JSON, so that runs can be compared offline
+class Profiler:
+    # window is the number of recent samples of every timer used for the percentiles and the frame rate
+    # max_samples limits the number of samples kept for writing, None keeps every sample of the run
+    def __init__(self, window=120, max_samples=None):
+        self.window = window
+        self.recent = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.samples = collections.deque(maxlen=max_samples)
+        self.frame_times = collections.deque(maxlen=window)
+        self.frame_number = 0
+
+    # Time the code inside a with block under the given name, e.g. with profiler.timer("cs_render"): ...
+    @contextlib.contextmanager
+    def timer(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    # Add a sample in seconds to a timer, for stages that are timed without timer()
+    def record(self, name, seconds):
+        self.recent[name].append(seconds)
+        self.samples.append((self.frame_number, name, seconds))
+
+    # Mark the end of a frame, once per frame of the simulation loop
+    def end_frame(self):
+        self.frame_times.append(time.perf_counter())
+        self.frame_number += 1
+
+    # The actual frames per second over the recent frames
+    def fps(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        return (len(self.frame_times) - 1)/(self.frame_times[-1] - self.frame_times[0])
+
+    # p50 and p95 latency in milliseconds and the number of recent samples of every timer, in the order the timers were first used
+    def summary(self):
+        return {name: {"p50_ms": 1000*float(np.percentile(recent, 50)), "p95_ms": 1000*float(np.percentile(recent, 95)), "count": len(recent)}
+                for name, recent in self.recent.items() if recent}
+
+    # Lines of text for the overlay, the frame rate first and then one line per timer
+    def overlay_lines(self):
+        lines = ["FPS " + format(self.fps(), ".1f")]
+        for name, latency in self.summary().items():
+            lines.append(format(name, "12s") + " p50 " + format(latency["p50_ms"], "6.2f") + " ms  p95 " + format(latency["p95_ms"], "6.2f") + " ms")
+        return lines
+
+    # Write every kept sample as a row of frame, timer and milliseconds
+    def write_csv(self, path):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame", "timer", "ms"])
+            for frame_number, name, seconds in self.samples:
+                writer.writerow([frame_number, name, 1000*seconds])
+
+    # Write the summary and every kept sample of each timer, in milliseconds
+    def write_json(self, path):
+        samples = collections.defaultdict(list)
+        for frame_number, name, seconds in self.samples:
+            samples[name].append([frame_number, 1000*seconds])
+        with open(path, "w") as file:
+            json.dump({"frames": self.frame_number, "fps": self.fps(), "summary": self.summary(), "samples": samples}, file)
+
+    # Write the samples to a .csv or .json file, chosen by the file extension
+    def write(self, path):
+        if path.endswith(".json"):
+            self.write_json(path)
+        else:
+            self.write_csv(path)
@@ -0,0 +1,163 @@
+import numpy as np
+import math
+from collision import link_corners, shrink_link_rectangles
+from cspace import joint_limit_mask
+
+# Node states of the quadtree, MIXED nodes have children
+FREE, OCCUPIED, MIXED = 0, 1, 2
+
+# Margin in pixels added to the motion bounds, far above the rounding errors of the link corners, so that the bounds stay conservative
+BOUND_MARGIN = 1e-6
+
+# A configuration space of a 2link RR manipulator as a quadtree over the grid points of the dense configuration space grid
+# It starts with one cell for the whole grid and only divides the cells that hold both free and occupied grid points, so large free or occupied regions
+# stay single cells and only the regions near the boundaries of the obstacles are refined down to single grid points
+# A cell is decided with conservative bounds on how far the links can move within the angles of the cell:
+# - free, if the link rectangles at the centre of the cell are further from every obstacle than the links can move
+# - occupied, if a link rectangle shrunk by the distance the link can move still hits an obstacle, the shrunk rectangle is inside the link for every angle of the cell
+# Single grid points are checked exactly like the vectorized engine, so rasterise() gives exactly the grid of create_configuration_space
+class QuadtreeCSpace:
+    def __init__(self, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_index, joint_limits):
+        self.cs_resolution = cs_resolution
+        self.theta_space = np.arange(0, 2*math.pi, cs_resolution)
+        self.size = len(self.theta_space)
+        self.ground_x, self.ground_y = ground_x, ground_y
+        self.link_length_1, self.link_length_2, self.half_width = link_length_1, link_length_2, half_width
+        self.obstacle_index = obstacle_index
+        joint_1_lower_lim, joint_1_upper_lim, joint_2_lower_lim, joint_2_upper_lim = joint_limits
+        # Running counts of the grid points within the joint limits along each axis, to count them in any range of columns or rows
+        self.within_columns = np.concatenate([[0], np.cumsum(joint_limit_mask(self.theta_space, joint_1_lower_lim, joint_1_upper_lim))])
+        self.within_rows = np.concatenate([[0], np.cumsum(joint_limit_mask(self.theta_space, joint_2_lower_lim, joint_2_upper_lim))])
+
+        # Every cell covers the columns column_start to column_stop - 1 and the rows row_start to row_stop - 1 of the dense grid
+        # The children of a MIXED cell are the child_count cells from first_child on
+        self.column_start, self.column_stop, self.row_start, self.row_stop = [np.array([0, self.size, 0, self.size])[k:k + 1] for k in range(4)]
+        self.state = np.zeros(1, dtype=np.int8)
+        self.first_child = np.zeros(1, dtype=int)
+        self.child_count = np.zeros(1, dtype=int)
+        self.cells_bounded = 0
+        self.points_checked = 0
+        self.build()
+
+    # Build the quadtree one level at a time, every level decides all of its cells in one batch
+    def build(self):
+        level = np.arange(1)
+        while len(level):
+            column_start, column_stop, row_start, row_stop = self.column_start[level], self.column_stop[level], self.row_start[level], self.row_stop[level]
+            single_point = (column_stop - column_start == 1) & (row_stop - row_start == 1)
+            state = np.full(len(level), MIXED, dtype=np.int8)
+            state[single_point] = self.check_points(column_start[single_point], row_start[single_point])
+            state[~single_point] = self.bound_cells(column_start[~single_point], column_stop[~single_point], row_start[~single_point], row_stop[~single_point])
+            self.state[level] = state
+            level = self.divide(level[state == MIXED])
+
+    # Divide cells into up to four children, halving their columns and rows, returns the numbers of the children
+    def divide(self, cells):
+        column_start, column_stop, row_start, row_stop = self.column_start[cells], self.column_stop[cells], self.row_start[cells], self.row_stop[cells]
+        column_middle, row_middle = (column_start + column_stop)//2, (row_start + row_stop)//2
+        # Cells of one column or row are only divided along the other axis
+        column_halves = np.where(column_stop - column_start > 1, 2, 1)
+        row_halves = np.where(row_stop - row_start > 1, 2, 1)
+        child_count = column_halves*row_halves
+        parent = np.repeat(np.arange(len(cells)), child_count)
+        child_number = np.arange(len(parent)) - np.repeat(np.cumsum(child_count) - child_count, child_count)
+        # The children go through the halves along the columns first
+        upper_column = (child_number % column_halves[parent]) == 1
+        upper_row = (child_number // column_halves[parent]) == 1
+
+        first_new = len(self.state)
+        self.first_child[cells] = first_new + np.cumsum(child_count) - child_count
+        self.child_count[cells] = child_count
+        self.column_start = np.concatenate([self.column_start, np.where(upper_column, column_middle[parent], column_start[parent])])
+        self.column_stop = np.concatenate([self.column_stop, np.where(upper_column | (column_halves[parent] == 1), column_stop[parent], column_middle[parent])])
+        self.row_start = np.concatenate([self.row_start, np.where(upper_row, row_middle[parent], row_start[parent])])
+        self.row_stop = np.concatenate([self.row_stop, np.where(upper_row | (row_halves[parent] == 1), row_stop[parent], row_middle[parent])])
+        self.state = np.concatenate([self.state, np.full(len(parent), MIXED, dtype=np.int8)])
+        self.first_child = np.concatenate([self.first_child, np.zeros(len(parent), dtype=int)])
+        self.child_count = np.concatenate([self.child_count, np.zeros(len(parent), dtype=int)])
+        return np.arange(first_new, len(self.state))
+
+    # Check single grid points exactly, with the same link rectangles and separating axis test as the vectorized engine
+    def check_points(self, columns, rows):
+        self.points_checked += len(columns)
+        within_limits = (np.diff(self.within_columns)[columns] > 0) & (np.diff(self.within_rows)[rows] > 0)
+        theta_1, theta_2 = self.theta_space[columns], self.theta_space[rows]
+        corners_1, joint_2_x, joint_2_y = link_corners(self.ground_x, self.ground_y, self.link_length_1, self.half_width, theta_1)
+        corners_2, _, _ = link_corners(joint_2_x, joint_2_y, self.link_length_2, self.half_width, theta_1 + theta_2)
+        hits = self.obstacle_index.polygons_hit(corners_1) | self.obstacle_index.polygons_hit(corners_2)
+        return np.where(within_limits & ~hits, FREE, OCCUPIED)
+
+    # Decide cells of more than one grid point with the conservative bounds, returns FREE, OCCUPIED or MIXED for every cell
+    def bound_cells(self, column_start, column_stop, row_start, row_stop):
+        self.cells_bounded += len(column_start)
+        state = np.full(len(column_start), MIXED, dtype=np.int8)
+
+        # Joint limits: a cell is occupied if all its columns or all its rows are out of the limits, and can only be free if all are within them
+        columns_within = self.within_columns[column_stop] - self.within_columns[column_start]
+        rows_within = self.within_rows[row_stop] - self.within_rows[row_start]
+        out_of_limits = (columns_within == 0) | (rows_within == 0)
+        within_limits = (columns_within == column_stop - column_start) & (rows_within == row_stop - row_start)
+        state[out_of_limits] = OCCUPIED
+        cells = np.flatnonzero(~out_of_limits)
+
+        # The link rectangles at the centre of every cell and half of the angles the cell spans
+        half_range_1 = (column_stop[cells] - 1 - column_start[cells])*self.cs_resolution/2
+        half_range_2 = (row_stop[cells] - 1 - row_start[cells])*self.cs_resolution/2
+        theta_1 = self.theta_space[column_start[cells]] + half_range_1
+        theta_2 = self.theta_space[row_start[cells]] + half_range_2
+        corners_1, joint_2_x, joint_2_y = link_corners(self.ground_x, self.ground_y, self.link_length_1, self.half_width, theta_1)
+        corners_2, _, _ = link_corners(joint_2_x, joint_2_y, self.link_length_2, self.half_width, theta_1 + theta_2)
+
+        # No point of a link moves further than its distance from the centre of rotation times the angle it turns:
+        # link 1 turns by up to half_range_1 about the ground, link 2 moves with joint 2 and turns by up to half_range_1 + half_range_2 about it
+        motion_1 = math.hypot(self.link_length_1, self.half_width)*half_range_1 + BOUND_MARGIN
+        motion_2 = self.link_length_1*half_range_1 + math.hypot(self.link_length_2, self.half_width)*(half_range_1 + half_range_2) + BOUND_MARGIN
+
+        # Occupied if a shrunk link rectangle, which every rectangle of the cell contains, hits an obstacle
+        occupied = np.zeros(len(cells), dtype=bool)
+        for corners, motion in ((corners_1, motion_1), (corners_2, motion_2)):
+            shrunk, exists = shrink_link_rectangles(corners, motion)
+            candidates = np.flatnonzero(exists & ~occupied)
+            occupied[candidates] = self.obstacle_index.polygons_hit(shrunk[candidates])
+        state[cells[occupied]] = OCCUPIED
+
+        # Free if the cell is within the joint limits and no obstacle is within reach of either link
+        candidates = np.flatnonzero(~occupied & within_limits[cells])
+        near = self.obstacle_index.polygons_near(corners_1[candidates], motion_1[candidates])
+        candidates = candidates[~near]
+        near = self.obstacle_index.polygons_near(corners_2[candidates], motion_2[candidates])
+        state[cells[candidates[~near]]] = FREE
+        return state
+
+    # The value of the grid point of the thetas, 1 for occupied and 0 for free, found the same way as theta_to_index_value finds the grid point in the dense grid
+    def query(self, theta_1, theta_2):
+        column = min(int(((theta_1 % (2*math.pi))/(2*math.pi))*self.size), self.size - 1)
+        row = min(int(((theta_2 % (2*math.pi))/(2*math.pi))*self.size), self.size - 1)
+        cell = 0
+        while self.state[cell] == MIXED:
+            first_child = self.first_child[cell]
+            for child in range(first_child, first_child + self.child_count[cell]):
+                if self.column_start[child] <= column < self.column_stop[child] and self.row_start[child] <= row < self.row_stop[child]:
+                    cell = child
+                    break
+        return int(self.state[cell])
+
+    # Fill in the dense configuration space grid from the leaves of the quadtree, 1s for occupied grid points and 0s for free grid points
+    def rasterise(self):
+        occupied = np.flatnonzero(self.state == OCCUPIED)
+        # Every occupied cell adds 1 to its rectangle of grid points, the running sums of the corners along both axes fill the rectangles
+        corner_counts = np.zeros((self.size + 1, self.size + 1), dtype=int)
+        for rows, columns, sign in ((self.row_start, self.column_start, 1), (self.row_start, self.column_stop, -1), (self.row_stop, self.column_start, -1), (self.row_stop, self.column_stop, 1)):
+            np.add.at(corner_counts, (rows[occupied], columns[occupied]), sign)
+        return (corner_counts.cumsum(axis=0).cumsum(axis=1)[:self.size, :self.size] > 0).astype(int)
+
+    # Counts of the quadtree, with the cells decided by bounds and the grid points checked exactly compared with the grid points of the dense grid
+    def stats(self):
+        leaves = self.state != MIXED
+        return {"cells": len(self.state), "leaves": int(np.count_nonzero(leaves)), "cells_bounded": self.cells_bounded, "points_checked": self.points_checked,
+                "dense_points": self.size*self.size, "evaluated_fraction": (self.cells_bounded + self.points_checked)/(self.size*self.size)}
+
+# A function to describe the counters of QuadtreeCSpace.stats in one line
+def format_quadtree_stats(stats):
+    return ("Quadtree: " + str(stats["leaves"]) + " leaves, " + str(stats["cells_bounded"]) + " cells bounded and " + str(stats["points_checked"]) + " grid points checked of "
+            + str(stats["dense_points"]) + " (" + format(100*stats["evaluated_fraction"], ".1f") + "% of the dense grid)")
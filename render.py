@@ -0,0 +1,162 @@
+# Command line entry point to render trajectories of the 2-link manipulator to frames without a display, as fast as they can be drawn
+# Every row of a trajectory becomes one frame of the workspace and the C-space plot, drawn with the drawing functions of main.py on offscreen surfaces,
+# and the frames are written as numbered PNG files or streamed as raw RGB frames, e.g. to ffmpeg
+# Run from the repository folder: python render.py demo_trajectory.npy --output frames
+#
+# --scenes takes a JSON or NPZ file of scenes like cli.py, with one scene for all trajectories or one scene per trajectory, the default scene by default
+# --timed shortens every trajectory and times it under the joint limits like the playback of the simulation, with one frame every 1/fps seconds
+# Raw frames of a single trajectory can be piped to a video encoder:
+#   python render.py demo_trajectory.npy --format raw --output - | ffmpeg -f rawvideo -pixel_format rgb24 -video_size 1400x700 -framerate 60 -i - demo.mp4
+import os
+# Render without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import argparse
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pygame
+import main as simulation
+from collision import manipulator_corners
+from scene import create_scene, create_configuration_space, create_obstacle_corners, create_obstacle_index, create_timed_trajectory
+
+# Number of frames of one task of the process pool, enough to keep the workers busy with one trajectory and to spread many trajectories over them
+FRAMES_PER_TASK = 64
+
+# Renders the frames of a trajectory of a 2-link scene on offscreen surfaces
+# Everything that is the same in every frame, the titles, the obstacles, the C-space plot with the path and the goal, is drawn once on a background surface,
+# every frame is a copy of the background with only the manipulator and the current configuration drawn on top
+class FrameRenderer:
+    def __init__(self, scene, trajectory, cspace_grid=None):
+        self.scene = scene
+        self.trajectory = np.asarray(trajectory, dtype=float)
+        self.cspace_grid = create_configuration_space(scene) if cspace_grid is None else cspace_grid
+
+        # The colours of the links of every row, red where the link hits an obstacle, checked for the whole trajectory in one batch
+        ground_x, ground_y = scene["ground"]
+        link_length_1, link_length_2 = scene["link_lengths"]
+        obstacle_index = create_obstacle_index(scene, scene["obstacles"])
+        corners_1, corners_2 = manipulator_corners(ground_x, ground_y, link_length_1, link_length_2, scene["link_width"]//2, self.trajectory[:, 0], self.trajectory[:, 1])
+        self.link_1_hits, self.link_2_hits = obstacle_index.polygons_hit(corners_1), obstacle_index.polygons_hit(corners_2)
+
+        pygame.font.init()
+        font = pygame.font.SysFont(name= None, size= 30 )
+        self.background = pygame.Surface((simulation.SCREEN_WIDTH, simulation.SCREEN_HEIGHT))
+        self.frame = pygame.Surface((simulation.SCREEN_WIDTH, simulation.SCREEN_HEIGHT))
+        self.background.fill(color=simulation.COLOUR_SCREEN)
+        pygame.draw.line(surface=self.background, color=simulation.COLOUR_TEXT, start_pos=(700, 0), end_pos=(700, 700), width=5)
+        self.background.blit(source=font.render("Workspace", True, simulation.COLOUR_TEXT), dest=(300, 670))
+        self.background.blit(source=font.render("C-Space", True, simulation.COLOUR_TEXT), dest=(1000, 670))
+        for obstacle in scene["obstacles"]:
+            pygame.draw.polygon(surface=self.background, color=simulation.COLOUR_OBSTACLE, points=create_obstacle_corners(scene, obstacle).tolist())
+        simulation.draw_configuration_space(self.background, self.cspace_grid)
+        simulation.draw_path_in_cs(self.background, self.trajectory, simulation.COLOUR_PATH, self.cspace_grid)
+        goal_theta_1, goal_theta_2 = scene["goal"] if scene["goal"] is not None else self.trajectory[-1]
+        simulation.draw_goal_point_in_cs(self.background, goal_theta_1 % (2*math.pi), goal_theta_2 % (2*math.pi), simulation.COLOUR_GOAL, self.cspace_grid)
+
+    # Number of frames, one per row of the trajectory
+    def __len__(self):
+        return len(self.trajectory)
+
+    # Draw the frame of a row of the trajectory, returns the surface of the frame, which is drawn over by the next frame
+    def render(self, frame_number):
+        ground_x, ground_y = self.scene["ground"]
+        link_length_1, link_length_2 = self.scene["link_lengths"]
+        theta_1, theta_2 = self.trajectory[frame_number] % (2*math.pi)
+        self.frame.blit(self.background, (0, 0))
+        simulation.draw_manipulator(self.frame, ground_x, ground_y, link_length_1, link_length_2, self.scene["link_width"]//2, theta_1, theta_2,
+                                    simulation.COLOUR_LINK1_COLLISION if self.link_1_hits[frame_number] else simulation.COLOUR_LINK1,
+                                    simulation.COLOUR_LINK2_COLLISION if self.link_2_hits[frame_number] else simulation.COLOUR_LINK2)
+        simulation.draw_current_point_in_cs(self.frame, theta_1, theta_2, simulation.COLOUR_LINK1, self.cspace_grid)
+        return self.frame
+
+    # Write the frames of a range of rows as numbered PNG files, frame_00000.png and on, into output_dir
+    def write_png_frames(self, output_dir, frame_start=0, frame_stop=None):
+        for frame_number in range(frame_start, len(self) if frame_stop is None else frame_stop):
+            pygame.image.save(self.render(frame_number), os.path.join(output_dir, "frame_" + str(frame_number).zfill(5) + ".png"))
+
+    # Write every frame to a binary stream as raw RGB bytes, SCREEN_WIDTH x SCREEN_HEIGHT x 3 bytes per frame
+    def write_raw_frames(self, stream):
+        for frame_number in range(len(self)):
+            stream.write(pygame.image.tobytes(self.render(frame_number), "RGB"))
+
+# The renderers of the worker processes by job name, so that the background of a trajectory is only drawn once per worker
+renderers = {}
+
+# A function run by the worker processes to render a range of frames of a trajectory to PNG files, or every frame to a raw file if frame_start is None
+# Returns the number of frames written
+def render_task(name, scene, trajectory, output, frame_start, frame_stop):
+    if name not in renderers:
+        renderers.clear()
+        renderers[name] = FrameRenderer(scene, trajectory)
+    renderer = renderers[name]
+    if frame_start is None:
+        with open(output, "wb") as file:
+            renderer.write_raw_frames(file)
+        return len(renderer)
+    renderer.write_png_frames(output, frame_start, frame_stop)
+    return frame_stop - frame_start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render trajectories of the manipulator to PNG frames or raw RGB frames without a display")
+    parser.add_argument("trajectories", nargs="+", help=".npy files of [theta_1, theta_2] rows, e.g. demo_trajectory.npy or the paths of cli.py")
+    parser.add_argument("--scenes", default=None, help="JSON or NPZ file of one scene for all trajectories or one scene per trajectory (default: the default scene)")
+    parser.add_argument("-o", "--output", default="frames", help="folder for a folder of PNG frames or a .rgb file per trajectory, - streams the raw frames of one trajectory to stdout (default: frames)")
+    parser.add_argument("--format", default="png", choices=["png", "raw"], help="numbered PNG files or raw RGB frames of SCREEN_WIDTH x SCREEN_HEIGHT (default: png)")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes, each renders chunks of frames (default: 1)")
+    parser.add_argument("--timed", action="store_true", help="shorten and time every trajectory under the joint limits and render one frame every 1/fps seconds")
+    parser.add_argument("--fps", type=float, default=simulation.fps, help="frame rate of --timed (default: " + str(simulation.fps) + ")")
+    parser.add_argument("--max-velocity", type=float, default=simulation.max_joint_velocity, help="joint velocity limit of --timed in rad/s (default: " + str(simulation.max_joint_velocity) + ")")
+    parser.add_argument("--max-acceleration", type=float, default=simulation.max_joint_acceleration, help="joint acceleration limit of --timed in rad/s^2 (default: " + str(simulation.max_joint_acceleration) + ")")
+    args = parser.parse_args(argv)
+
+    from cli import load_scenes
+    scenes = load_scenes(args.scenes) if args.scenes is not None else [create_scene()]
+    if len(scenes) not in (1, len(args.trajectories)):
+        parser.error(str(len(scenes)) + " scenes for " + str(len(args.trajectories)) + " trajectories, give one scene for all of them or one per trajectory")
+    if args.output == "-" and (args.format != "raw" or len(args.trajectories) != 1):
+        parser.error("--output - streams the raw frames of a single trajectory")
+    # Progress goes to stderr while the frames go to stdout
+    log = sys.stderr if args.output == "-" else sys.stdout
+
+    jobs = []
+    for k, trajectory_path in enumerate(args.trajectories):
+        scene = scenes[k if len(scenes) > 1 else 0]
+        trajectory = np.load(trajectory_path)
+        if args.timed:
+            _, trajectory = create_timed_trajectory(scene, trajectory, args.max_velocity, args.max_acceleration, 1/args.fps)
+        name = os.path.splitext(os.path.basename(trajectory_path))[0] + ("_" + str(k) if len(args.trajectories) > 1 else "")
+        jobs.append((name, scene, trajectory))
+
+    start_time = time.perf_counter()
+    if args.output == "-":
+        name, scene, trajectory = jobs[0]
+        FrameRenderer(scene, trajectory).write_raw_frames(sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+        number_of_frames = len(trajectory)
+    else:
+        # PNG frames are split into tasks of FRAMES_PER_TASK frames, a raw file is written in order by one task
+        tasks = []
+        for name, scene, trajectory in jobs:
+            if args.format == "png":
+                os.makedirs(os.path.join(args.output, name), exist_ok=True)
+                tasks.extend((name, scene, trajectory, os.path.join(args.output, name), frame_start, min(frame_start + FRAMES_PER_TASK, len(trajectory)))
+                             for frame_start in range(0, len(trajectory), FRAMES_PER_TASK))
+            else:
+                os.makedirs(args.output, exist_ok=True)
+                tasks.append((name, scene, trajectory, os.path.join(args.output, name + ".rgb"), None, None))
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as executor:
+                number_of_frames = sum(executor.map(render_task, *zip(*tasks)))
+        else:
+            number_of_frames = sum(render_task(*task) for task in tasks)
+
+    seconds = time.perf_counter() - start_time
+    print(number_of_frames, "frames of", len(jobs), "trajectories in", format(seconds, ".2f"), "s,", format(number_of_frames/seconds, ".0f"), "frames/s,",
+          str(simulation.SCREEN_WIDTH) + "x" + str(simulation.SCREEN_HEIGHT), args.format, file=log)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+import numpy as np
+import heapq
+import math
+from collision import chain_corners, shrink_link_rectangles, angle_within_interval
+from cspace import joint_limit_mask
+
+# Largest number of link rectangles checked in one call of the separating axis test, so that big batches do not need a lot of memory
+CHUNK_LINKS = 65536
+
+# Largest change of any joint angle between the rows of the trajectories of the sampling based planners, in radians
+TRAJECTORY_STEP = 0.05
+
+# A function to get the wrapped differences from one batch of configurations to another, every joint angle difference is in [-pi, pi)
+def wrapped_difference(thetas_from, thetas_to):
+    return (np.asarray(thetas_to, dtype=float) - np.asarray(thetas_from, dtype=float) + math.pi) % (2*math.pi) - math.pi
+
+# A function to get the distances between configurations on the torus of joint angles, the length of the wrapped differences
+def wrapped_distance(thetas_from, thetas_to):
+    return np.linalg.norm(wrapped_difference(thetas_from, thetas_to), axis=-1)
+
+# A function to wrap joint angles into [0, 2pi), the range of the configuration space grid and of the KD-trees
+def wrap_angles(thetas):
+    thetas = np.mod(np.asarray(thetas, dtype=float), 2*math.pi)
+    # mod rounds tiny negative angles up to exactly 2pi
+    return np.where(thetas >= 2*math.pi, 0.0, thetas)
+
+# A function to create a KD-tree of configurations with the toroidal metric, every axis wraps around at 2pi like the joint angles
+def create_toroidal_tree(thetas):
+    from scipy.spatial import cKDTree
+    return cKDTree(wrap_angles(thetas), boxsize=2*math.pi)
+
+# A function to get the distance from every joint of an N-link chain to the furthest point of the links it moves
+# Rotating joint j moves the links from j on rigidly about the joint, and no point of them is further from it than their lengths plus half_width
+def joint_reach(link_lengths, half_width):
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    return np.cumsum(link_lengths[::-1])[::-1] + half_width
+
+# Collision checks of an N-link planar manipulator against the obstacles of an ObstacleIndex, for batches of configurations and motions
+# joint_limits holds a lower and an upper limit for every joint in the format of the scene, [joint_1_lower_lim, joint_1_upper_lim, ...], or None for no limits
+# Like the configuration space grid, the links are only checked against the obstacles and not against each other
+#
+# Turning joint j by d radians moves no point of the links by more than joint_reach[j]*d, so a straight motion in joint space is cut into pieces in which no point
+# of the links moves more than tolerance pixels, and each piece is checked at its middle configuration with the link rectangles grown by half of that movement.
+# A piece that stays clear is free as a whole. Otherwise its middle configuration is checked exactly, a hit is a collision of the motion, and if it is free
+# the piece is cut in two and checked again, until the links move less than min_tolerance pixels within the piece. Such a piece is taken as free,
+# its links can only reach into an obstacle by less than min_tolerance. So motions are checked against the exact link rectangles like single configurations,
+# between their configurations too, with few checks far from the obstacles, and a link that only comes near an obstacle is no collision
+class ChainCollisionChecker:
+    def __init__(self, ground_x, ground_y, link_lengths, half_width, obstacle_index, joint_limits=None, tolerance=40.0, min_tolerance=0.1):
+        self.ground_x, self.ground_y = ground_x, ground_y
+        self.link_lengths = np.asarray(link_lengths, dtype=float)
+        self.half_width = half_width
+        self.obstacle_index = obstacle_index
+        self.joint_limits = None if joint_limits is None else np.asarray(joint_limits, dtype=float).reshape(-1, 2)
+        if self.joint_limits is not None and len(self.joint_limits) != len(self.link_lengths):
+            raise ValueError("joint_limits needs a lower and an upper limit for each of the " + str(len(self.link_lengths)) + " joints")
+        self.tolerance, self.min_tolerance = tolerance, min_tolerance
+        self.joint_reach = joint_reach(self.link_lengths, half_width)
+        # Number of configurations checked so far
+        self.checks = 0
+
+    # Number of joints of the manipulator
+    @property
+    def dimensions(self):
+        return len(self.link_lengths)
+
+    # Check a batch of configurations given as an (M, N) array of joint angles, returns a boolean array that is True for the free configurations
+    def configurations_free(self, thetas):
+        thetas = np.reshape(thetas, (-1, self.dimensions))
+        return self.configurations_clear(thetas, np.zeros(thetas.shape))
+
+    # Check that the links stay clear of the obstacles and the joint limits around a batch of configurations given as an (M, N) array of joint angles
+    # Every joint angle can be up to half_ranges radians, an (M, N) array, away from the configuration. The joint limits are checked over these ranges of angles,
+    # and the link rectangles are grown on every side by the furthest any point of the links can move within them
+    # Returns a boolean array that is True for the configurations that are clear, with half_ranges of 0 that is the exact check of configurations_free
+    def configurations_clear(self, thetas, half_ranges):
+        thetas = wrap_angles(np.reshape(thetas, (-1, self.dimensions)))
+        half_ranges = np.reshape(half_ranges, (-1, self.dimensions))
+        clear = np.ones(len(thetas), dtype=bool)
+        if self.joint_limits is not None:
+            for joint, (lower_lim, upper_lim) in enumerate(self.joint_limits):
+                clear &= joint_limit_mask(thetas[:, joint], lower_lim, upper_lim)
+                # If upper_lim is below lower_lim, the joint angles from upper_lim up to lower_lim are out of the limits, none of them may be within the range
+                if upper_lim < lower_lim:
+                    clear &= ~angle_within_interval(thetas[:, joint], (lower_lim + upper_lim)/2, (lower_lim - upper_lim)/2 + half_ranges[:, joint])
+
+        # Only the configurations within the joint limits are checked against the obstacles, in chunks of configurations
+        candidates = np.flatnonzero(clear)
+        margins = half_ranges @ self.joint_reach
+        chunk_size = max(1, CHUNK_LINKS//self.dimensions)
+        for chunk_start in range(0, len(candidates), chunk_size):
+            chunk = candidates[chunk_start:chunk_start + chunk_size]
+            corners = chain_corners(self.ground_x, self.ground_y, self.link_lengths, self.half_width, thetas[chunk]).reshape(-1, 4, 2)
+            # Only the rectangles with a margin are grown, so the others are exactly the rectangles of the configurations
+            grown = np.repeat(margins[chunk] > 0, self.dimensions)
+            if grown.any():
+                corners[grown], _ = shrink_link_rectangles(corners[grown], -np.repeat(margins[chunk], self.dimensions)[grown])
+            hits = self.obstacle_index.polygons_hit(corners).reshape(len(chunk), self.dimensions).any(axis=1)
+            clear[chunk[hits]] = False
+        self.checks += len(thetas)
+        return clear
+
+    # Check a batch of straight motions in joint space, from every row of thetas_from to the same row of thetas_to, each the short way around every joint
+    # The pieces of all motions are checked together, one batch per round of cutting them in two, see the comment of the class
+    # Returns for every motion the fraction of the motion up to which it is free, 1.0 for the motions without collisions and less for the others,
+    # which are only checked up to their first piece that is not clear
+    def free_fractions(self, thetas_from, thetas_to):
+        thetas_from = np.reshape(np.asarray(thetas_from, dtype=float), (-1, self.dimensions))
+        difference = wrapped_difference(thetas_from, np.reshape(thetas_to, (-1, self.dimensions)))
+        pieces = np.maximum(1, np.ceil(np.abs(difference) @ self.joint_reach/self.tolerance)).astype(int)
+        motion_numbers = np.repeat(np.arange(len(pieces)), pieces)
+        widths = 1/pieces[motion_numbers]
+        middles = (np.arange(len(motion_numbers)) - np.repeat(np.cumsum(pieces) - pieces, pieces) + 0.5)*widths
+        fractions = np.ones(len(pieces))
+
+        while len(motion_numbers):
+            thetas = thetas_from[motion_numbers] + middles[:, None]*difference[motion_numbers]
+            half_ranges = np.abs(difference[motion_numbers])*widths[:, None]/2
+            # The pieces and their middle configurations are checked in one batch, the exact check only matters for the pieces that are not clear
+            clear = self.configurations_clear(np.concatenate([thetas, thetas]), np.concatenate([half_ranges, np.zeros_like(half_ranges)]))
+            doubtful = np.flatnonzero(~clear[:len(thetas)])
+            hits = ~clear[len(thetas) + doubtful]
+            # A motion with a colliding middle configuration is free up to the start of its first piece that is not clear,
+            # the pieces of the other motions that are not clear are cut in two, unless the links hardly move within them
+            colliding = np.isin(motion_numbers[doubtful], motion_numbers[doubtful[hits]])
+            np.minimum.at(fractions, motion_numbers[doubtful[colliding]], middles[doubtful[colliding]] - widths[doubtful[colliding]]/2)
+            split = doubtful[~colliding]
+            split = split[half_ranges[split] @ self.joint_reach > self.min_tolerance/2]
+            motion_numbers, widths = np.repeat(motion_numbers[split], 2), np.repeat(widths[split]/2, 2)
+            middles = np.repeat(middles[split], 2) + np.tile([-0.5, 0.5], len(split))*widths
+        return fractions
+
+    # Check a batch of motions at once, returns a boolean array that is True for the motions without collisions
+    def motions_free(self, thetas_from, thetas_to):
+        return self.free_fractions(thetas_from, thetas_to) == 1.0
+
+    # Check how far a single motion gets before its first collision, returns the fraction of the motion that is free from its start
+    def free_fraction(self, theta_from, theta_to):
+        return float(self.free_fractions(theta_from, theta_to)[0])
+
+# A lazy probabilistic roadmap of an N-link manipulator, for many planning queries in the same scene
+# The samples are checked for collisions when they are added, but the motions between neighbouring samples are only checked when a path uses them,
+# all motions of the path in one batch, and the results are kept for later queries. A path with a colliding motion loses that motion and is searched again
+# If the roadmap has no path, samples are added uniformly and around the configurations known to be reachable from the start and from the goal,
+# so that configurations in narrow pockets of the free space grow a way out of them, up to max_samples
+class LazyPRM:
+    def __init__(self, checker, number_of_samples=500, neighbours=10, max_samples=8000, seed=None):
+        self.checker = checker
+        self.number_of_samples = number_of_samples
+        self.neighbours = neighbours
+        self.max_samples = max_samples
+        self.rng = np.random.default_rng(seed)
+        self.samples = np.zeros((0, checker.dimensions))
+        self.tree = None
+        # The neighbours of every sample with the length of the motion to them, motions that collide are removed
+        # and the motions checked to be free by their pair of sample numbers, lower number first
+        self.adjacency = []
+        self.motion_free = set()
+        self.add_samples(number_of_samples)
+
+    # Add free samples to the roadmap and connect every new sample to its nearest neighbours
+    # The samples are uniformly distributed, or normally distributed with a standard deviation of spread radians around a random one of the given configurations
+    def add_samples(self, number_of_samples, around=None, spread=0.3):
+        if around is None:
+            thetas = self.rng.uniform(0, 2*math.pi, (number_of_samples, self.checker.dimensions))
+        else:
+            around = np.reshape(around, (-1, self.checker.dimensions))
+            thetas = wrap_angles(around[self.rng.integers(len(around), size=number_of_samples)] + self.rng.normal(0, spread, (number_of_samples, self.checker.dimensions)))
+        thetas = thetas[self.checker.configurations_free(thetas)]
+        first_new = len(self.samples)
+        self.samples = np.concatenate([self.samples, thetas])
+        self.adjacency.extend({} for _ in thetas)
+        self.tree = create_toroidal_tree(self.samples) if len(self.samples) else None
+        if len(self.samples) < 2 or len(thetas) == 0:
+            return
+
+        # The nearest sample to every new sample is itself, so one more neighbour is asked for
+        lengths, neighbour_numbers = self.tree.query(thetas, min(self.neighbours + 1, len(self.samples)))
+        for sample_number, numbers, sample_lengths in zip(range(first_new, len(self.samples)), np.reshape(neighbour_numbers, (len(thetas), -1)), np.reshape(lengths, (len(thetas), -1))):
+            for neighbour_number, length in zip(numbers.tolist(), sample_lengths.tolist()):
+                if neighbour_number != sample_number:
+                    self.adjacency[sample_number][neighbour_number] = length
+                    self.adjacency[neighbour_number][sample_number] = length
+
+    # Plan a path from the start to the goal configuration through the roadmap
+    # Returns the path as an array of configurations from the start to the goal, with wrapped joint angles, or None if no path was found
+    def find_path(self, start, goal):
+        start, goal = wrap_angles(start), wrap_angles(goal)
+        if not self.checker.configurations_free(np.stack([start, goal])).all():
+            return None
+        while True:
+            path, reached = self.search(start, goal)
+            if path is not None or len(self.samples) >= self.max_samples:
+                return path
+            self.add_samples(self.number_of_samples//2)
+            for reached_thetas in reached:
+                self.add_samples(self.number_of_samples//4, reached_thetas)
+
+    # Search the roadmap for a path with A* until a path has no colliding motions, or no path is left
+    # The start and the goal are connected to their nearest samples, and to each other, for this query only
+    # Returns the path or None, and if there is no path the configurations reachable from the start and from the goal through motions checked to be free
+    def search(self, start, goal):
+        start_number, goal_number = len(self.samples), len(self.samples) + 1
+        thetas = np.concatenate([self.samples, [start, goal]])
+        direct_length = float(wrapped_distance(start, goal))
+        query_adjacency = {start_number: {goal_number: direct_length}, goal_number: {start_number: direct_length}}
+        # The motions from samples to the start and the goal, by sample number
+        query_links = {}
+        if len(self.samples):
+            lengths, neighbour_numbers = self.tree.query(np.stack([start, goal]), min(self.neighbours, len(self.samples)))
+            for query_number, numbers, query_lengths in zip((start_number, goal_number), np.reshape(neighbour_numbers, (2, -1)), np.reshape(lengths, (2, -1))):
+                for number, length in zip(numbers.tolist(), query_lengths.tolist()):
+                    query_adjacency[query_number][number] = length
+                    query_links.setdefault(number, {})[query_number] = length
+        query_motion_free = set()
+
+        def neighbours_of(number):
+            if number >= start_number:
+                return query_adjacency[number].items()
+            if number in query_links:
+                return list(self.adjacency[number].items()) + list(query_links[number].items())
+            return self.adjacency[number].items()
+
+        while True:
+            path = find_roadmap_path(thetas, neighbours_of, start_number, goal_number)
+            if path is None:
+                motion_checked_free = lambda pair: pair in self.motion_free or pair in query_motion_free
+                return None, [thetas[reachable_numbers(neighbours_of, number, motion_checked_free)] for number in (start_number, goal_number)]
+
+            # Check every motion of the path that was not checked before in one batch, the motions that collide are removed
+            pairs = [(min(number_a, number_b), max(number_a, number_b)) for number_a, number_b in zip(path[:-1], path[1:])]
+            unchecked = [pair for pair in pairs if pair not in self.motion_free and pair not in query_motion_free]
+            if not unchecked:
+                return thetas[path], None
+            numbers_a, numbers_b = np.array(unchecked).T
+            all_free = True
+            for (number_a, number_b), free in zip(unchecked, self.checker.motions_free(thetas[numbers_a], thetas[numbers_b])):
+                if free:
+                    (self.motion_free if number_b < start_number else query_motion_free).add((number_a, number_b))
+                    continue
+                all_free = False
+                if number_b < start_number:
+                    del self.adjacency[number_a][number_b], self.adjacency[number_b][number_a]
+                elif number_a < start_number:
+                    del query_adjacency[number_b][number_a], query_links[number_a][number_b]
+                else:
+                    del query_adjacency[number_a][number_b], query_adjacency[number_b][number_a]
+            if all_free:
+                return thetas[path], None
+
+# A function to find the numbers of all configurations of a roadmap that can be reached from a configuration, through the motions that motion_allowed allows
+def reachable_numbers(neighbours_of, number, motion_allowed):
+    reached = {number}
+    unvisited = [number]
+    while unvisited:
+        number = unvisited.pop()
+        for neighbour, _ in neighbours_of(number):
+            if neighbour not in reached and motion_allowed((min(number, neighbour), max(number, neighbour))):
+                reached.add(neighbour)
+                unvisited.append(neighbour)
+    return sorted(reached)
+
+# A function to find the shortest path through a roadmap with A*, with the toroidal distance to the goal as the heuristic
+# neighbours_of gives the (neighbour number, motion length) pairs of a configuration
+# Returns the list of configuration numbers from the start to the goal, or None if there is no path
+def find_roadmap_path(thetas, neighbours_of, start_number, goal_number):
+    heuristic = wrapped_distance(thetas, thetas[goal_number]).tolist()
+    distances = {start_number: 0.0}
+    parents = {start_number: None}
+    closed = set()
+    queue = [(heuristic[start_number], start_number)]
+    while queue:
+        _, number = heapq.heappop(queue)
+        if number == goal_number:
+            path = []
+            while number is not None:
+                path.append(number)
+                number = parents[number]
+            return path[::-1]
+        if number in closed:
+            continue
+        closed.add(number)
+
+        distance = distances[number]
+        for neighbour, length in neighbours_of(number):
+            new_distance = distance + length
+            if neighbour not in closed and new_distance < distances.get(neighbour, math.inf):
+                distances[neighbour] = new_distance
+                parents[neighbour] = number
+                heapq.heappush(queue, (new_distance + heuristic[neighbour], neighbour))
+    return None
+
+# A tree of configurations for RRT-Connect, with a KD-tree of the toroidal metric for the nearest neighbour queries
+# The KD-tree is only built again after rebuild_size configurations were added, the configurations added since then are searched directly
+class ConfigurationTree:
+    def __init__(self, root, rebuild_size=64):
+        self.thetas = np.zeros((256, len(root)))
+        self.thetas[0] = root
+        self.parents = [-1]
+        self.rebuild_size = rebuild_size
+        self.tree = None
+        self.tree_size = 0
+
+    def __len__(self):
+        return len(self.parents)
+
+    # Add a configuration with the number of its parent, returns the number of the new configuration
+    def add(self, theta, parent):
+        if len(self) == len(self.thetas):
+            self.thetas = np.concatenate([self.thetas, np.zeros_like(self.thetas)])
+        self.thetas[len(self)] = wrap_angles(theta)
+        self.parents.append(parent)
+        return len(self) - 1
+
+    # Find the number of the configuration nearest to theta
+    def nearest(self, theta):
+        nearest_number, nearest_distance = -1, math.inf
+        if self.tree is not None:
+            nearest_distance, nearest_number = self.tree.query(wrap_angles(theta))
+        recent_distances = wrapped_distance(self.thetas[self.tree_size:len(self)], theta)
+        if len(recent_distances) and recent_distances.min() < nearest_distance:
+            nearest_number = self.tree_size + int(np.argmin(recent_distances))
+        if len(self) - self.tree_size >= self.rebuild_size:
+            self.tree, self.tree_size = create_toroidal_tree(self.thetas[:len(self)]), len(self)
+        return int(nearest_number)
+
+    # The configurations from the root of the tree to the given configuration
+    def path_from_root(self, number):
+        numbers = []
+        while number != -1:
+            numbers.append(number)
+            number = self.parents[number]
+        return self.thetas[numbers[::-1]]
+
+# A function to move a tree from its nearest configuration towards a target, as far as the motion is free, with new configurations every step_size radians
+# A target further away than max_distance is only approached by max_distance
+# Returns the number of the last configuration of the tree on the way, the number of configurations added and whether the target was reached
+def grow_towards(checker, tree, target, step_size, max_distance=math.inf):
+    number = tree.nearest(target)
+    theta = tree.thetas[number].copy()
+    difference = wrapped_difference(theta, target)
+    distance = np.linalg.norm(difference)
+    if distance == 0:
+        return number, 0, True
+    within_reach = distance <= max_distance
+    if not within_reach:
+        difference, distance = difference*max_distance/distance, max_distance
+
+    fraction = checker.free_fraction(theta, theta + difference)
+    step_fractions = [step_fraction for step_fraction in np.arange(step_size, distance, step_size)/distance if step_fraction < fraction] + [fraction]
+    added = 0
+    for step_fraction in step_fractions:
+        if step_fraction > 0:
+            number = tree.add(theta + step_fraction*difference, number)
+            added += 1
+    return number, added, within_reach and fraction == 1.0
+
+# A function to plan a path between two configurations with RRT-Connect
+# One tree grows from the start and one from the goal. Every iteration one tree takes a step of at most step_size radians towards a random configuration,
+# and the other tree goes straight towards the new configuration as far as it can, every motion is checked in one batch instead of step by step
+# Returns the path as an array of configurations from the start to the goal, with wrapped joint angles, or None if no path was found within max_iterations
+def rrt_connect(checker, start, goal, step_size=0.5, max_iterations=5000, seed=None):
+    rng = np.random.default_rng(seed)
+    start, goal = wrap_angles(start), wrap_angles(goal)
+    if not checker.configurations_free(np.stack([start, goal])).all():
+        return None
+    if checker.motions_free(start, goal)[0]:
+        return np.stack([start, goal])
+
+    start_tree, goal_tree = ConfigurationTree(start), ConfigurationTree(goal)
+    growing_tree, other_tree = start_tree, goal_tree
+    for _ in range(max_iterations):
+        target = rng.uniform(0, 2*math.pi, checker.dimensions)
+        new_number, added, _ = grow_towards(checker, growing_tree, target, step_size, step_size)
+        if not added:
+            growing_tree, other_tree = other_tree, growing_tree
+            continue
+
+        # The other tree goes straight towards the new configuration, the trees are connected if it gets there
+        connected_number, _, connected = grow_towards(checker, other_tree, growing_tree.thetas[new_number], step_size)
+        if connected:
+            growing_path, other_path = growing_tree.path_from_root(new_number), other_tree.path_from_root(connected_number)
+            path = np.concatenate([growing_path, other_path[-2::-1]])
+            return path if growing_tree is start_tree else path[::-1]
+        growing_tree, other_tree = other_tree, growing_tree
+    return None
+
+# A function to interpolate a path of configurations into a trajectory with at most max_step radians of change of any joint angle between rows
+# Every motion goes the short way around each joint, the joint angles of the trajectory are wrapped into [0, 2pi)
+def interpolate_path(path, max_step=TRAJECTORY_STEP):
+    path = np.asarray(path, dtype=float)
+    difference = wrapped_difference(path[:-1], path[1:])
+    steps = np.maximum(1, np.ceil(np.abs(difference).max(axis=1)/max_step)).astype(int)
+    motion_numbers = np.repeat(np.arange(len(steps)), steps)
+    fractions = (np.arange(len(motion_numbers)) - np.repeat(np.cumsum(steps) - steps, steps))/steps[motion_numbers]
+    trajectory = path[motion_numbers] + fractions[:, None]*difference[motion_numbers]
+    return wrap_angles(np.concatenate([trajectory, path[-1:]]))
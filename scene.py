@@ -0,0 +1,284 @@
+import numpy as np
+import math
+import random
+from shapely.geometry import Polygon
+from cspace import create_joint_limit_layer, create_obstacle_layer, combine_layers
+from obstacle_index import ObstacleIndex
+from cspace_cache import scene_key
+from planner import find_grid_path
+from sampling_planner import ChainCollisionChecker, LazyPRM, rrt_connect, interpolate_path
+from quadtree_cspace import QuadtreeCSpace
+from tiled_cspace import create_tile_executor, create_configuration_space_tiled
+from obstacle_table import ObstacleLayerTable
+from trajectory_validation import first_colliding_segment
+from trajectory_smoothing import shortcut_path, time_parameterise
+
+# The display-free core of the simulation: scene descriptions, the manipulator and obstacle geometry, and building configuration spaces and plans for a scene
+# Nothing here imports pygame, so it can run on machines without a display and be imported by other code
+
+# The scene of the simulation, every scene description is filled in from it
+# Lengths and positions are in pixels and angles in radians. Obstacles are [centre offset x, centre offset y, width, height] rectangles
+# relative to the ground of the manipulator, or {"points": [[offset x, offset y], ...]} polygons, convex or concave, with their corners relative to the ground. Joint limits are [joint 1 lower, joint 1 upper, joint 2 lower, joint 2 upper] as in main.py
+# start and goal are [theta_1, theta_2] configurations, a plan is only made if the scene has both
+# A scene can have any number of links for the sampling based planners of sampling_planner.py, with a lower and upper limit for every joint in joint_limits or None for no limits
+# and a joint angle for every joint in start and goal. The configuration space grid is only built for 2 links
+DEFAULT_SCENE = {
+    "cs_resolution": 0.1,
+    "ground": [350, 350],
+    "link_lengths": [200, 100],
+    "link_width": 20,
+    "joint_limits": [0, 2*math.pi, -2.96706 + 2*math.pi, 2.96706],
+    "obstacles": [[0, -300, 120, 80], [0, 200, 120, 80]],
+    "start": None,
+    "goal": None
+}
+
+# A function to convert any value of theta to its positive equivalent in 0-2pi range. For example -pi get converted to pi, 4pi to 2pi
+def convert_to_two_pi_range (theta):
+    # If the thetas exceed 0 - 2*pi range, set them back to an equivalent 0 - 2*pi values,
+    # otherwise the contraints cannot be checked due to periodic natures of angles
+    if theta < 0 :
+        corrected_theta = theta + 2*math.pi
+    elif theta > 2*math.pi :
+        corrected_theta = theta - 2*math.pi
+    else :
+        corrected_theta = theta
+    return corrected_theta
+
+# Get the x,y index corresponding to the given theta values, and ranges of theta and grid indices
+def theta_to_index_value (theta_1, theta_2, max_theta, size_of_grid) :
+    theta_xi = int((theta_1/(max_theta))*size_of_grid)
+    theta_yi = int((theta_2/(max_theta))*size_of_grid)
+    return theta_xi, theta_yi
+
+# Get the theta_1, theta_2 corresponding to the given index value, and ranges of theta and grid indices
+def index_to_theta_value (theta_xi, theta_yi, max_theta, size_of_grid):
+    theta_1 = (theta_xi/(size_of_grid))*max_theta
+    theta_2 = (theta_yi/(size_of_grid))*max_theta
+    return theta_1, theta_2
+
+# A function to create the links of an N-link planar manipulator as rectangular polygons, for one configuration
+# thetas holds the joint angles, each relative to the previous link, collision.chain_corners computes the same corners for a whole batch of configurations
+def create_chain_polygons(ground_x, ground_y, link_lengths, half_width, thetas):
+    link_polygons = []
+    start_x, start_y, link_angle = ground_x, ground_y, 0
+    for link_length, theta in zip(link_lengths, thetas):
+        # Calculate the start coordinates and the difference to the end coordinates of the centreline
+        link_angle = link_angle + theta
+        delta_x, delta_y = link_length*math.cos(link_angle), -link_length*math.sin(link_angle)  # negative sign for flipped y axis in pygame
+
+        # Rectangle's four corners given the start point and the difference to the end point of the centreline of the link
+        corner_tuples = [
+            (start_x - half_width * math.sin(link_angle), start_y - half_width * math.cos(link_angle)),
+            (start_x + half_width * math.sin(link_angle), start_y + half_width * math.cos(link_angle)),
+            (start_x + delta_x + half_width * math.sin(link_angle), start_y + delta_y + half_width * math.cos(link_angle)),
+            (start_x + delta_x - half_width * math.sin(link_angle), start_y + delta_y - half_width * math.cos(link_angle))
+        ]
+        # Create a shapely polygon given the corner points, useful for checking collisions
+        link_polygons.append(Polygon(corner_tuples))
+        # The start point of the next link is the end point of this link
+        start_x, start_y = start_x + delta_x, start_y + delta_y
+    return link_polygons
+
+# A function to draw a 2link RR manipulators, 2 links as rectangular polygons, 2 joints as circles
+# Identical to the other function, except this one only calculates a polygon and doesnot attempt to draw on pygame
+def create_manipulator_polygons(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2):
+    link1_polygon, link2_polygon = create_chain_polygons(ground_x, ground_y, [link_length_1, link_length_2], half_width, [theta_1, theta_2])
+    return link1_polygon, link2_polygon
+
+# A function to create an obstacle as a polygon given its centre coordinates, length and width
+# Identical to the other function, except this one only calculates a polygon and doesnot attempt to draw on pygame
+def create_obstacle_polygon (obs_centre_x, obs_centre_y, obs_width, obs_height):
+    # Half length and width
+    obs_halfwidth, obs_halfheight = obs_width//2, obs_height//2
+
+    # Rectangle's four corners given the start point and the difference to the end point of the centreline of link 1
+    corner_tuples = [
+    (obs_centre_x - obs_halfwidth, obs_centre_y - obs_halfheight),
+    (obs_centre_x - obs_halfwidth, obs_centre_y + obs_halfheight),
+    (obs_centre_x + obs_halfwidth, obs_centre_y + obs_halfheight),
+    (obs_centre_x + obs_halfwidth, obs_centre_y - obs_halfheight)
+    ]
+    # Create a shapely polygon given the corner points, useful for checking collisions
+    return Polygon (corner_tuples)
+
+# A function to fill in a scene description with the default scene, for every setting the description does not give
+def create_scene (scene=None, **settings):
+    full_scene = dict (DEFAULT_SCENE)
+    full_scene.update (scene or {})
+    full_scene.update (settings)
+    unknown = set (full_scene) - set (DEFAULT_SCENE) - {"name"}
+    if unknown:
+        raise ValueError ("Unknown scene settings: " + ", ".join (sorted (unknown)))
+    return full_scene
+
+# A function to create random rectangular obstacles for a scene, the same for every run with the same seed, used by the tests and benchmarks
+# The centre offsets are between min_distance and max_distance pixels from the ground, and the sides between min_size and max_size pixels
+def create_random_obstacles (number_of_obstacles, seed=0, min_distance=90, max_distance=330, min_size=30, max_size=60):
+    rng = random.Random (seed)
+    obstacles = []
+    while len (obstacles) < number_of_obstacles:
+        offset_x, offset_y = rng.uniform (-max_distance, max_distance), rng.uniform (-max_distance, max_distance)
+        if min_distance < math.hypot (offset_x, offset_y) < max_distance:
+            obstacles.append ([round (offset_x), round (offset_y), rng.randrange (min_size, max_size), rng.randrange (min_size, max_size)])
+    return obstacles
+
+# A function to get the cache key of a scene, from every setting that changes the configuration space grid
+def create_scene_key (scene):
+    return scene_key ({name: scene[name] for name in ("cs_resolution", "ground", "link_lengths", "link_width", "joint_limits", "obstacles")})
+
+# A function to get the corner points of an obstacle of a scene in pixels, the vectorized engines need them instead of shapely polygons
+def create_obstacle_corners (scene, obstacle):
+    ground_x, ground_y = scene["ground"]
+    if isinstance (obstacle, dict):
+        return np.asarray (obstacle["points"], dtype=float) + (ground_x, ground_y)
+    obs_centre_offset_x, obs_centre_offset_y, obs_width, obs_height = obstacle
+    obs_polygon = create_obstacle_polygon (ground_x + obs_centre_offset_x, ground_y + obs_centre_offset_y, obs_width, obs_height)
+    return np.asarray(obs_polygon.exterior.coords)[:-1]
+
+# A function to create the spatial index of a list of obstacles of a scene
+def create_obstacle_index (scene, obstacles):
+    return ObstacleIndex ([create_obstacle_corners (scene, obstacle) for obstacle in obstacles])
+
+# A function to create the configuration space layer of a list of obstacles of a scene, True for the thetas where either link of the manipulator hits any of them
+# If stats is a collections.Counter, the broad phase counters are added to it
+def create_scene_obstacle_layer (scene, obstacles, stats=None):
+    ground_x, ground_y = scene["ground"]
+    link_length_1, link_length_2 = scene["link_lengths"]
+    return create_obstacle_layer (scene["cs_resolution"], ground_x, ground_y, link_length_1, link_length_2, scene["link_width"]//2, create_obstacle_index (scene, obstacles), stats=stats)
+
+# A function to get the cached joint constraint layer of a scene, True for the thetas that violate the joint constraints
+def create_scene_joint_limit_layer (scene):
+    return create_joint_limit_layer (scene["cs_resolution"], tuple (scene["joint_limits"]))
+
+# A function to create the quadtree configuration space of a scene, it only refines the grid near the boundaries of the obstacles
+def create_scene_quadtree (scene):
+    ground_x, ground_y = scene["ground"]
+    link_length_1, link_length_2 = scene["link_lengths"]
+    return QuadtreeCSpace (scene["cs_resolution"], ground_x, ground_y, link_length_1, link_length_2, scene["link_width"]//2, create_obstacle_index (scene, scene["obstacles"]), scene["joint_limits"])
+
+# A function to create the lookup table of the configuration space layers of a rectangular obstacle of a scene, for every centre offset on a lattice
+# offset_range_x and offset_range_y are (first, last, step) ranges of the centre offsets relative to the ground, the table is stored in table_dir and reused when it exists
+def create_scene_obstacle_table (scene, obs_width, obs_height, table_dir, offset_range_x, offset_range_y, workers=None):
+    ground_x, ground_y = scene["ground"]
+    link_length_1, link_length_2 = scene["link_lengths"]
+    shape_corners = create_obstacle_corners (scene, [0, 0, obs_width, obs_height]) - (ground_x, ground_y)
+    return ObstacleLayerTable (table_dir, scene["cs_resolution"], ground_x, ground_y, link_length_1, link_length_2, scene["link_width"]//2, shape_corners, offset_range_x, offset_range_y, workers)
+
+# Create Configuration Space grid map of a scene
+# "vectorized" combines the cached joint constraint layer with the layer of all obstacles, "quadtree" rasterises a QuadtreeCSpace into the same grid,
+# "tiled" computes the grid in tiles of theta_1 columns with a process pool of workers processes, one per core by default, and waits for it,
+# "shapely" checks every grid point with shapely polygons and is kept as a reference
+# If stats is a collections.Counter, the broad phase counters of the "vectorized" and "tiled" engines or the counters of the "quadtree" engine are added to it
+def create_configuration_space (scene, backend="vectorized", stats=None, workers=None):
+    if len (scene["link_lengths"]) != 2:
+        raise ValueError ("The configuration space grid needs 2 links, plan scenes with " + str (len (scene["link_lengths"])) + " links with plan_sampling_motion")
+    if backend == "vectorized":
+        return combine_layers (create_scene_joint_limit_layer (scene), [create_scene_obstacle_layer (scene, scene["obstacles"], stats)])
+    elif backend == "tiled":
+        ground_x, ground_y = scene["ground"]
+        link_length_1, link_length_2 = scene["link_lengths"]
+        obstacle_corners = [create_obstacle_corners (scene, obstacle) for obstacle in scene["obstacles"]]
+        with create_tile_executor (workers) as executor:
+            return create_configuration_space_tiled (executor, scene["cs_resolution"], ground_x, ground_y, link_length_1, link_length_2, scene["link_width"]//2,
+                                                     obstacle_corners, scene["joint_limits"], stats=stats)
+    elif backend == "quadtree":
+        quadtree = create_scene_quadtree (scene)
+        if stats is not None:
+            stats.update (quadtree.stats ())
+        return quadtree.rasterise ()
+    elif backend != "shapely":
+        raise ValueError("Unknown configuration space backend: " + str(backend))
+
+    ground_x, ground_y = scene["ground"]
+    link_length_1, link_length_2 = scene["link_lengths"]
+    half_width = scene["link_width"]//2
+    joint_1_lower_lim, joint_1_upper_lim, joint_2_lower_lim, joint_2_upper_lim = scene["joint_limits"]
+
+    # number of steps from 0 - 2pi should so that step size is 0.001 rad. 2pi / step size  = number of steps
+    theta_space = np.arange (0, 2*math.pi, scene["cs_resolution"])
+
+    # create a configuration space grid with a resolution of 0.001 rad, axis ranges equal to the entire uncontrained space of thetas,
+    # All values set to 1 for obstacles. All grid points are obstacles unless found to be free
+    cspace_grid = np.full ((len(theta_space), len(theta_space)), 1)
+
+    # Create every obstacle as a polygon, given its corner points
+    obs_polygons = [Polygon (create_obstacle_corners (scene, obstacle)) for obstacle in scene["obstacles"]]
+
+    # iterate through the whole grid and search for free spaces or obstacles and update grid accordingly
+    # bypass theta values that are out of joint constraints
+    for i, theta_1 in enumerate (theta_space):
+        if (((theta_1 < joint_1_upper_lim) and (theta_1 >= 0)) or ((theta_1 > joint_1_lower_lim) and (theta_1 <= 2*math.pi))):
+
+            for j, theta_2 in enumerate (theta_space):
+                # bypass theta values that are out of joint constraints
+                if (((theta_2 < joint_2_upper_lim) and (theta_2 >= 0)) or ((theta_2 > joint_2_lower_lim) and (theta_2 <= 2*math.pi))):
+
+                    # Draw a 2link RR manipulator, 2 links as rectangular polygons, 2 joints as circles, Given the current thetas
+                    link1_polygon, link2_polygon = create_manipulator_polygons(ground_x, ground_y, link_length_1, link_length_2, half_width, theta_1, theta_2)
+
+                    # Check for collisions between Link polygons and the obstacles, if it doesnot  occur then mark grid point as 0 for free
+                    if not any (link1_polygon.intersects(obs_polygon) or link2_polygon.intersects(obs_polygon) for obs_polygon in obs_polygons):
+                        cspace_grid [j, i] = 0 # each column is for a unique theta1, rows along each column for a all the theta2 values
+                else:
+                    continue
+        else:
+            continue
+
+    return cspace_grid
+
+# A function to convert a path of (row, column) grid indices from the planner into a trajectory of [theta_1, theta_2] rows in the same format as demo_trajectory.npy
+# The trajectory starts and ends exactly at the given start and goal configurations instead of the nearest grid points
+def path_to_theta_trajectory (path, cs_space_size, theta_1, theta_2, goal_theta_1, goal_theta_2):
+    # Rows of the grid are for theta_2 and columns for theta_1
+    theta_trajectory = np.array ([index_to_theta_value (theta_xi, theta_yi, 2*math.pi, cs_space_size) for theta_yi, theta_xi in path])
+    theta_trajectory[0] = theta_1, theta_2
+    theta_trajectory[-1] = goal_theta_1, goal_theta_2
+    return theta_trajectory
+
+# A function to plan a trajectory from the start thetas to the goal thetas through the free grid points of the configuration space
+# "astar" and "dijkstra" search the grid with find_grid_path, a planner object with a find_path method such as a WavefrontPlanner can also be given
+# Returns the trajectory as an array of [theta_1, theta_2] rows, or None if there is no path
+def plan_motion (cspace_grid, theta_1, theta_2, goal_theta_1, goal_theta_2, planner="astar"):
+    cs_space_size = len (cspace_grid)
+    theta_xi, theta_yi = theta_to_index_value (theta_1, theta_2, 2*math.pi, cs_space_size)
+    goal_theta_xi, goal_theta_yi = theta_to_index_value (goal_theta_1, goal_theta_2, 2*math.pi, cs_space_size)
+
+    # Rows of the grid are for theta_2 and columns for theta_1
+    if planner in ("astar", "dijkstra"):
+        path = find_grid_path (cspace_grid, (theta_yi, theta_xi), (goal_theta_yi, goal_theta_xi), use_heuristic= (planner == "astar"))
+    else:
+        path = planner.find_path (cspace_grid, (theta_yi, theta_xi), (goal_theta_yi, goal_theta_xi))
+    if path is None:
+        return None
+    return path_to_theta_trajectory (path, cs_space_size, theta_1, theta_2, goal_theta_1, goal_theta_2)
+
+# A function to create the collision checker of the sampling based planners for a scene, with any number of links
+def create_scene_collision_checker (scene):
+    ground_x, ground_y = scene["ground"]
+    return ChainCollisionChecker (ground_x, ground_y, scene["link_lengths"], scene["link_width"]//2, create_obstacle_index (scene, scene["obstacles"]), scene["joint_limits"])
+
+# A function to plan a trajectory from the start thetas to the goal thetas of a scene with a sampling based planner, without a configuration space grid
+# "rrt" plans with rrt_connect and "prm" with a new LazyPRM, a LazyPRM of the scene can also be given to reuse its roadmap for many queries
+# Returns the trajectory as an array of rows of joint angles, every sampling_planner.TRAJECTORY_STEP radians along the path, or None if there is no path
+def plan_sampling_motion (scene, start, goal, planner="rrt", seed=None):
+    checker = planner.checker if isinstance (planner, LazyPRM) else create_scene_collision_checker (scene)
+    if planner == "rrt":
+        path = rrt_connect (checker, start, goal, seed=seed)
+    elif planner == "prm":
+        path = LazyPRM (checker, seed=seed).find_path (start, goal)
+    else:
+        path = planner.find_path (start, goal)
+    if path is None:
+        return None
+    return interpolate_path (path)
+
+# A function to find the first segment of a trajectory of a scene that collides, between its rows and not only at them, with the checks of the sampling based planners
+# Returns the number of the segment from row k to row k + 1, or None if the whole trajectory is free
+def find_trajectory_collision (scene, theta_trajectory):
+    return first_colliding_segment (create_scene_collision_checker (scene), theta_trajectory)
+
+# A function to shorten a trajectory of a scene with collision free shortcuts, and time it under joint velocity and acceleration limits in rad/s and rad/s^2
+# Returns the times in seconds, every sample_time seconds, and the rows of unwrapped joint angles at these times
+def create_timed_trajectory (scene, theta_trajectory, max_velocity, max_acceleration, sample_time=0.01):
+    return time_parameterise (shortcut_path (create_scene_collision_checker (scene), theta_trajectory), max_velocity, max_acceleration, sample_time)
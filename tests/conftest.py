@@ -0,0 +1,5 @@
+# The modules of the simulation are in the repository folder, so the tests can import them from any working directory
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
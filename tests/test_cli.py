@@ -0,0 +1,65 @@
+# Reading batches of scenes from JSON and NPZ files and running them from the command line
+import json
+import os
+import numpy as np
+import pytest
+from cli import load_scenes, run_scene, main
+from scene import create_scene
+
+# Two scenes with different numbers of obstacles, both with a start and a goal
+SCENES = [
+    {"name": "two", "obstacles": [[0, -300, 120, 80], [0, 250, 60, 40]], "start": [0.5, 0.8], "goal": [2.6, 5.5]},
+    {"name": "one", "obstacles": [[150, 0, 40, 40]], "start": [0.5, 0.8], "goal": [2.0, 5.0]},
+]
+
+def test_json_scenes(tmp_path):
+    path = os.path.join(tmp_path, "scenes.json")
+    with open(path, "w") as file:
+        json.dump(SCENES, file)
+    scenes = load_scenes(path)
+    assert scenes == [create_scene(scene) for scene in SCENES]
+    # A dict with a list of scenes works too, and scenes without a name are named after their position
+    with open(path, "w") as file:
+        json.dump({"scenes": [{"cs_resolution": 0.2}, {}]}, file)
+    scenes = load_scenes(path)
+    assert [scene["name"] for scene in scenes] == ["scene_0", "scene_1"]
+    assert scenes[0]["cs_resolution"] == 0.2 and scenes[1] == create_scene(name="scene_1")
+
+def test_npz_scenes_match_json(tmp_path):
+    json_path, npz_path = os.path.join(tmp_path, "scenes.json"), os.path.join(tmp_path, "scenes.npz")
+    with open(json_path, "w") as file:
+        json.dump(SCENES, file)
+    # The second scene has one obstacle less, its last row of obstacles is NaN, and cs_resolution has no scene axis so it applies to both scenes
+    obstacles = np.full((2, 2, 4), np.nan)
+    obstacles[0] = SCENES[0]["obstacles"]
+    obstacles[1, 0] = SCENES[1]["obstacles"][0]
+    np.savez(npz_path, name=["two", "one"], obstacles=obstacles, start=[scene["start"] for scene in SCENES], goal=[scene["goal"] for scene in SCENES],
+             cs_resolution=0.1)
+    scenes = load_scenes(npz_path)
+    assert scenes == load_scenes(json_path)
+    assert [len(scene["obstacles"]) for scene in scenes] == [2, 1]
+
+def test_npz_scene_counts_must_match(tmp_path):
+    path = os.path.join(tmp_path, "scenes.npz")
+    np.savez(path, start=np.zeros((2, 2)), goal=np.zeros((3, 2)))
+    with pytest.raises(ValueError, match="different numbers of scenes"):
+        load_scenes(path)
+
+def test_grid_planner_needs_two_links(tmp_path):
+    scene = create_scene(link_lengths=[100, 80, 60], joint_limits=None, start=[0, 0, 0], goal=[1, 1, 1], name="three")
+    with pytest.raises(ValueError, match="3 links"):
+        run_scene(scene, tmp_path, "vectorized", "astar", 0.0, None)
+    # The sampling based planners plan it without a grid
+    summary = run_scene(scene, tmp_path, "vectorized", "rrt", 0.0, None, seed=0)
+    assert summary["grid"] is None and summary["path"] is not None
+
+def test_command_line_writes_grids_and_paths(tmp_path):
+    path = os.path.join(tmp_path, "scenes.json")
+    with open(path, "w") as file:
+        json.dump(SCENES, file)
+    output = os.path.join(tmp_path, "results")
+    assert main([path, "--output", output, "--planner", "wavefront"]) == 0
+    for scene in SCENES:
+        cspace_grid = np.load(os.path.join(output, scene["name"] + ".grid.npy"))
+        assert cspace_grid.shape == (63, 63) and cspace_grid.any() and not cspace_grid.all()
+        assert os.path.exists(os.path.join(output, scene["name"] + ".path.npy"))
@@ -0,0 +1,100 @@
+# The configuration space engines against the shapely engine, which checks every grid point with shapely polygons and is kept as the reference
+import collections
+import math
+import numpy as np
+import pytest
+from scene import create_scene, create_random_obstacles, create_configuration_space, create_scene_quadtree, theta_to_index_value
+from cspace import create_joint_limit_layer
+
+# Scenes with rectangles, concave polygons, many small obstacles, no obstacles and narrow joint limits, at resolutions the shapely engine computes in a few seconds
+SCENES = {
+    "default": create_scene(),
+    "fine": create_scene(cs_resolution=0.05),
+    "no_obstacles": create_scene(obstacles=[]),
+    "concave": create_scene(obstacles=[
+        # A U opening towards the ground, within reach of link 2 only
+        {"points": [[150, -60], [280, -60], [280, 60], [150, 60], [150, 30], [250, 30], [250, -30], [150, -30]]},
+        # An L next to link 1
+        {"points": [[-120, 40], [-40, 40], [-40, 70], [-90, 70], [-90, 160], [-120, 160]]},
+        [0, 250, 60, 40]
+    ]),
+    "many_obstacles": create_scene(obstacles=create_random_obstacles(50, min_distance=60, min_size=20, max_size=50)),
+    "joint_limits": create_scene(joint_limits=[5.5, 1.2, 4.5, 2.0]),
+    "touching": create_scene(ground=[300, 320], link_lengths=[150, 120], link_width=16, obstacles=[[0, -170, 100, 100], [170, 0, 20, 200], [-200, 50, 60, 60]]),
+}
+
+# The grid of every scene from the reference engine, computed once
+reference_grids = {}
+
+def reference_grid(name):
+    if name not in reference_grids:
+        reference_grids[name] = create_configuration_space(SCENES[name], "shapely")
+    return reference_grids[name]
+
+@pytest.mark.parametrize("name", sorted(SCENES))
+def test_vectorized_matches_shapely(name):
+    cspace_grid = create_configuration_space(SCENES[name], "vectorized")
+    assert cspace_grid.dtype == reference_grid(name).dtype
+    np.testing.assert_array_equal(cspace_grid, reference_grid(name))
+
+def test_reference_grids_are_not_trivial():
+    # The scenes must hold both free and occupied grid points, or the comparisons above prove little
+    for name in SCENES:
+        assert 0 < reference_grid(name).mean() < 1, name
+
+def test_no_obstacles_only_joint_limits():
+    scene = SCENES["no_obstacles"]
+    np.testing.assert_array_equal(reference_grid("no_obstacles"), create_joint_limit_layer(scene["cs_resolution"], tuple(scene["joint_limits"])))
+    free_scene = create_scene(obstacles=[], joint_limits=[0, 2*math.pi, 0, 2*math.pi])
+    assert not create_configuration_space(free_scene, "vectorized").any()
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_configuration_space(SCENES["default"], "unknown")
+
+@pytest.mark.parametrize("name", ["default", "concave", "many_obstacles", "joint_limits"])
+def test_tiled_matches_shapely(name):
+    stats = collections.Counter()
+    cspace_grid = create_configuration_space(SCENES[name], "tiled", stats, workers=2)
+    np.testing.assert_array_equal(cspace_grid, reference_grid(name))
+    assert stats["link_2_cells_tested"] > 0
+
+@pytest.mark.parametrize("name", sorted(SCENES))
+def test_quadtree_matches_shapely(name):
+    stats = collections.Counter()
+    cspace_grid = create_configuration_space(SCENES[name], "quadtree", stats)
+    np.testing.assert_array_equal(cspace_grid, reference_grid(name))
+    assert stats["leaves"] > 0
+
+def test_quadtree_point_queries():
+    scene = SCENES["fine"]
+    quadtree = create_scene_quadtree(scene)
+    # The point queries give the grid points of the thetas like theta_to_index_value does for the dense grid
+    rng = np.random.default_rng(0)
+    size = len(reference_grid("fine"))
+    for theta_1, theta_2 in rng.uniform(0, 2*math.pi, (300, 2)):
+        column, row = theta_to_index_value(theta_1, theta_2, 2*math.pi, size)
+        assert quadtree.query(theta_1, theta_2) == reference_grid("fine")[row, column]
+    # Large free and occupied regions stay single cells, so far fewer cells are evaluated than the dense grid has
+    assert quadtree.stats()["evaluated_fraction"] < 0.5
+
+def test_moved_obstacle_layer_is_rebuilt_alone(monkeypatch):
+    import main as simulation
+    monkeypatch.setattr(simulation, "cspace_cache", None)
+    monkeypatch.setattr(simulation, "obstacle_layer_table", None)
+    monkeypatch.setattr(simulation, "cs_backend", "vectorized")
+    rebuilt = []
+    create_layer = simulation.create_scene_obstacle_layer
+    monkeypatch.setattr(simulation, "create_scene_obstacle_layer", lambda scene, obstacles, stats=None: rebuilt.append(obstacles) or create_layer(scene, obstacles, stats))
+    obstacle_layers = [None, None, None]
+    simulation.update_configuration_space(0.05, obstacle_layers)
+    assert len(rebuilt) == 3
+    # Dragging obstacle 2 only rebuilds its layer, combined with the kept layers it gives the grid of the whole scene
+    del rebuilt[:]
+    monkeypatch.setattr(simulation, "obs_centre_offset_x2", simulation.obs_centre_offset_x2 + 60)
+    monkeypatch.setattr(simulation, "obs_centre_offset_y2", simulation.obs_centre_offset_y2 - 40)
+    obstacle_layers[1] = None
+    cspace_grid = simulation.update_configuration_space(0.05, obstacle_layers)
+    assert rebuilt == [[simulation.create_current_scene(0.05)["obstacles"][1]]]
+    np.testing.assert_array_equal(cspace_grid, simulation.create_configuration_space(0.05))
+    np.testing.assert_array_equal(cspace_grid, create_configuration_space(simulation.create_current_scene(0.05), "shapely"))
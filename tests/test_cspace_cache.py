@@ -0,0 +1,82 @@
+# The on-disk cache of configuration space grids
+import os
+import numpy as np
+import pytest
+from cspace_cache import CSpaceCache, scene_key, pack_grid, unpack_grid
+from scene import create_scene, create_scene_key
+
+# A function to create a random grid of 0s and 1s
+def random_grid(size, seed=0):
+    return np.random.default_rng(seed).integers(0, 2, (size, size))
+
+# A function to store a grid in a new cache in tmp_path, returns the path of its file
+def _put(tmp_path, key):
+    cache = CSpaceCache(str(tmp_path))
+    cache.put(key, random_grid(63))
+    return cache.path(key)
+
+def test_pack_round_trip():
+    for size in (1, 7, 8, 63, 629):
+        cspace_grid = random_grid(size, size)
+        np.testing.assert_array_equal(unpack_grid(pack_grid(cspace_grid)), cspace_grid)
+
+def test_scene_key_changes_with_every_setting():
+    scene = create_scene()
+    keys = {create_scene_key(scene)}
+    for settings in ({"cs_resolution": 0.05}, {"ground": [351, 350]}, {"link_lengths": [200, 101]}, {"link_width": 22},
+                     {"joint_limits": [0, 6, 3.3, 2.9]}, {"obstacles": [[0, -300, 120, 80]]}):
+        keys.add(create_scene_key(create_scene(scene, **settings)))
+    assert len(keys) == 7
+    # The start and the goal do not change the grid
+    assert create_scene_key(create_scene(scene, start=[1, 2])) == create_scene_key(scene)
+    assert scene_key({"a": np.arange(3)}) == scene_key({"a": [0, 1, 2]})
+
+def test_get_from_disk_is_memory_mapped(tmp_path):
+    cspace_grid = random_grid(63)
+    CSpaceCache(str(tmp_path)).put("key", cspace_grid)
+    # A new cache has nothing in memory, so the grid comes from the file
+    cache = CSpaceCache(str(tmp_path))
+    loaded_grid = cache.get("key")
+    np.testing.assert_array_equal(loaded_grid, cspace_grid)
+    assert loaded_grid.dtype == cspace_grid.dtype
+    assert isinstance(cache.memory["key"], np.memmap)
+    assert cache.get("missing") is None
+
+def test_memory_entries_are_bounded(tmp_path):
+    cache = CSpaceCache(str(tmp_path), memory_entries=2)
+    for k in range(3):
+        cache.put(str(k), random_grid(16, k))
+    assert list(cache.memory) == ["1", "2"]
+    np.testing.assert_array_equal(cache.get("0"), random_grid(16, 0))
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    size_path = _put(tmp_path, "size")
+    packed_bytes = os.path.getsize(size_path)
+    os.remove(size_path)
+    cache = CSpaceCache(str(tmp_path), max_bytes=3*packed_bytes)
+    for k in range(3):
+        cache.put(str(k), random_grid(63, k))
+        # Distinct modification times, the order of use is the order of the files
+        os.utime(cache.path(str(k)), (k + 10, k + 10))
+    # Loading a grid from its file makes it the most recently used
+    cache = CSpaceCache(str(tmp_path), max_bytes=3*packed_bytes)
+    cache.get("0")
+    cache.put("3", random_grid(63, 3))
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".npy")) == ["0.npy", "2.npy", "3.npy"]
+    assert "1" not in cache.memory
+
+def test_damaged_file_is_a_miss(tmp_path):
+    path = _put(tmp_path, "key")
+    with open(path, "r+b") as file:
+        file.truncate(40)
+    assert CSpaceCache(str(tmp_path)).get("key") is None
+    assert not os.path.exists(path)
+
+def test_failed_write_leaves_no_file(tmp_path, monkeypatch):
+    def failing_save(file, array):
+        file.write(b"partial")
+        raise OSError("disk full")
+    monkeypatch.setattr(np, "save", failing_save)
+    with pytest.raises(OSError):
+        CSpaceCache(str(tmp_path)).put("key", random_grid(63))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,51 @@
+# The lookup table of obstacle layers against layers computed for the same obstacle positions
+import os
+import numpy as np
+import pytest
+from scene import create_scene, create_scene_obstacle_table, create_scene_obstacle_layer
+
+# A small lattice with a different range and step on each axis, at a resolution whose grid size is not a multiple of 8 bits
+SCENE = create_scene(cs_resolution=0.1)
+OBS_WIDTH, OBS_HEIGHT = 120, 80
+OFFSET_RANGE_X, OFFSET_RANGE_Y = (-200, 200, 100), (-300, 150, 50)
+
+@pytest.fixture(scope="module")
+def table_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("obstacle_tables"))
+
+@pytest.fixture(scope="module")
+def table(table_dir):
+    # Two workers write their columns of positions into the same memory mapped file
+    return create_scene_obstacle_table(SCENE, OBS_WIDTH, OBS_HEIGHT, table_dir, OFFSET_RANGE_X, OFFSET_RANGE_Y, workers=2)
+
+def computed_layer(offset_x, offset_y):
+    return create_scene_obstacle_layer(SCENE, [[offset_x, offset_y, OBS_WIDTH, OBS_HEIGHT]])
+
+def test_layers_match_computed_layers(table):
+    assert table.built and len(table) == 5*10
+    assert table.nbytes == len(table)*63*8
+    # The corners and edges of the lattice, and positions inside it
+    for offset_x, offset_y in [(-200, -300), (200, 150), (-200, 150), (200, -300), (0, 0), (100, -250), (-100, 100), (0, -300), (200, 0)]:
+        layer = table.layer(offset_x, offset_y)
+        assert layer.dtype == bool and layer.shape == (63, 63)
+        np.testing.assert_array_equal(layer, computed_layer(offset_x, offset_y))
+    assert table.layer(0, -300).any() and not table.layer(200, 150).all()
+
+def test_positions_off_the_lattice(table):
+    # Between lattice points, and one step beyond either end of each axis
+    for offset_x, offset_y in [(50, 0), (0, 25), (0.5, 0), (-300, 0), (300, 0), (0, -350), (0, 200)]:
+        assert table.layer(offset_x, offset_y) is None
+
+def test_existing_table_is_loaded(table, table_dir):
+    reopened = create_scene_obstacle_table(SCENE, OBS_WIDTH, OBS_HEIGHT, table_dir, OFFSET_RANGE_X, OFFSET_RANGE_Y, workers=2)
+    assert not reopened.built and reopened.path == table.path
+    np.testing.assert_array_equal(np.asarray(reopened.table), np.asarray(table.table))
+    # No temporary files of the build are left behind
+    assert os.listdir(table_dir) == [os.path.basename(table.path)]
+
+def test_other_settings_build_another_table(table, table_dir):
+    # The table of another obstacle shape is a new file, built in one process, and leaves the first table in place
+    other = create_scene_obstacle_table(SCENE, 60, 40, table_dir, OFFSET_RANGE_X, (0, 100, 50), workers=1)
+    assert other.built and other.path != table.path and len(other) == 5*3
+    np.testing.assert_array_equal(other.layer(-100, 50), create_scene_obstacle_layer(SCENE, [[-100, 50, 60, 40]]))
+    assert sorted(os.listdir(table_dir)) == sorted([os.path.basename(table.path), os.path.basename(other.path)])
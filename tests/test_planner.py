@@ -0,0 +1,84 @@
+# The grid motion planners: A*, Dijkstra and the wavefront planner on the wrapped configuration space grid
+import math
+import numpy as np
+import pytest
+from planner import find_grid_path, WavefrontPlanner, compute_distance_field
+from scene import create_scene, create_configuration_space, plan_motion
+
+# A function to get the cost of a path of (row, column) grid points and check that it only makes the moves of the planners
+# Every move goes to one of the 8 neighbours around the wrapped grid, through free grid points, and diagonal moves do not cut the corner of an obstacle
+def path_cost(cspace_grid, path):
+    rows, columns = cspace_grid.shape
+    cost = 0.0
+    for (row, column), (next_row, next_column) in zip(path[:-1], path[1:]):
+        assert cspace_grid[row, column] == 0 and cspace_grid[next_row, next_column] == 0
+        row_step = (next_row - row + 1) % rows - 1
+        column_step = (next_column - column + 1) % columns - 1
+        assert (row_step, column_step) != (0, 0) and abs(row_step) <= 1 and abs(column_step) <= 1
+        if row_step and column_step:
+            assert cspace_grid[next_row, column] == 0 and cspace_grid[row, next_column] == 0
+        cost += math.sqrt(2) if row_step and column_step else 1.0
+    return cost
+
+@pytest.fixture(scope="module")
+def cspace_grid():
+    return create_configuration_space(create_scene(cs_resolution=0.05))
+
+def test_astar_dijkstra_and_wavefront_find_shortest_paths(cspace_grid):
+    rng = np.random.default_rng(0)
+    free_points = np.argwhere(cspace_grid == 0)
+    for _ in range(20):
+        start, goal = (tuple(point) for point in free_points[rng.integers(len(free_points), size=2)])
+        astar_path = find_grid_path(cspace_grid, start, goal)
+        dijkstra_path = find_grid_path(cspace_grid, start, goal, use_heuristic=False)
+        wavefront_path = WavefrontPlanner().find_path(cspace_grid, start, goal)
+        if astar_path is None:
+            assert dijkstra_path is None and wavefront_path is None
+            continue
+        for path in (astar_path, dijkstra_path, wavefront_path):
+            assert path[0] == start and path[-1] == goal
+        cost = path_cost(cspace_grid, astar_path)
+        assert cost == pytest.approx(path_cost(cspace_grid, dijkstra_path))
+        assert cost == pytest.approx(path_cost(cspace_grid, wavefront_path))
+        assert cost == pytest.approx(compute_distance_field(cspace_grid, goal)[start])
+
+def test_paths_wrap_around_the_grid():
+    cspace_grid = np.zeros((20, 20), dtype=int)
+    # A wall across the middle of the grid, the only way from one side to the other is across 0 = 2pi
+    cspace_grid[:, 10] = 1
+    path = find_grid_path(cspace_grid, (5, 8), (5, 12))
+    assert path_cost(cspace_grid, path) == 16
+    assert (5, 0) in path and (5, 19) in path
+
+def test_no_path():
+    cspace_grid = np.zeros((20, 20), dtype=int)
+    cspace_grid[:, 5] = cspace_grid[:, 15] = 1
+    assert find_grid_path(cspace_grid, (0, 0), (0, 10)) is None
+    assert WavefrontPlanner().find_path(cspace_grid, (0, 0), (0, 10)) is None
+    # Obstacles as start or goal
+    assert find_grid_path(cspace_grid, (0, 5), (0, 0)) is None
+    assert find_grid_path(cspace_grid, (0, 0), (3, 15)) is None
+
+def test_no_corner_cutting():
+    cspace_grid = np.zeros((10, 10), dtype=int)
+    # Two obstacles touching at a corner, the diagonal between them is closed
+    cspace_grid[4, 5] = cspace_grid[5, 4] = 1
+    path = find_grid_path(cspace_grid, (4, 4), (5, 5))
+    assert path_cost(cspace_grid, path) > math.sqrt(2)
+
+def test_wavefront_follows_the_grid_and_the_goal(cspace_grid):
+    planner = WavefrontPlanner()
+    free_points = [tuple(point) for point in np.argwhere(cspace_grid == 0)[::500]]
+    planner.find_path(cspace_grid, free_points[0], free_points[1])
+    distance_field = planner.distance_field
+    planner.find_path(cspace_grid, free_points[2], free_points[1])
+    assert planner.distance_field is distance_field
+    planner.find_path(cspace_grid, free_points[2], free_points[3])
+    assert planner.distance_field is not distance_field
+
+def test_plan_motion_starts_and_ends_at_the_thetas(cspace_grid):
+    trajectory = plan_motion(cspace_grid, math.pi/6, math.pi/4, 5*math.pi/6, 7*math.pi/4)
+    assert trajectory.shape[1] == 2
+    np.testing.assert_allclose(trajectory[0], [math.pi/6, math.pi/4])
+    np.testing.assert_allclose(trajectory[-1], [5*math.pi/6, 7*math.pi/4])
+    np.testing.assert_array_equal(plan_motion(cspace_grid, math.pi/6, math.pi/4, 5*math.pi/6, 7*math.pi/4, WavefrontPlanner())[[0, -1]], trajectory[[0, -1]])
@@ -0,0 +1,29 @@
+# Offscreen rendering of trajectories to raw RGB frames and PNG files
+import io
+import os
+import numpy as np
+import main as simulation
+from render import FrameRenderer, main as render_main
+from scene import create_scene
+
+FRAME_BYTES = simulation.SCREEN_WIDTH*simulation.SCREEN_HEIGHT*3
+
+def test_raw_frames_have_the_screen_size():
+    trajectory = np.array([[0.0, 0.0], [0.5, 0.2], [1.0, 0.4]])
+    renderer = FrameRenderer(create_scene(), trajectory)
+    stream = io.BytesIO()
+    renderer.write_raw_frames(stream)
+    assert len(stream.getvalue()) == len(trajectory)*FRAME_BYTES
+    # Every frame shows the manipulator of its own row on the same background
+    frames = np.frombuffer(stream.getvalue(), dtype=np.uint8).reshape(len(trajectory), simulation.SCREEN_HEIGHT, simulation.SCREEN_WIDTH, 3)
+    assert (frames[0] != frames[1]).any() and (frames[1] != frames[2]).any()
+    # The renderer draws on its own surfaces and sets no screen of the simulation
+    assert not hasattr(simulation, "screen")
+
+def test_command_line_writes_raw_and_png_frames(tmp_path):
+    trajectory_path = os.path.join(tmp_path, "path.npy")
+    np.save(trajectory_path, np.array([[0.0, 0.0], [0.3, 0.1], [0.6, 0.2], [0.9, 0.3]]))
+    assert render_main([trajectory_path, "--format", "raw", "--output", os.path.join(tmp_path, "raw")]) == 0
+    assert os.path.getsize(os.path.join(tmp_path, "raw", "path.rgb")) == 4*FRAME_BYTES
+    assert render_main([trajectory_path, "--output", os.path.join(tmp_path, "png")]) == 0
+    assert sorted(os.listdir(os.path.join(tmp_path, "png", "path"))) == ["frame_0000" + str(k) + ".png" for k in range(4)]
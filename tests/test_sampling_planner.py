@@ -0,0 +1,111 @@
+# The motion checks of ChainCollisionChecker against dense sampling of the motions, and the paths of the sampling based planners
+import math
+import numpy as np
+import pytest
+from collision import chain_corners, shrink_link_rectangles
+from scene import create_scene, create_random_obstacles, create_scene_collision_checker, plan_sampling_motion
+from sampling_planner import joint_reach, wrapped_difference, interpolate_path, rrt_connect, LazyPRM, TRAJECTORY_STEP
+
+# A 6-link arm among small obstacles, and the default 2-link scene
+def create_chain_scene(number_of_obstacles=20, seed=0):
+    return create_scene(link_lengths=[60]*6, link_width=14, joint_limits=None, obstacles=create_random_obstacles(number_of_obstacles, seed))
+
+SCENES = {"chain": create_chain_scene(), "default": create_scene()}
+
+# A function to sample a motion so densely that the links move at most 0.05 pixels between the samples
+# Returns the fractions of the samples, whether the exact links hit an obstacle or a joint limit at them, and the same for the links shrunk by depth pixels
+def dense_motion_hits(checker, theta_from, theta_to, depth):
+    difference = wrapped_difference(theta_from, theta_to)
+    fractions = np.linspace(0, 1, int(np.abs(difference) @ joint_reach(checker.link_lengths, checker.half_width)/0.05) + 2)
+    thetas = theta_from + fractions[:, None]*difference
+    hits = ~checker.configurations_free(thetas)
+    corners = chain_corners(checker.ground_x, checker.ground_y, checker.link_lengths, checker.half_width, thetas).reshape(-1, 4, 2)
+    shrunk, valid = shrink_link_rectangles(corners, np.full(len(corners), depth))
+    obstacle_hits = checker.obstacle_index.polygons_hit(corners).reshape(len(thetas), -1).any(axis=1)
+    deep_obstacle_hits = (checker.obstacle_index.polygons_hit(shrunk) & valid).reshape(len(thetas), -1).any(axis=1)
+    return fractions, hits, deep_obstacle_hits | (hits & ~obstacle_hits)
+
+# A function to create random motions between free configurations of a scene, of up to max_length radians per joint
+def random_motions(checker, number_of_motions, max_length, seed=0):
+    rng = np.random.default_rng(seed)
+    thetas = rng.uniform(0, 2*math.pi, (20*number_of_motions, checker.dimensions))
+    thetas_from = thetas[checker.configurations_free(thetas)][:number_of_motions]
+    return thetas_from, thetas_from + rng.uniform(-max_length, max_length, thetas_from.shape)
+
+def test_joint_reach_bounds_link_movement():
+    rng = np.random.default_rng(1)
+    link_lengths, half_width = [80, 60, 40], 7
+    thetas = rng.uniform(0, 2*math.pi, (200, 3))
+    changes = rng.normal(0, 0.01, (200, 3))
+    corners_before = chain_corners(0, 0, link_lengths, half_width, thetas)
+    corners_after = chain_corners(0, 0, link_lengths, half_width, thetas + changes)
+    movement = np.linalg.norm(corners_after - corners_before, axis=-1).max(axis=(1, 2))
+    # The corners move along arcs, which are shorter than the bound
+    assert np.all(movement <= np.abs(changes) @ joint_reach(link_lengths, half_width) + 1e-9)
+
+@pytest.mark.parametrize("name", sorted(SCENES))
+def test_motions_match_dense_sampling(name):
+    checker = create_scene_collision_checker(SCENES[name])
+    thetas_from, thetas_to = random_motions(checker, 30, 0.4)
+    fractions = checker.free_fractions(thetas_from, thetas_to)
+    free = checker.motions_free(thetas_from, thetas_to)
+    assert 0 < free.sum() < len(free)
+    for theta_from, theta_to, fraction, motion_free in zip(thetas_from, thetas_to, fractions, free):
+        dense_fractions, hits, deep_hits = dense_motion_hits(checker, theta_from, theta_to, checker.min_tolerance)
+        # A free motion reaches into no obstacle by min_tolerance, and up to the free fraction of a colliding motion the links hit nothing
+        if motion_free:
+            assert fraction == 1.0 and not deep_hits.any()
+        else:
+            assert hits.any() and fraction < 1.0
+            assert not hits[dense_fractions < fraction].any()
+
+def test_near_miss_motion_is_free():
+    # With the arm along the x axis, the end corners of link 2 reach furthest at theta_2 = +-atan(0.1), 200 + sqrt(100^2 + 10^2) pixels from the ground
+    furthest = 200 + math.hypot(100, 10)
+    def wall_checker(wall_x):
+        return create_scene_collision_checker(create_scene(obstacles=[{"points": [[wall_x, -100], [wall_x + 40, -100], [wall_x + 40, 100], [wall_x, 100]]}], joint_limits=None))
+    # A wall 0.05 pixels beyond that is never hit, although the links come closer to it than the tolerance of the checker
+    checker = wall_checker(furthest + 0.05)
+    assert checker.motions_free([[0, -0.3]], [[0, 0.3]])[0]
+    # 0.3 pixels closer, the corners reach into the wall between the configurations of the motion
+    checker = wall_checker(furthest - 0.3)
+    assert checker.configurations_free([[0, -0.3], [0, 0], [0, 0.3]]).all()
+    assert not checker.motions_free([[0, -0.3]], [[0, 0.3]])[0]
+
+def test_joint_limits_between_pieces():
+    # Joint 1 may not pass a sliver of 0.001 rad, far less than one piece of the motion, the ends of the motion are within the limits
+    scene = create_scene(obstacles=[], joint_limits=[1.001, 1.0, 0, 2*math.pi])
+    checker = create_scene_collision_checker(scene)
+    assert checker.configurations_free([[0.5, 0.0], [1.7, 0.0]]).all()
+    assert not checker.motions_free([[0.5, 0.0]], [[1.7, 0.0]])[0]
+    assert checker.motions_free([[1.7, 0.0]], [[2.5, 0.0]])[0]
+
+def test_interpolate_path_steps():
+    path = np.array([[0.1, 6.2], [6.1, 0.3], [1.0, 1.0]])
+    trajectory = interpolate_path(path)
+    np.testing.assert_allclose(trajectory[[0, -1]], path[[0, -1]])
+    assert np.abs(wrapped_difference(trajectory[:-1], trajectory[1:])).max() <= TRAJECTORY_STEP + 1e-12
+    assert np.all((trajectory >= 0) & (trajectory < 2*math.pi))
+
+@pytest.mark.parametrize("planner", ["rrt", "prm"])
+def test_planned_paths_are_free(planner):
+    scene = SCENES["chain"]
+    checker = create_scene_collision_checker(scene)
+    thetas_from, thetas_to = random_motions(checker, 3, math.pi, seed=2)
+    thetas_to = thetas_to[checker.configurations_free(thetas_to)]
+    for k, (start, goal) in enumerate(zip(thetas_from, thetas_to)):
+        trajectory = plan_sampling_motion(scene, start, goal, planner, seed=k)
+        assert trajectory is not None
+        np.testing.assert_allclose(wrapped_difference(trajectory[[0, -1]], [start, goal]), 0, atol=1e-9)
+        assert checker.motions_free(trajectory[:-1], trajectory[1:]).all()
+
+def test_roadmap_is_reused():
+    checker = create_scene_collision_checker(SCENES["chain"])
+    roadmap = LazyPRM(checker, seed=0)
+    thetas_from, thetas_to = random_motions(checker, 4, math.pi, seed=3)
+    thetas_to = thetas_to[checker.configurations_free(thetas_to)]
+    for start, goal in zip(thetas_from, thetas_to):
+        path = roadmap.find_path(start, goal)
+        assert path is not None
+        assert checker.motions_free(path[:-1], path[1:]).all()
+    assert rrt_connect(checker, thetas_from[0], thetas_from[0]) is not None
@@ -0,0 +1,81 @@
+# Unwrapping, shortcutting and timing of paths under joint velocity and acceleration limits
+import math
+import os
+import numpy as np
+import pytest
+from scene import create_scene, create_scene_collision_checker, create_timed_trajectory, plan_sampling_motion
+from sampling_planner import wrapped_difference
+from trajectory_smoothing import unwrap_path, shortcut_path, time_parameterise, sample_timed_trajectory
+from test_sampling_planner import SCENES, random_motions
+
+DEMO_TRAJECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "demo_trajectory.npy")
+
+def test_unwrap_path_is_continuous():
+    path = np.array([[6.2, 0.1], [0.1, 6.2], [3.0, 6.0], [6.1, 0.2]])
+    unwrapped = unwrap_path(path)
+    # The same configurations, with every step the short way around
+    np.testing.assert_allclose(wrapped_difference(unwrapped, path), 0, atol=1e-12)
+    assert np.abs(np.diff(unwrapped, axis=0)).max() <= math.pi
+    np.testing.assert_allclose(unwrapped[:2], [[6.2, 0.1], [0.1 + 2*math.pi, 6.2 - 2*math.pi]])
+
+@pytest.mark.parametrize("name", sorted(SCENES))
+def test_shortcut_path_is_free_and_shorter(name):
+    checker = create_scene_collision_checker(SCENES[name])
+    if name == "default":
+        path = np.load(DEMO_TRAJECTORY)
+    else:
+        thetas_from, thetas_to = random_motions(checker, 3, math.pi, seed=2)
+        goal = thetas_to[checker.configurations_free(thetas_to)][0]
+        path = plan_sampling_motion(SCENES[name], thetas_from[0], goal, "rrt", seed=0)
+    shortened = shortcut_path(checker, path)
+    assert len(shortened) <= len(path) and (name != "default" or len(shortened) < len(path)//10)
+    np.testing.assert_allclose(wrapped_difference(shortened[[0, -1]], path[[0, -1]]), 0, atol=1e-9)
+    assert checker.motions_free(shortened[:-1], shortened[1:]).all()
+    # The rows of the shortened path are rows of the path
+    path_rows = unwrap_path(path)
+    assert all(np.any(np.all(np.isclose(path_rows, row), axis=1)) for row in shortened)
+
+def test_shortcut_keeps_blocked_motions():
+    # Every shortcut of this path would sweep link 2 through the upper obstacle of the default scene, so all of its rows are kept
+    scene = create_scene(joint_limits=None)
+    checker = create_scene_collision_checker(scene)
+    path = np.array([[0.6, 0.0], [0.6, -1.5], [2.2, -1.5], [2.2, 0.0]])
+    assert checker.motions_free(path[:-1], path[1:]).all()
+    assert not checker.motions_free(path[:1], path[-1:])[0]
+    shortened = shortcut_path(checker, path)
+    np.testing.assert_allclose(shortened, path)
+
+@pytest.mark.parametrize("max_velocity, max_acceleration", [(1.0, 2.0), ([0.5, 2.0], [4.0, 1.0]), (3.0, 0.5)])
+def test_time_parameterise_keeps_limits(max_velocity, max_acceleration):
+    path = np.array([[0.0, 0.0], [1.0, 0.5], [1.02, 0.5], [6.0, 6.2], [6.0, 6.2]])
+    sample_time = 0.01
+    times, thetas = time_parameterise(path, max_velocity, max_acceleration, sample_time)
+    # Samples every sample_time seconds from the start, the last one at the end of the path
+    assert times[0] == 0 and np.all(np.diff(times[:-1]) == pytest.approx(sample_time))
+    assert 0 < times[-1] - times[-2] <= sample_time + 1e-12
+    np.testing.assert_allclose(thetas[0], unwrap_path(path)[0])
+    np.testing.assert_allclose(thetas[-1], unwrap_path(path)[-1])
+    # Finite differences of the samples stay within the limits, with some slack for the differences across the phase changes
+    velocities = np.diff(thetas, axis=0)/np.diff(times)[:, None]
+    assert np.all(np.abs(velocities) <= np.broadcast_to(max_velocity, velocities.shape)*(1 + 1e-6))
+    accelerations = np.diff(velocities[:-1], axis=0)/sample_time
+    assert np.all(np.abs(accelerations) <= np.broadcast_to(max_acceleration, accelerations.shape)*1.01 + 1e-6)
+
+def test_time_parameterise_stops_at_every_row():
+    path = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]])
+    times, thetas = time_parameterise(path, 1.0, 1.0, 0.001)
+    # A triangular profile of 1 rad at 1 rad/s^2 takes 2 s, and the corner is reached at rest
+    assert times[-1] == pytest.approx(4.0)
+    np.testing.assert_allclose(sample_timed_trajectory(times, thetas, 2.0), [1.0, 0.0], atol=1e-6)
+    np.testing.assert_allclose(sample_timed_trajectory(times, thetas, 1.0), [0.5, 0.0], atol=1e-6)
+    np.testing.assert_allclose(sample_timed_trajectory(times, thetas, 10.0), [1.0, 1.0])
+    # A single row takes no time
+    times, thetas = time_parameterise(path[:1], 1.0, 1.0)
+    assert len(times) == 1 and times[0] == 0
+
+def test_timed_demo_trajectory_is_free():
+    scene = create_scene()
+    checker = create_scene_collision_checker(scene)
+    times, thetas = create_timed_trajectory(scene, np.load(DEMO_TRAJECTORY), 1.0, 2.0, 0.02)
+    assert checker.motions_free(thetas[:-1], thetas[1:]).all()
+    np.testing.assert_allclose(wrapped_difference(thetas[-1], np.load(DEMO_TRAJECTORY)[-1]), 0, atol=1e-9)
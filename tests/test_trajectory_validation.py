@@ -0,0 +1,73 @@
+# The trajectory validator against dense sampling of the segments, for collisions between rows and for links that only come near an obstacle
+import math
+import os
+import numpy as np
+import pytest
+from scene import create_scene, create_scene_collision_checker, find_trajectory_collision
+from trajectory_validation import first_colliding_segment
+from test_sampling_planner import SCENES, dense_motion_hits
+
+# A function to create a random trajectory of a scene with free rows, steps of up to max_step radians per joint from one row to the next
+def random_trajectory(checker, number_of_rows, max_step, seed):
+    rng = np.random.default_rng(seed)
+    rows = [rng.uniform(0, 2*math.pi, checker.dimensions)]
+    while len(rows) < number_of_rows:
+        row = rows[-1] + rng.uniform(-max_step, max_step, checker.dimensions)
+        if checker.configurations_free([row])[0]:
+            rows.append(row)
+        elif len(rows) == 1:
+            rows[0] = rng.uniform(0, 2*math.pi, checker.dimensions)
+    return np.array(rows)
+
+@pytest.mark.parametrize("name", sorted(SCENES))
+def test_first_colliding_segment_matches_dense_sampling(name):
+    checker = create_scene_collision_checker(SCENES[name])
+    found = 0
+    for seed in range(8):
+        trajectory = random_trajectory(checker, 8, 0.2, seed)
+        segment = first_colliding_segment(checker, trajectory)
+        last_checked = len(trajectory) - 2 if segment is None else segment
+        # The segments before the result only come near obstacles, the result itself hits one between its rows, which are both free
+        for k in range(last_checked + 1):
+            _, hits, deep_hits = dense_motion_hits(checker, trajectory[k], trajectory[k + 1], checker.min_tolerance)
+            if k == segment:
+                assert hits.any()
+            else:
+                assert not deep_hits.any()
+        found += segment is not None
+    # Some of the trajectories must collide between their rows, or the test proves little
+    assert 0 < found < 8
+
+def test_collision_between_free_rows():
+    # Link 2 sweeps through the upper obstacle of the default scene between two free rows
+    scene = create_scene(joint_limits=None)
+    checker = create_scene_collision_checker(scene)
+    trajectory = np.array([[0.3, 0.0], [0.6, 0.0], [1.0, 0.0], [2.2, 0.0], [2.5, 0.0]])
+    assert checker.configurations_free(trajectory).all()
+    assert first_colliding_segment(checker, trajectory) == 2
+    assert find_trajectory_collision(scene, trajectory) == 2
+    assert first_colliding_segment(checker, trajectory[:3]) is None
+
+def test_near_miss_is_no_collision():
+    # The end corners of link 2 of an arm along the x axis reach furthest at theta_2 = +-atan(0.1), a wall just beyond that is never hit
+    furthest = 200 + math.hypot(100, 10)
+    trajectory = np.array([[0, -0.3], [0, 0.0], [0, 0.3]])
+    for wall_x, segment in ((furthest + 0.05, None), (furthest - 0.3, 0)):
+        scene = create_scene(obstacles=[{"points": [[wall_x, -100], [wall_x + 40, -100], [wall_x + 40, 100], [wall_x, 100]]}], joint_limits=None)
+        assert find_trajectory_collision(scene, trajectory) == segment
+
+def test_segments_checked_in_batches():
+    checker = create_scene_collision_checker(create_scene())
+    for seed in range(3):
+        trajectory = random_trajectory(checker, 600, 0.05, seed)
+        # The batches stop at the first batch with a collision, the result is the same as checking every segment
+        free = checker.motions_free(trajectory[:-1], trajectory[1:])
+        assert first_colliding_segment(checker, trajectory) == (None if free.all() else int(np.argmin(free)))
+    assert first_colliding_segment(checker, trajectory[:1]) is None
+
+def test_demo_trajectory():
+    demo_trajectory = np.load(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "demo_trajectory.npy"))
+    assert find_trajectory_collision(create_scene(), demo_trajectory) is None
+    # With the upper obstacle moved 50 pixels down the demo trajectory runs into it
+    segment = find_trajectory_collision(create_scene(obstacles=[[0, -250, 120, 80], [0, 200, 120, 80]]), demo_trajectory)
+    assert segment is not None and 0 < segment < len(demo_trajectory) - 1
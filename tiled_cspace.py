@@ -0,0 +1,124 @@
+import numpy as np
+import math
+import os
+import collections
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory, resource_tracker
+from cspace import create_joint_limit_layer, create_obstacle_layer
+from obstacle_index import ObstacleIndex
+
+# Number of theta_1 columns in one tile, small enough that the renderer sees the grid fill in, large enough to keep the numpy batches efficient
+TILE_COLUMNS = 16
+
+# Cancelled builds whose running tiles have not finished yet, their shared memory is released once the tiles are done
+# so that a worker can never attach to a grid that was already unlinked
+retired_builds = []
+
+# A function to release the shared memory of cancelled builds whose tiles have finished, optionally waiting for them
+def release_retired_builds(block=False):
+    for build in list(retired_builds):
+        if block:
+            wait(build.pending)
+        if build.poll(None):
+            retired_builds.remove(build)
+
+# A function to create the process pool that computes the tiles, by default one worker per core
+def create_tile_executor(workers=None):
+    # The workers must share the resource tracker of this process, otherwise a worker started before the first shared grid
+    # gets its own tracker, which unlinks the grids the worker attached to when the worker exits
+    if os.name == "posix":
+        resource_tracker.ensure_running()
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+
+# A function run by the worker processes to compute one tile of theta_1 columns and write it directly into the shared grid
+# Returns the columns of the tile and the broad phase counters of the tile
+def compute_tile(shm_name, grid_shape, column_start, column_stop, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_corners, joint_limits):
+    columns = slice(column_start, column_stop)
+    stats = collections.Counter()
+    occupied = create_joint_limit_layer(cs_resolution, joint_limits)[:, columns].copy()
+    occupied |= create_obstacle_layer(cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, ObstacleIndex(obstacle_corners), columns, stats)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shared_grid = np.ndarray(grid_shape, dtype=np.uint8, buffer=shm.buf)
+    shared_grid[:, columns] = occupied
+    del shared_grid
+    shm.close()
+    return column_start, column_stop, stats
+
+# A configuration space grid that is computed in the background by a process pool, one tile of theta_1 columns at a time
+# The workers write into a shared memory grid, poll copies the finished tiles into the grid used by the renderer
+class TiledCSpaceBuild:
+    def __init__(self, executor, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_corners, joint_limits, tile_columns=TILE_COLUMNS):
+        release_retired_builds()
+        self.cancelled = False
+        # Broad phase counters of the finished tiles
+        self.stats = collections.Counter()
+        size_of_grid = len(np.arange(0, 2*math.pi, cs_resolution))
+        self.grid_shape = (size_of_grid, size_of_grid)
+
+        # All grid points are obstacles unless found to be free
+        self.shm = shared_memory.SharedMemory(create=True, size=size_of_grid*size_of_grid)
+        self.shared_grid = np.ndarray(self.grid_shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.shared_grid[:] = 1
+
+        obstacle_corners = [np.asarray(corners, dtype=float) for corners in obstacle_corners]
+        self.pending = [
+            executor.submit(compute_tile, self.shm.name, self.grid_shape, column_start, min(column_start+tile_columns, size_of_grid),
+                            cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_corners, tuple(joint_limits))
+            for column_start in range(0, size_of_grid, tile_columns)
+        ]
+        self.total_tiles = len(self.pending)
+
+    # Fraction of the tiles that are finished, from 0 to 1
+    def progress(self):
+        return 1 - len(self.pending)/self.total_tiles
+
+    # Copy the tiles finished since the last poll into cspace_grid, returns True once every tile is finished
+    # Does not block, so it can be called once per frame. The tiles of a cancelled build are not copied
+    def poll(self, cspace_grid):
+        still_pending = []
+        for future in self.pending:
+            if future.done():
+                if not self.cancelled:
+                    column_start, column_stop, stats = future.result()
+                    cspace_grid[:, column_start:column_stop] = self.shared_grid[:, column_start:column_stop]
+                    self.stats.update(stats)
+            else:
+                still_pending.append(future)
+        self.pending = still_pending
+
+        if not self.pending:
+            self.close()
+            return True
+        return False
+
+    # Block until every tile is finished and return the whole grid
+    def result(self):
+        cspace_grid = np.full(self.grid_shape, 1)
+        wait(self.pending)
+        self.poll(cspace_grid)
+        return cspace_grid
+
+    # Stop the build, e.g. because an obstacle moved. Tiles that are already running finish but their results are ignored
+    def cancel(self):
+        self.cancelled = True
+        self.pending = [future for future in self.pending if not future.cancel()]
+        if not self.poll(None):
+            retired_builds.append(self)
+
+    # Release the shared memory grid
+    def close(self):
+        if self.shm is not None:
+            del self.shared_grid
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+# Create Configuration Space grid map with the tiled engine and wait for it, useful without a renderer
+# If stats is a collections.Counter, the broad phase counters of all tiles are added to it
+def create_configuration_space_tiled(executor, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_corners, joint_limits, tile_columns=TILE_COLUMNS, stats=None):
+    build = TiledCSpaceBuild(executor, cs_resolution, ground_x, ground_y, link_length_1, link_length_2, half_width, obstacle_corners, joint_limits, tile_columns)
+    cspace_grid = build.result()
+    if stats is not None:
+        stats.update(build.stats)
+    return cspace_grid
@@ -0,0 +1,68 @@
+import numpy as np
+from sampling_planner import wrapped_difference
+
+# A function to unwrap the joint angles of a path, so that every joint angle changes continuously the short way around from one row to the next
+# The rows are the same configurations as before, but the angles can leave the range 0 - 2pi, so the path can be interpolated with straight lines
+def unwrap_path(path):
+    path = np.asarray(path, dtype=float)
+    return path[0] + np.concatenate([np.zeros((1, path.shape[1])), np.cumsum(wrapped_difference(path[:-1], path[1:]), axis=0)])
+
+# A function to shorten a path by replacing runs of its rows with straight motions in joint space that are free of collisions
+# From the first row on, the motions to all of the next max_candidates rows are checked in one batch with ChainCollisionChecker.motions_free,
+# and the path jumps to the furthest row it reaches freely, then the same is done from that row. The motions of the path itself are kept where no shortcut is free
+# checker is a ChainCollisionChecker, so the shortcuts are checked the same way as trajectory_validation.first_colliding_segment checks the path
+# Returns the rows of the shortened path, unwrapped
+def shortcut_path(checker, path, max_candidates=64):
+    path = unwrap_path(np.reshape(path, (-1, checker.dimensions)))
+    row_numbers = [0]
+    while row_numbers[-1] < len(path) - 1:
+        row_number = row_numbers[-1]
+        candidates = np.arange(row_number + 2, min(len(path), row_number + 1 + max_candidates))
+        free = checker.motions_free(np.repeat(path[row_number:row_number + 1], len(candidates), axis=0), path[candidates])
+        row_numbers.append(int(candidates[free].max()) if free.any() else row_number + 1)
+    return path[row_numbers]
+
+# A function to get the duration of every segment of a path with straight motions between its rows, when the joints accelerate from and stop at every row
+# The motion of a segment follows a trapezoidal profile, or a triangular one for short segments, scaled so that no joint exceeds its velocity or acceleration limit
+# max_velocity and max_acceleration are in rad/s and rad/s^2, one value for all joints or one value per joint
+# Returns the durations and the largest velocity and acceleration of the fraction of every segment, which runs from 0 to 1
+def segment_timings(path, max_velocity, max_acceleration):
+    distances = np.abs(np.diff(path, axis=0))
+    with np.errstate(divide="ignore"):
+        fraction_velocity = np.min(np.broadcast_to(max_velocity, distances.shape)/distances, axis=1, initial=np.inf)
+        fraction_acceleration = np.min(np.broadcast_to(max_acceleration, distances.shape)/distances, axis=1, initial=np.inf)
+    # A segment whose fraction would pass the velocity limit before halfway has a phase of constant velocity, otherwise it accelerates up to halfway
+    triangular = fraction_velocity**2 >= fraction_acceleration
+    fraction_velocity = np.where(triangular, np.sqrt(fraction_acceleration), fraction_velocity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        durations = np.where(triangular, 2/fraction_velocity, 1/fraction_velocity + fraction_velocity/fraction_acceleration)
+    return np.nan_to_num(durations, nan=0.0, posinf=0.0), fraction_velocity, fraction_acceleration
+
+# A function to time a path with straight motions between its rows under joint velocity and acceleration limits, the joints stop at every row
+# Stopping is needed to follow the corners of the path exactly with a limited acceleration, so the path should be shortened with shortcut_path first
+# The timed trajectory is resampled every sample_time seconds, with the end of the path as its last row
+# Returns the times in seconds from the start and the rows of unwrapped joint angles at these times
+def time_parameterise(path, max_velocity, max_acceleration, sample_time=0.01):
+    path = unwrap_path(path)
+    durations, fraction_velocity, fraction_acceleration = segment_timings(path, max_velocity, max_acceleration)
+    segment_starts = np.concatenate([[0.0], np.cumsum(durations)])
+    times = np.append(np.arange(0, segment_starts[-1], sample_time), segment_starts[-1])
+    if len(path) == 1:
+        return times, path[[0]]
+
+    # The fraction of the segment at every time, from the accelerating, constant velocity and decelerating phases of its profile
+    segment_numbers = np.clip(np.searchsorted(segment_starts, times, side="right") - 1, 0, len(durations) - 1)
+    elapsed = times - segment_starts[segment_numbers]
+    duration, velocity, acceleration = durations[segment_numbers], fraction_velocity[segment_numbers], fraction_acceleration[segment_numbers]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ramp_time = velocity/acceleration
+        remaining = np.maximum(duration - elapsed, 0)
+        fractions = np.where(elapsed < ramp_time, acceleration*elapsed**2/2,
+                    np.where(remaining < ramp_time, 1 - acceleration*remaining**2/2, velocity*(elapsed - ramp_time/2)))
+    fractions = np.clip(np.nan_to_num(fractions, nan=1.0), 0, 1)
+    thetas = path[segment_numbers] + fractions[:, None]*(path[segment_numbers + 1] - path[segment_numbers])
+    return times, thetas
+
+# A function to get the joint angles of a timed trajectory at any time, by interpolating between its samples, times after the end give the last row
+def sample_timed_trajectory(times, thetas, time):
+    return np.array([np.interp(time, times, thetas[:, joint]) for joint in range(thetas.shape[1])])
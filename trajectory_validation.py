@@ -0,0 +1,23 @@
+import numpy as np
+
+# Number of segments of a trajectory checked in one batch by first_colliding_segment
+CHUNK_SEGMENTS = 256
+
+# A function to find the first segment of a trajectory that collides, checking the motion between the rows and not only the rows themselves
+# The segment k from row k to row k + 1 is a straight motion in joint space the short way around each joint, like the motions of the sampling based planners
+# checker is a ChainCollisionChecker, whose geometry, obstacles and joint limits are used
+#
+# The segments are checked with ChainCollisionChecker.motions_free, the same check as the motions of the planners and of trajectory_smoothing.shortcut_path:
+# a segment collides where the exact links hit an obstacle or leave the joint limits, at its rows or anywhere between them, and links that only come near an obstacle
+# are no collision. The segments are checked in batches in the order of the trajectory, which stop at the first batch with a collision
+# Returns the number of the first colliding segment, or None if the whole trajectory is free. A colliding first row is part of segment 0
+def first_colliding_segment(checker, trajectory):
+    trajectory = np.reshape(np.asarray(trajectory, dtype=float), (-1, checker.dimensions))
+    if len(trajectory) == 1:
+        return None if checker.configurations_free(trajectory)[0] else 0
+    for chunk_start in range(0, len(trajectory) - 1, CHUNK_SEGMENTS):
+        chunk_stop = min(chunk_start + CHUNK_SEGMENTS, len(trajectory) - 1)
+        free = checker.motions_free(trajectory[chunk_start:chunk_stop], trajectory[chunk_start + 1:chunk_stop + 1])
+        if not free.all():
+            return chunk_start + int(np.argmin(free))
+    return None